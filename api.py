@@ -1,11 +1,43 @@
 import json
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Any
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-import requests
+# requests 和 email.utils 在第一次用到时才导入：cron 方式每次运行都要重新启动解释器，
+# 导入 requests 占了启动时间的大半，显示帮助或配置有误时不需要它
 
+try:
+    # 可选依赖：安装了 orjson 时用它解码响应，速度约为标准库的两到三倍
+    import orjson
+except ImportError:
+    orjson = None
 
-@dataclass
+if TYPE_CHECKING:
+    import requests
+
+    from archive import PostArchive
+    from metrics import RunMetrics
+    from transport import DNSCache
+
+
+def loads_json(content: bytes) -> Any:
+    """
+    解码 JSON 响应体：有 orjson 时使用 orjson，否则使用标准库。
+    两者解码失败时都抛出 json.JSONDecodeError（orjson.JSONDecodeError 是它的子类）。
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+# Python 3.10 起 dataclass 支持 slots=True：实例没有 __dict__，占用内存更少，创建和访问属性也更快
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class FanboxPost:
     id: str
     title: str
@@ -17,6 +49,201 @@ class FanboxPost:
     fee_required: int = 0  # 收费金额（日元），0 表示免费
 
 
+def post_to_dict(post: FanboxPost) -> Dict[str, Any]:
+    """
+    把投稿转换为与 Fanbox API 相同字段名的 dict（用于 JSON 输出）。
+    """
+    return {
+        "id": post.id,
+        "title": post.title,
+        "publishedDatetime": post.published_datetime,
+        "updatedDatetime": post.updated_datetime,
+        "creatorId": post.creator_id,
+        "creatorName": post.creator_name,
+        "creatorIconUrl": post.creator_icon_url,
+        "feeRequired": post.fee_required,
+    }
+
+
+class FanboxHTTPError(RuntimeError):
+    """
+    Fanbox API 返回了非 2xx 的状态码。
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+# 这些状态码通常是暂时性的，值得退避后重试
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 响应头（秒数或 HTTP 日期），返回需要等待的秒数。
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限速器，一个 FanboxAPI 实例的所有请求（包括各个线程）共用一个。
+    收到 429 时速率减半，之后每次成功的请求逐步恢复，直到配置的上限，
+    从而稳定在服务器能接受的最高速率附近。
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.2) -> None:
+        """
+        :param rate: 每秒最多请求数，<= 0 表示不限速
+        :param burst: 允许的突发请求数
+        :param min_rate: 因 429 降速时的最低速率
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate) if rate > 0 else 0
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        阻塞直到拿到一个令牌。
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self.rate <= 0:
+                        return
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """
+        在接下来的 seconds 秒内暂停所有请求（例如服务器要求的 Retry-After）。
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def throttled(self) -> None:
+        """
+        收到 429 时调用：速率减半。
+        """
+        with self._lock:
+            if self.max_rate > 0:
+                self.rate = max(self.min_rate, self.rate / 2)
+
+    def succeeded(self) -> None:
+        """
+        请求成功时调用：逐步恢复速率。
+        """
+        with self._lock:
+            if self.max_rate > 0 and self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.02)
+
+
+@dataclass
+class RequestStats:
+    """
+    FanboxAPI 的请求统计，多个线程共用同一个 API 实例时也是准确的。
+    """
+    requests: int = 0  # 实际发出的请求数
+    bytes: int = 0  # 下载的响应体字节数
+    not_modified: int = 0  # 服务器返回 304、直接使用缓存的次数
+    bytes_saved: int = 0  # 304 时省下的响应体字节数（按缓存的响应体大小估算）
+    retries: int = 0  # 因 429 / 5xx / 网络错误而重试的次数
+    throttled: int = 0  # 收到 429 的次数
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(
+        self,
+        requests: int = 0,
+        bytes: int = 0,
+        not_modified: int = 0,
+        bytes_saved: int = 0,
+        retries: int = 0,
+        throttled: int = 0,
+    ) -> None:
+        with self._lock:
+            self.requests += requests
+            self.bytes += bytes
+            self.not_modified += not_modified
+            self.bytes_saved += bytes_saved
+            self.retries += retries
+            self.throttled += throttled
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "bytes": self.bytes,
+                "not_modified": self.not_modified,
+                "bytes_saved": self.bytes_saved,
+                "retries": self.retries,
+                "throttled": self.throttled,
+            }
+
+
+def build_headers(cookie: str, extra_headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    构造请求 Fanbox API 所需的请求头，同步和异步客户端共用。
+    """
+    # 基本的请求头，User-Agent 随便写一个常见浏览器即可
+    headers = {
+        "User-Agent": (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+        ),
+        "Accept": "application/json, text/plain, */*",
+        "Referer": "https://www.fanbox.cc",
+        "Origin": "https://www.fanbox.cc",
+        "Cookie": cookie,
+    }
+    if extra_headers:
+        headers.update(extra_headers)
+    return headers
+
+
+def build_posts_params(
+    limit: int,
+    max_published_datetime: str = "",
+    max_id: str = "",
+    creator_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    构造 post.listSupporting / post.listCreator 的查询参数。
+    """
+    params: Dict[str, Any] = {}
+    if creator_id is not None:
+        params["creatorId"] = creator_id
+    params["limit"] = limit
+    if max_published_datetime:
+        params["maxPublishedDatetime"] = max_published_datetime
+    if max_id:
+        params["maxId"] = max_id
+    return params
+
+
 class FanboxAPI:
     """
     一个非常薄的 Fanbox Web API 封装，参考 src/ts/API.ts 和 docs/fanbox.md。
@@ -33,6 +260,16 @@ class FanboxAPI:
         timeout: int = 15,
         extra_headers: Optional[Dict[str, str]] = None,
         proxy: Optional[str] = None,
+        pool_size: int = 10,
+        rate_limit: float = 0,
+        rate_burst: int = 5,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        session: Optional["requests.Session"] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        transport: str = "requests",
+        dns_cache: Optional["DNSCache"] = None,
     ) -> None:
         """
         :param cookie: 浏览器里复制的 Cookie 字符串（整段粘贴即可）
@@ -40,43 +277,196 @@ class FanboxAPI:
         :param timeout: 请求超时时间（秒）
         :param extra_headers: 额外自定义的 HTTP 头
         :param proxy: HTTP 代理地址，例如 "http://172.17.0.1:7890"，不设置则不使用代理
+        :param pool_size: 连接池大小，多线程并发请求时应不小于并发数，否则多出的连接用完即被丢弃
+        :param rate_limit: 每秒最多请求数（所有线程共用），0 表示不限速
+        :param rate_burst: 限速时允许的突发请求数
+        :param max_retries: 遇到 429 / 5xx / 网络错误时最多重试几次
+        :param backoff_base: 第一次重试前的等待时间（秒），之后每次翻倍并加入随机抖动
+        :param backoff_max: 单次重试等待时间的上限（秒）
+        :param session: 与其他 FanboxAPI 实例共用的会话（连接池），不传时新建一个
+        :param rate_limiter: 与其他 FanboxAPI 实例共用的限速器，不传时按 rate_limit / rate_burst 新建一个
+        :param transport: 新建会话时使用的传输方式，"requests" 或 "httpx"（HTTP/2），见 transport.py
+        :param dns_cache: 新建 requests 会话时使用的 DNS 缓存（transport.DNSCache），不传时每个新连接都由系统解析
+        Cookie 和代理随每个请求发送而不是设置在会话上，所以多个账号可以共用同一个会话。
         """
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        self.rate_limiter = rate_limiter or TokenBucket(rate_limit, rate_burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
 
-        self.session = requests.Session()
+        if session is None:
+            from transport import create_session
+
+            session = create_session(transport, pool_size, dns_cache)
+        self.session = session
+        # 会话（包括 httpx 传输）抛出的都是 requests 的异常类型。在这里导入一次，不在每个请求里执行 import
+        import requests
+
+        self._request_error = requests.RequestException
+        self._retryable_errors = (FanboxHTTPError, requests.ConnectionError, requests.Timeout)
         # 设置代理
+        self.proxies: Optional[Dict[str, str]] = None
         if proxy:
-            self.session.proxies = {
+            self.proxies = {
                 "http": proxy,
                 "https": proxy,
             }
-        # 基本的请求头，User-Agent 随便写一个常见浏览器即可
-        self.session.headers.update(
-            {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
-                ),
-                "Accept": "application/json, text/plain, */*",
-                "Referer": "https://www.fanbox.cc",
-                "Origin": "https://www.fanbox.cc",
-                "Cookie": cookie,
-            }
-        )
-        if extra_headers:
-            self.session.headers.update(extra_headers)
+        self.headers = build_headers(cookie, extra_headers)
 
-    def _request(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        self.stats = RequestStats()
+        # 设置后记录每个请求的延迟、状态码和解析耗时（见 metrics.RunMetrics）
+        self.metrics: Optional["RunMetrics"] = None
+        # 设置后把解析出的每一篇投稿交给归档（见 archive.PostArchive）
+        self.archive: Optional["PostArchive"] = None
+        # 条件请求的校验信息：(url, 参数) -> (ETag, Last-Modified, 响应里最新投稿的 id, 响应体字节数)。
+        # 只用于创作者投稿列表不带游标的第一页，不保存响应体，每个关注的创作者只有一两条，所以不限制条数
+        self._validators: Dict[Tuple[str, Tuple], Tuple[Optional[str], Optional[str], str, int]] = {}
+
+    def close(self) -> None:
+        """
+        关闭会话（连接池）。多个实例共用同一个会话时关闭其中一个即可，重复关闭没有影响。
+        """
+        self.session.close()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """
+        第 attempt 次重试前的等待时间：指数增长，并在 [50%, 100%] 之间随机抖动，避免多个线程同时重试。
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _request(self, path: str, params: Optional[Dict[str, Any]] = None, known_newest_id: Optional[str] = None) -> Any:
+        """
+        发送 GET 请求并返回解析后的 JSON。
+        请求前先经过限速器；遇到 429 / 5xx / 网络错误时按指数退避重试，
+        有 Retry-After 时按服务器要求的时间等待（并暂停这个实例上的所有请求）。
+        传入 known_newest_id（调用方已知的最新投稿 id）时发送条件请求：
+        上次同一请求的响应里最新投稿也是它、且服务器返回 304 时，返回 None 表示没有变化。
+        """
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                return self._request_once(path, params, known_newest_id)
+            except self._retryable_errors as e:
+                status_code = getattr(e, "status_code", None)
+                if status_code is not None and status_code not in RETRYABLE_STATUS_CODES:
+                    raise
+                if status_code == 429:
+                    self.stats.add(throttled=1)
+                    if self.metrics is not None:
+                        self.metrics.count("throttled")
+                    self.rate_limiter.throttled()
+                if attempt >= self.max_retries:
+                    raise
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after is not None:
+                    delay = min(retry_after, self.backoff_max)
+                    self.rate_limiter.pause(delay)
+                else:
+                    delay = self._backoff_delay(attempt)
+                self.stats.add(retries=1)
+                if self.metrics is not None:
+                    self.metrics.count("retries")
+                attempt += 1
+                time.sleep(delay)
+
+    def _request_once(self, path: str, params: Optional[Dict[str, Any]] = None, known_newest_id: Optional[str] = None) -> Any:
         url = f"{self.base_url}/{path.lstrip('/')}"
-        resp = self.session.get(url, params=params, timeout=self.timeout)
+        validator_key = None
+        cached = None
+        if known_newest_id is not None:
+            validator_key = (url, tuple(sorted((params or {}).items())))
+            cached = self._validators.get(validator_key)
+            if cached is not None and cached[2] != str(known_newest_id):
+                # 上次的响应之后调用方没有跟上（例如状态没有保存），需要完整的结果
+                cached = None
+        headers = dict(self.headers)
+        if cached is not None:
+            etag, last_modified = cached[0], cached[1]
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        metrics = self.metrics
+        started = time.perf_counter()
+        try:
+            resp = self.session.get(url, params=params, headers=headers, proxies=self.proxies, timeout=self.timeout)
+        except self._request_error as e:
+            if metrics is not None:
+                metrics.observe_request(path, time.perf_counter() - started, type(e).__name__)
+            raise
+        if metrics is not None:
+            metrics.observe_request(path, time.perf_counter() - started, resp.status_code, len(resp.content))
+        if resp.status_code == 304 and cached is not None:
+            # 服务器确认内容没有变化，最新投稿仍然是调用方已知的那一篇
+            self.stats.add(requests=1, not_modified=1, bytes_saved=cached[3])
+            if metrics is not None:
+                metrics.count("not_modified")
+                metrics.count("bytes_saved", cached[3])
+            return None
+        self.stats.add(requests=1, bytes=len(resp.content))
         if not resp.ok:
-            raise RuntimeError(
-                f"HTTP error {resp.status_code} {resp.reason} for {url}"
+            raise FanboxHTTPError(
+                f"HTTP error {resp.status_code} {resp.reason} for {url}",
+                resp.status_code,
+                parse_retry_after(resp.headers.get("Retry-After")),
             )
+        self.rate_limiter.succeeded()
+        started = time.perf_counter()
         try:
-            return resp.json()
+            data = loads_json(resp.content)
         except json.JSONDecodeError as e:
             raise RuntimeError(f"Invalid JSON response from {url}: {e}") from e
+        if metrics is not None:
+            metrics.add_time("json_decode", time.perf_counter() - started)
+
+        if validator_key is not None:
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+            items = data.get("body") if isinstance(data, dict) else None
+            if (etag or last_modified) and isinstance(items, list) and items and isinstance(items[0], dict):
+                self._validators[validator_key] = (etag, last_modified, str(items[0].get("id")), len(resp.content))
+            else:
+                self._validators.pop(validator_key, None)
+        return data
+
+    @staticmethod
+    def _iter_pages(
+        fetch_page: Callable[[int, str, str], List[FanboxPost]],
+        stop: Callable[[FanboxPost], bool],
+        first_page_size: int,
+        page_size: int,
+        max_posts: int,
+        next_page_size: Optional[int] = None,
+    ) -> Iterator[FanboxPost]:
+        """
+        按 maxPublishedDatetime / maxId 游标逐页产出投稿。
+        第一页只取 first_page_size 条，第二页取 next_page_size 条（默认为第一页的两倍），
+        之后每页翻倍直到 page_size；
+        某一页里出现 stop(post) 为真的投稿、返回不足一页或累计达到 max_posts 时不再请求下一页。
+        出现 stop 的那一页会完整产出，由调用方自己决定在哪里停下。
+        """
+        size = max(1, min(first_page_size, page_size))
+        next_size = next_page_size or size * 2
+        cursor_datetime = ""
+        cursor_id = ""
+        yielded = 0
+        while yielded < max_posts:
+            size = min(size, max_posts - yielded)
+            posts = fetch_page(size, cursor_datetime, cursor_id)
+            # 游标本身不应再次出现，以防服务器按闭区间返回
+            page = [p for p in posts if not cursor_id or p.id != cursor_id]
+            yield from page
+            yielded += len(page)
+            if len(posts) < size or not page or any(stop(p) for p in page):
+                return
+            cursor_datetime, cursor_id = page[-1].published_datetime, page[-1].id
+            size = min(max(1, next_size), page_size)
+            next_size = size * 2
 
     # -------- 公开接口 --------
 
@@ -92,11 +482,7 @@ class FanboxAPI:
 
         返回原始 JSON（含 body.items）。
         """
-        params: Dict[str, Any] = {"limit": limit}
-        if max_published_datetime:
-            params["maxPublishedDatetime"] = max_published_datetime
-        if max_id:
-            params["maxId"] = max_id
+        params = build_posts_params(limit, max_published_datetime, max_id)
         return self._request("post.listSupporting", params=params)
 
     @staticmethod
@@ -105,29 +491,50 @@ class FanboxAPI:
         从 post.listSupporting 的返回值中解析出简单的帖子列表。
         """
         body = raw.get("body") or {}
-        items = body.get("items") or []
         result: List[FanboxPost] = []
-        for item in items:
+        append = result.append
+        for item in body.get("items") or ():
             try:
                 user = item.get("user") or {}
-                fee_required = int(item.get("feeRequired", 0) or 0)
-                result.append(
-                    FanboxPost(
-                        id=str(item.get("id")),
-                        title=str(item.get("title", "")),
-                        published_datetime=str(item.get("publishedDatetime", "")),
-                        updated_datetime=str(item.get("updatedDatetime", "")),
-                        creator_id=str(item.get("creatorId") or user.get("userId", "")),
-                        creator_name=str(user.get("name", "")),
-                        creator_icon_url=str(user.get("iconUrl", "")) if user.get("iconUrl") else None,
-                        fee_required=fee_required,
-                    )
-                )
+                # 按位置传参（顺序同 FanboxPost 的字段），比关键字参数快
+                append(FanboxPost(
+                    str(item.get("id")),
+                    str(item.get("title", "")),
+                    str(item.get("publishedDatetime", "")),
+                    str(item.get("updatedDatetime", "")),
+                    str(item.get("creatorId") or user.get("userId", "")),
+                    str(user.get("name", "")),
+                    str(user.get("iconUrl") or "") or None,
+                    int(item.get("feeRequired") or 0),
+                ))
             except Exception:
                 # 某条数据异常时，简单跳过
                 continue
         return result
 
+    def iter_supporting_posts(
+        self,
+        stop: Callable[[FanboxPost], bool],
+        first_page_size: int = 10,
+        page_size: int = 50,
+        max_posts: int = 200,
+    ) -> Iterator[FanboxPost]:
+        """
+        逐页获取正在赞助的投稿，直到某一页出现 stop(post) 为真的投稿（通常是上次已经看到的投稿）。
+        没有新投稿时通常只需要请求一个很小的第一页。
+        """
+        def fetch_page(limit: int, max_published_datetime: str, max_id: str) -> List[FanboxPost]:
+            raw = self.list_supporting_posts(limit, max_published_datetime, max_id)
+            started = time.perf_counter()
+            posts = self.parse_posts_from_supporting(raw)
+            if self.metrics is not None:
+                self.metrics.add_time("parse", time.perf_counter() - started)
+            if self.archive is not None:
+                self.archive.add(posts)
+            return posts
+
+        return self._iter_pages(fetch_page, stop, first_page_size, page_size, max_posts)
+
     def list_following_creators(self) -> List[Dict[str, Any]]:
         """
         获取关注的创作者列表。
@@ -137,6 +544,13 @@ class FanboxAPI:
         返回格式: [{creatorId: str, name: str, iconUrl: str}, ...]
         """
         raw = self._request("creator.listFollowing")
+        return self.parse_following_creators(raw)
+
+    @staticmethod
+    def parse_following_creators(raw: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        从 creator.listFollowing 的返回值中解析出创作者列表。
+        """
         body = raw.get("body") or []
         result: List[Dict[str, Any]] = []
         for creator in body:
@@ -151,54 +565,248 @@ class FanboxAPI:
                 continue
         return result
 
+    def list_supporting_creators(self) -> List[Dict[str, Any]]:
+        """
+        获取正在赞助的创作者列表（包括最近没有投稿的创作者）。
+        对应扩展里的 plan.listSupporting：
+        https://api.fanbox.cc/plan.listSupporting
+
+        返回格式同 list_following_creators。
+        """
+        raw = self._request("plan.listSupporting")
+        return self.parse_supporting_plans(raw)
+
+    @staticmethod
+    def parse_supporting_plans(raw: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        从 plan.listSupporting 的返回值中解析出创作者列表，每个创作者只保留一次。
+        """
+        body = raw.get("body") or []
+        result: List[Dict[str, Any]] = []
+        seen = set()
+        for plan in body:
+            try:
+                creator_id = str(plan.get("creatorId", ""))
+                if not creator_id or creator_id in seen:
+                    continue
+                seen.add(creator_id)
+                user = plan.get("user") or {}
+                result.append({
+                    "creatorId": creator_id,
+                    "name": str(user.get("name", "")),
+                    "iconUrl": str(user.get("iconUrl", "")) if user.get("iconUrl") else None,
+                })
+            except Exception:
+                continue
+        return result
+
     def list_creator_posts(
         self,
         creator_id: str,
         limit: int = 50,
         max_published_datetime: str = "",
         max_id: str = "",
-    ) -> Dict[str, Any]:
+        known_newest_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
         """
         获取单个创作者的投稿列表。
         对应扩展里的 post.listCreator：
         https://api.fanbox.cc/post.listCreator?creatorId=xxx
 
         返回原始 JSON（含 body.items）。
+        传入 known_newest_id 时发送条件请求，服务器确认最新投稿仍然是它时返回 None。
         """
-        params: Dict[str, Any] = {"creatorId": creator_id, "limit": limit}
-        if max_published_datetime:
-            params["maxPublishedDatetime"] = max_published_datetime
-        if max_id:
-            params["maxId"] = max_id
-        return self._request("post.listCreator", params=params)
+        params = build_posts_params(limit, max_published_datetime, max_id, creator_id=creator_id)
+        return self._request("post.listCreator", params=params, known_newest_id=known_newest_id)
+
+    def iter_creator_posts(
+        self,
+        creator_id: str,
+        creator_name: str,
+        creator_icon_url: Optional[str] = None,
+        until_id: Optional[str] = None,
+        first_page_size: int = 10,
+        page_size: int = 50,
+        max_posts: int = 200,
+        probe: bool = False,
+    ) -> Iterator[FanboxPost]:
+        """
+        逐页获取单个创作者的投稿，直到遇到 id 为 until_id 的投稿（上次看到的最新投稿）。
+        没有新投稿时只需要请求一个很小的第一页；短时间内发了很多投稿时会继续翻页，不会漏掉。
+        probe 为 True 时先只请求最新的一条（limit=1）：最新投稿没变就到此为止，
+        变了再从 first_page_size 条的页开始继续翻页。
+        第一页是条件请求：服务器返回 304（最新投稿仍然是 until_id）时不产出任何投稿。
+        """
+        def fetch_page(limit: int, max_published_datetime: str, max_id: str) -> List[FanboxPost]:
+            known_newest_id = until_id if not max_id else None
+            raw = self.list_creator_posts(creator_id, limit, max_published_datetime, max_id, known_newest_id)
+            if raw is None:
+                return []
+            started = time.perf_counter()
+            posts = self.parse_posts_from_creator(raw, creator_id, creator_name, creator_icon_url)
+            if self.metrics is not None:
+                self.metrics.add_time("parse", time.perf_counter() - started)
+            if self.archive is not None:
+                self.archive.add(posts)
+            return posts
+
+        def stop(post: FanboxPost) -> bool:
+            return until_id is not None and str(post.id) == str(until_id)
+
+        if probe:
+            return self._iter_pages(fetch_page, stop, 1, page_size, max_posts, next_page_size=first_page_size)
+        return self._iter_pages(fetch_page, stop, first_page_size, page_size, max_posts)
 
     @staticmethod
     def parse_posts_from_creator(raw: Dict[str, Any], creator_id: str, creator_name: str, creator_icon_url: Optional[str] = None) -> List[FanboxPost]:
         """
         从 post.listCreator 的返回值中解析出简单的帖子列表。
+        item 里没有创作者信息时使用传入的 creator_id / creator_name / creator_icon_url。
         """
-        body = raw.get("body") or {}
-        items = body
         result: List[FanboxPost] = []
-        for item in items:
+        append = result.append
+        for item in raw.get("body") or ():
             try:
                 user = item.get("user") or {}
-                # 如果 item 里没有 user.iconUrl，使用传入的 creator_icon_url
-                icon_url = str(user.get("iconUrl", "")) if user.get("iconUrl") else creator_icon_url
-                fee_required = int(item.get("feeRequired", 0) or 0)
-                result.append(
-                    FanboxPost(
-                        id=str(item.get("id")),
-                        title=str(item.get("title", "")),
-                        published_datetime=str(item.get("publishedDatetime", "")),
-                        updated_datetime=str(item.get("updatedDatetime", "")),
-                        creator_id=str(item.get("creatorId") or creator_id),
-                        creator_name=str(user.get("name") or creator_name),
-                        creator_icon_url=icon_url if icon_url else None,
-                        fee_required=fee_required,
-                    )
-                )
+                # 按位置传参（顺序同 FanboxPost 的字段），比关键字参数快
+                append(FanboxPost(
+                    str(item.get("id")),
+                    str(item.get("title", "")),
+                    str(item.get("publishedDatetime", "")),
+                    str(item.get("updatedDatetime", "")),
+                    str(item.get("creatorId") or creator_id),
+                    str(user.get("name") or creator_name),
+                    str(user.get("iconUrl") or creator_icon_url or "") or None,
+                    int(item.get("feeRequired") or 0),
+                ))
             except Exception:
                 continue
         return result
 
+
+
+class AsyncFanboxAPI:
+    """
+    FanboxAPI 的 asyncio 版本，接口与 FanboxAPI 保持一致（方法均为协程），
+    解析函数直接复用 FanboxAPI 的静态方法。
+
+    所有请求共用一个 aiohttp 连接池（keep-alive），适合在一个事件循环里
+    同时轮询大量创作者 / 多个账号。需要额外安装 aiohttp：pip install aiohttp
+
+    用法：
+        async with AsyncFanboxAPI(cookie) as api:
+            raw = await api.list_creator_posts("creator_id")
+    """
+
+    parse_posts_from_supporting = staticmethod(FanboxAPI.parse_posts_from_supporting)
+    parse_following_creators = staticmethod(FanboxAPI.parse_following_creators)
+    parse_supporting_plans = staticmethod(FanboxAPI.parse_supporting_plans)
+    parse_posts_from_creator = staticmethod(FanboxAPI.parse_posts_from_creator)
+
+    def __init__(
+        self,
+        cookie: str,
+        base_url: str = "https://api.fanbox.cc",
+        timeout: int = 15,
+        extra_headers: Optional[Dict[str, str]] = None,
+        proxy: Optional[str] = None,
+        pool_size: int = 200,
+    ) -> None:
+        """
+        参数与 FanboxAPI 相同。
+        :param pool_size: 连接池最多同时保持的连接数，也即最多同时进行的请求数
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.proxy = proxy
+        self.pool_size = pool_size
+        self.headers = build_headers(cookie, extra_headers)
+        # aiohttp.ClientSession 必须在事件循环内创建，所以延迟到第一次请求时
+        self._session = None
+
+    async def __aenter__(self) -> "AsyncFanboxAPI":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            try:
+                import aiohttp
+            except ImportError as e:
+                raise RuntimeError("AsyncFanboxAPI 需要安装 aiohttp：pip install aiohttp") from e
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _request(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        session = self._get_session()
+        async with session.get(url, params=params, proxy=self.proxy) as resp:
+            if resp.status >= 400:
+                raise FanboxHTTPError(
+                    f"HTTP error {resp.status} {resp.reason} for {url}",
+                    resp.status,
+                    parse_retry_after(resp.headers.get("Retry-After")),
+                )
+            content = await resp.read()
+        try:
+            return loads_json(content)
+        except json.JSONDecodeError as e:
+            raise RuntimeError(f"Invalid JSON response from {url}: {e}") from e
+
+    # -------- 公开接口 --------
+
+    async def list_supporting_posts(
+        self,
+        limit: int = 50,
+        max_published_datetime: str = "",
+        max_id: str = "",
+    ) -> Dict[str, Any]:
+        """
+        同 FanboxAPI.list_supporting_posts。
+        """
+        params = build_posts_params(limit, max_published_datetime, max_id)
+        return await self._request("post.listSupporting", params=params)
+
+    async def list_following_creators(self) -> List[Dict[str, Any]]:
+        """
+        同 FanboxAPI.list_following_creators。
+        """
+        raw = await self._request("creator.listFollowing")
+        return self.parse_following_creators(raw)
+
+    async def list_supporting_creators(self) -> List[Dict[str, Any]]:
+        """
+        同 FanboxAPI.list_supporting_creators。
+        """
+        raw = await self._request("plan.listSupporting")
+        return self.parse_supporting_plans(raw)
+
+    async def list_creator_posts(
+        self,
+        creator_id: str,
+        limit: int = 50,
+        max_published_datetime: str = "",
+        max_id: str = "",
+    ) -> Dict[str, Any]:
+        """
+        同 FanboxAPI.list_creator_posts。
+        """
+        params = build_posts_params(limit, max_published_datetime, max_id, creator_id=creator_id)
+        return await self._request("post.listCreator", params=params)
@@ -0,0 +1,237 @@
+"""
+投稿历史归档：把检测过程中看到的每一篇投稿（post.listSupporting / post.listCreator 的解析结果）
+保存到本地的 SQLite 数据库，之后不需要再请求 Fanbox API 就能按创作者、发布时间和收费金额查询。
+
+在配置文件里设置 archive_file 后开启归档。查询：
+    python archive.py --creator nekoworks --since 2024-09-01 --min-fee 1000
+    python archive.py --title 新作 --limit 20 --json
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from api import FanboxPost, post_to_dict
+from scheduler import parse_published
+
+# 查询结果的列，顺序与 FanboxPost 的字段对应
+POST_COLUMNS = (
+    "id, title, published_datetime, updated_datetime, creator_id, creator_name, creator_icon_url, fee_required"
+)
+
+
+class PostArchive:
+    """
+    投稿归档（SQLite）。
+      - 每篇投稿按 id 只保存一行，标题、收费金额或更新时间变化时更新
+      - 索引覆盖按创作者 + 发布时间、按发布时间、按收费金额 + 发布时间三类查询，几十万篇投稿也只需要几毫秒
+    add() 可以在多个抓取线程里调用（只放进内存缓冲区），flush() 在一个事务里写入，只能在创建它的线程里调用。
+    使用 WAL 模式，查询命令可以在监控程序写入的同时读取。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS posts (
+        id TEXT PRIMARY KEY,
+        creator_id TEXT NOT NULL,
+        creator_name TEXT NOT NULL,
+        creator_icon_url TEXT,
+        title TEXT NOT NULL,
+        fee_required INTEGER NOT NULL DEFAULT 0,
+        published_at REAL NOT NULL,
+        published_datetime TEXT NOT NULL,
+        updated_datetime TEXT NOT NULL,
+        first_seen_at REAL NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_posts_creator_published ON posts (creator_id, published_at);
+    CREATE INDEX IF NOT EXISTS idx_posts_published ON posts (published_at);
+    CREATE INDEX IF NOT EXISTS idx_posts_fee_published ON posts (fee_required, published_at);
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0) -> None:
+        import sqlite3
+
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._pending: Dict[str, FanboxPost] = {}
+        self._lock = threading.Lock()
+
+    def add(self, posts: Iterable[FanboxPost]) -> None:
+        """
+        记录看到的投稿，flush() 时写入。同一篇投稿多次出现时只保留最后一次。
+        """
+        with self._lock:
+            for post in posts:
+                self._pending[post.id] = post
+
+    def flush(self) -> int:
+        """
+        把缓冲区里的投稿写入数据库，返回新增或更新的行数（没有变化的投稿不会写入）。
+        """
+        with self._lock:
+            posts = list(self._pending.values())
+            self._pending.clear()
+        if not posts:
+            return 0
+        now = time.time()
+        rows = [
+            (
+                p.id, p.creator_id, p.creator_name, p.creator_icon_url, p.title, p.fee_required,
+                parse_published(p.published_datetime) or 0.0, p.published_datetime, p.updated_datetime, now,
+            )
+            for p in posts
+        ]
+        cur = self._conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            before = self._conn.total_changes
+            cur.executemany(
+                "INSERT INTO posts (id, creator_id, creator_name, creator_icon_url, title, fee_required, "
+                "published_at, published_datetime, updated_datetime, first_seen_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET "
+                "creator_name = excluded.creator_name, creator_icon_url = excluded.creator_icon_url, "
+                "title = excluded.title, fee_required = excluded.fee_required, "
+                "updated_datetime = excluded.updated_datetime "
+                "WHERE posts.updated_datetime != excluded.updated_datetime "
+                "OR posts.title != excluded.title OR posts.fee_required != excluded.fee_required",
+                rows,
+            )
+            written = self._conn.total_changes - before
+            cur.execute("COMMIT")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+        return written
+
+    def query(
+        self,
+        creator_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        min_fee: Optional[int] = None,
+        max_fee: Optional[int] = None,
+        title: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[FanboxPost]:
+        """
+        按条件查询投稿，按发布时间从新到旧排列。
+        :param since / until: 发布时间的范围（时间戳，包含 since，不包含 until）
+        :param min_fee / max_fee: 收费金额的范围（日元，两端都包含）
+        :param title: 标题中包含的文字
+        :param limit: 最多返回多少条，0 表示不限制
+        """
+        where: List[str] = []
+        args: List[Any] = []
+        if creator_id is not None:
+            where.append("creator_id = ?")
+            args.append(creator_id)
+        if since is not None:
+            where.append("published_at >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("published_at < ?")
+            args.append(until)
+        if min_fee is not None:
+            where.append("fee_required >= ?")
+            args.append(min_fee)
+        if max_fee is not None:
+            where.append("fee_required <= ?")
+            args.append(max_fee)
+        if title:
+            where.append("instr(title, ?) > 0")
+            args.append(title)
+        sql = f"SELECT {POST_COLUMNS} FROM posts"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY published_at DESC"
+        if limit > 0:
+            sql += " LIMIT ?"
+            args.append(limit)
+        return [FanboxPost(*row) for row in self._conn.execute(sql, args)]
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+
+def parse_time(value: str) -> float:
+    """
+    解析命令行里的日期或时间（例如 2024-09-01 或 2024-09-01T12:00:00+09:00），没有时区时按本地时间。
+    """
+    timestamp = parse_published(value)
+    if timestamp is None:
+        raise argparse.ArgumentTypeError(f"无法解析的时间: {value}")
+    return timestamp
+
+
+def format_post(post: FanboxPost) -> str:
+    published = datetime.fromtimestamp(parse_published(post.published_datetime) or 0).strftime("%Y-%m-%d %H:%M")
+    return (
+        f"{published}  {post.fee_required:>6}日元  {post.creator_name} ({post.creator_id})  {post.title}  "
+        f"https://www.fanbox.cc/@{post.creator_id}/posts/{post.id}"
+    )
+
+
+def archive_file_from_config(config_path: str) -> Optional[str]:
+    from config import load_config
+
+    return load_config(config_path).archive_file
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Query the local Fanbox post archive")
+    parser.add_argument("--config", default="fanbox_monitor_config.json", help="配置文件路径（读取其中的 archive_file）")
+    parser.add_argument("--archive-file", help="直接指定归档数据库，优先于配置文件")
+    parser.add_argument("--creator", help="创作者 id（creatorId）")
+    parser.add_argument("--since", type=parse_time, help="发布时间不早于（例如 2024-09-01）")
+    parser.add_argument("--until", type=parse_time, help="发布时间早于（例如 2024-10-01）")
+    parser.add_argument("--min-fee", type=int, help="最低收费金额（日元）")
+    parser.add_argument("--max-fee", type=int, help="最高收费金额（日元）")
+    parser.add_argument("--title", help="标题中包含的文字")
+    parser.add_argument("--limit", type=int, default=50, help="最多显示多少条，0 表示不限制")
+    parser.add_argument("--json", action="store_true", help="每行输出一个 JSON 对象")
+    parser.add_argument("--count", action="store_true", help="只显示归档中的投稿总数")
+    args = parser.parse_args(argv)
+
+    path = args.archive_file
+    if not path:
+        try:
+            path = archive_file_from_config(args.config)
+        except Exception as e:
+            print(f"读取配置失败: {e}", file=sys.stderr)
+            sys.exit(1)
+        if not path:
+            print("配置文件中没有设置 archive_file，也没有指定 --archive-file。", file=sys.stderr)
+            sys.exit(1)
+
+    archive = PostArchive(path)
+    try:
+        if args.count:
+            print(archive.count())
+            return
+        started = time.perf_counter()
+        posts = archive.query(
+            args.creator, args.since, args.until, args.min_fee, args.max_fee, args.title, args.limit
+        )
+        elapsed = time.perf_counter() - started
+        for post in posts:
+            if args.json:
+                print(json.dumps(post_to_dict(post), ensure_ascii=False))
+            else:
+                print(format_post(post))
+        print(f"{len(posts)} 条，查询耗时 {elapsed * 1000:.1f} ms", file=sys.stderr)
+    finally:
+        archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+投稿归档（archive.py）的基准：用合成数据（与 bench/mock_server.py 相同）填充一个临时归档，
+测量写入速度、数据库大小，以及几类典型查询的耗时（取多次中最快的一次）。
+
+用法：
+    python bench/bench_archive.py
+    python bench/bench_archive.py --creators 2000 --posts 300
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+
+from api import FanboxAPI  # noqa: E402
+from archive import PostArchive  # noqa: E402
+from mock_server import EPOCH, SyntheticFanbox  # noqa: E402
+
+
+def best_ms(func: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the post archive")
+    parser.add_argument("--creators", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=300, help="每个创作者的投稿数")
+    parser.add_argument("--repeat", type=int, default=20, help="每个查询重复次数")
+    args = parser.parse_args()
+
+    data = SyntheticFanbox(creators=args.creators, posts_per_creator=args.posts)
+    workdir = tempfile.mkdtemp(prefix="fanbox_archive_")
+    path = os.path.join(workdir, "archive.db")
+    archive = PostArchive(path)
+
+    started = time.perf_counter()
+    total = 0
+    for k in range(args.creators):
+        raw = {"body": data.list_creator(k, args.posts, None)}
+        posts = FanboxAPI.parse_posts_from_creator(raw, data.creator_id(k), f"Creator {k}", None)
+        archive.add(posts)
+        total += len(posts)
+        # 按每批约 1 万篇写入，与守护模式下每轮写入的量级相当
+        if total % 10000 < args.posts:
+            archive.flush()
+    archive.flush()
+    insert_s = time.perf_counter() - started
+    rewrite_ms = best_ms(lambda: (archive.add(posts), archive.flush()), 3)
+    print(f"posts: {archive.count()}, insert: {insert_s:.2f} s ({total / insert_s:,.0f} posts/s), "
+          f"db size: {os.path.getsize(path) / 1e6:.1f} MB, re-flush {len(posts)} unchanged posts: {rewrite_ms:.1f} ms")
+
+    epoch = EPOCH.timestamp()
+    month = 30 * 24 * 3600
+    creator = data.creator_id(args.creators // 2)
+    queries: Dict[str, Dict[str, Any]] = {
+        "latest 50": {},
+        "creator, all": {"creator_id": creator, "limit": 0},
+        "creator, last month, fee>=1000": {
+            "creator_id": creator, "since": epoch - month, "until": epoch, "min_fee": 1000, "limit": 0,
+        },
+        "all creators, one day": {"since": epoch - 24 * 3600, "until": epoch, "limit": 0},
+        "fee>=3000, latest 50": {"min_fee": 3000},
+        "creator, title contains": {"creator_id": creator, "title": "#42", "limit": 0},
+        # 标题的模糊匹配无法使用索引，没有其他条件时需要扫描整个表
+        "title contains (full scan)": {"title": "#42", "limit": 0},
+    }
+    header = f"{'query':<34} {'rows':>7} {'ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, kwargs in queries.items():
+        rows = len(archive.query(**kwargs))
+        print(f"{name:<34} {rows:>7} {best_ms(lambda: archive.query(**kwargs), args.repeat):>8.2f}")
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+解析路径的微基准：对 1 / 10 / 50 条投稿的 post.listCreator 响应，分别测量
+  - JSON 解码（标准库 json 和 orjson）
+  - parse_posts_from_creator 把解码后的数据转换成 FanboxPost
+  - 解码 + 转换的整条路径（FanboxAPI 实际使用的解码器）
+每页的耗时（微秒）、转换时分配的内存峰值，以及得到的 FanboxPost 列表占用的内存。
+
+用法：
+    python bench/bench_parse.py
+    python bench/bench_parse.py --sizes 10,50,300 --number 5000
+"""
+import argparse
+import json
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+
+from api import FanboxAPI, FanboxPost, loads_json  # noqa: E402
+from mock_server import SyntheticFanbox  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def per_call_us(func: Callable[[], object], number: int) -> float:
+    # 取 5 轮中最快的一轮，减少其他进程的干扰
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def allocations(func: Callable[[], object]) -> tuple:
+    """
+    返回 (调用过程中的内存峰值, 调用结束后结果仍占用的内存)，单位字节。
+    """
+    tracemalloc.start()
+    try:
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak, current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the post parsing path")
+    parser.add_argument("--sizes", default="1,10,50", help="逗号分隔的每页投稿数")
+    parser.add_argument("--number", type=int, default=2000, help="每轮调用次数")
+    args = parser.parse_args()
+
+    data = SyntheticFanbox(creators=10, posts_per_creator=300)
+    print(f"orjson: {'yes' if orjson is not None else 'no'}; FanboxPost __slots__: {hasattr(FanboxPost, '__slots__')}")
+    header = f"{'posts':>6} {'bytes':>8} {'json us':>9} {'orjson us':>10} {'parse us':>9} {'total us':>9} {'parse peak B':>13} {'posts B':>9}"
+    print(header)
+    print("-" * len(header))
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        payload = json.dumps({"body": data.list_creator(3, size, None)}, ensure_ascii=False).encode("utf-8")
+        raw = json.loads(payload)
+
+        def parse() -> object:
+            return FanboxAPI.parse_posts_from_creator(raw, "creator3", "Creator 3", None)
+
+        def total() -> object:
+            return FanboxAPI.parse_posts_from_creator(loads_json(payload), "creator3", "Creator 3", None)
+
+        json_us = per_call_us(lambda: json.loads(payload), args.number)
+        orjson_us = per_call_us(lambda: orjson.loads(payload), args.number) if orjson is not None else float("nan")
+        parse_us = per_call_us(parse, args.number)
+        total_us = per_call_us(total, args.number)
+        peak, retained = allocations(parse)
+        print(
+            f"{size:>6} {len(payload):>8} {json_us:>9.1f} {orjson_us:>10.1f} {parse_us:>9.1f} {total_us:>9.1f} "
+            f"{peak:>13} {retained:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
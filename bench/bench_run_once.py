@@ -0,0 +1,217 @@
+"""
+端到端基准测试：对本地模拟服务器（bench/mock_server.py）运行 run_once，
+分别测量 10 / 100 / 1,000 / 10,000 个关注创作者时的耗时、请求数、下载量和内存峰值。
+
+每个规模启动一个新的模拟服务器和一个新的测试进程（峰值 RSS 只增不减，必须分开测），依次测三个阶段：
+  - cold：第一次运行，没有任何状态
+  - idle：没有新投稿时的再次运行（最常见的情况）
+  - burst：10% 的创作者各发布 3 篇新投稿后的运行，包括发送通知
+
+用法：
+    python bench/bench_run_once.py
+    python bench/bench_run_once.py --sizes 100,1000 --latency 0.02 --concurrency 16 --json results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+PHASES = ("cold", "idle", "burst")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_json(url: str) -> Dict[str, Any]:
+    with urllib.request.urlopen(url, timeout=10) as resp:
+        return json.loads(resp.read())
+
+
+def peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 的单位是 KB，macOS 上是字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_worker(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    在当前进程里对已经启动的模拟服务器运行三个阶段，返回每个阶段的测量结果。
+    """
+    from api import FanboxAPI
+    from config import CreatorMinFeeStore
+    from monitor import run_once
+    from notify import NotificationDispatcher
+    from state import open_state_store
+
+    fanbox_url = f"http://127.0.0.1:{args.port}"
+    bark_url = f"http://127.0.0.1:{args.bark_port}"
+    workdir = Path(tempfile.mkdtemp(prefix="fanbox_bench_"))
+    config_path = workdir / "config.json"
+    config_path.write_text("{}", encoding="utf-8")
+
+    api = FanboxAPI(
+        cookie="bench",
+        base_url=fanbox_url,
+        pool_size=max(10, args.concurrency),
+        rate_limit=args.rate_limit,
+        max_retries=args.max_retries,
+        backoff_base=0.1,
+        backoff_max=2.0,
+    )
+    state = open_state_store(str(workdir / "state.json"), args.state_backend)
+    fee_store = CreatorMinFeeStore(str(config_path), 0)
+    dispatcher = NotificationDispatcher(
+        str(workdir / "outbox.json"), workers=2, max_retries=1, backoff_base=0.1, bark_server=f"{bark_url}/push"
+    )
+
+    results: Dict[str, Any] = {"creators": args.size, "phases": {}}
+    get_json(f"{fanbox_url}/_control/stats?reset=1")
+    for phase in PHASES:
+        if phase == "burst":
+            get_json(f"{fanbox_url}/_control/advance?creators={max(1, args.size // 10)}&posts=3")
+        get_json(f"{bark_url}/_control/stats?reset=1")
+        started = time.perf_counter()
+        # run_once 会为每篇新投稿打印一行，不计入测量
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_once(
+                api, state, "bench", "bench", args.limit, True, fee_store, str(workdir / "creators.json"),
+                "en", args.concurrency, None, args.first_page_size, args.max_posts, args.probe, False, dispatcher,
+            )
+        elapsed = time.perf_counter() - started
+        server = get_json(f"{fanbox_url}/_control/stats?reset=1")
+        bark = get_json(f"{bark_url}/_control/stats?reset=1")
+        results["phases"][phase] = {
+            "wall_s": round(elapsed, 3),
+            "requests": server.get("requests", 0),
+            "bytes": server.get("bytes", 0),
+            "not_modified": server.get("not_modified", 0),
+            "injected_errors": server.get("injected_500", 0) + server.get("injected_429", 0),
+            "notifications": bark.get("notifications", 0),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+    dispatcher.close()
+    state.close()
+    return results
+
+
+def start_mock_server(args: argparse.Namespace, size: int, port: int, bark_port: int) -> subprocess.Popen:
+    cmd = [
+        sys.executable, str(ROOT / "bench" / "mock_server.py"),
+        "--port", str(port),
+        "--bark-port", str(bark_port),
+        "--creators", str(size),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+        "--rate-429", str(args.rate_429),
+        "--retry-after", "0.2",
+        "--seed", "1",
+    ]
+    proc = subprocess.Popen(cmd, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            get_json(f"http://127.0.0.1:{port}/_control/stats")
+            get_json(f"http://127.0.0.1:{bark_port}/_control/stats")
+            return proc
+        except OSError:
+            if time.monotonic() > deadline or proc.poll() is not None:
+                proc.kill()
+                raise RuntimeError("模拟服务器启动失败")
+            time.sleep(0.05)
+
+
+def worker_args(args: argparse.Namespace) -> List[str]:
+    options = [
+        "--limit", str(args.limit),
+        "--first-page-size", str(args.first_page_size),
+        "--max-posts", str(args.max_posts),
+        "--concurrency", str(args.concurrency),
+        "--rate-limit", str(args.rate_limit),
+        "--max-retries", str(args.max_retries),
+        "--state-backend", args.state_backend,
+    ]
+    if not args.probe:
+        options.append("--no-probe")
+    return options
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    header = f"{'creators':>9} {'phase':>6} {'wall s':>8} {'requests':>9} {'bytes':>12} {'304':>6} {'errors':>7} {'notify':>7} {'peak RSS MB':>12}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        for phase, m in result["phases"].items():
+            print(
+                f"{result['creators']:>9} {phase:>6} {m['wall_s']:>8.3f} {m['requests']:>9} {m['bytes']:>12} "
+                f"{m['not_modified']:>6} {m['injected_errors']:>7} {m['notifications']:>7} {m['peak_rss_mb']:>12.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark run_once against the local mock Fanbox server")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="逗号分隔的关注创作者数量")
+    parser.add_argument("--latency", type=float, default=0.005, help="模拟服务器每个请求的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外的随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的概率")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="返回 429 的概率")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--first-page-size", type=int, default=10)
+    parser.add_argument("--max-posts", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate-limit", type=float, default=0, help="客户端限速（每秒请求数），0 表示不限速")
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--state-backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--no-probe", dest="probe", action="store_false", help="不先用 limit=1 探测")
+    parser.add_argument("--json", help="把结果另外保存为 JSON 文件")
+    # 内部使用：在子进程中运行单个规模
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--bark-port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        port, bark_port = free_port(), free_port()
+        server = start_mock_server(args, size, port, bark_port)
+        try:
+            cmd = [
+                sys.executable, os.path.abspath(__file__), "--worker",
+                "--size", str(size), "--port", str(port), "--bark-port", str(bark_port),
+                *worker_args(args),
+            ]
+            out = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, text=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"done: {size} creators", file=sys.stderr)
+
+    print_table(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+启动时间基准：cron 方式每次运行都要重新启动解释器并导入所有模块，这部分时间在没有新投稿时占了大半。
+用 python -X importtime 测量 import monitor 的耗时，列出最慢的模块，
+并检查不应在启动时导入的重量级模块（requests、onepush、sqlite3 等只在真正用到时才导入）。
+
+有模块被提前导入，或设置了 --max-ms 且导入耗时超过它时以状态码 1 退出，可以放进 CI 里防止启动变慢。
+
+用法：
+    python bench/bench_startup.py
+    python bench/bench_startup.py --repeat 10 --top 20 --max-ms 80
+"""
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# import monitor 时不应导入的模块：只在发送请求（含 TLS 和 HTTP/2）、发送通知、使用 SQLite 后端、
+# 开启 /metrics 或计算发帖间隔时才需要
+LAZY_MODULES = (
+    "requests",
+    "urllib3",
+    "onepush",
+    "aiohttp",
+    "sqlite3",
+    "http.server",
+    "statistics",
+    "concurrent.futures",
+    "email.utils",
+    "transport",
+    "ssl",
+    "httpx",
+)
+
+
+def import_times() -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    在新的解释器里 import monitor 一次，返回 ({模块: 自身耗时 us}, {模块: 累计耗时 us})。
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import monitor"],
+        cwd=ROOT,
+        stderr=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        text=True,
+        check=True,
+    )
+    self_us: Dict[str, int] = {}
+    cumulative_us: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        name = name.strip()
+        self_us[name] = int(own)
+        cumulative_us[name] = int(cumulative)
+    return self_us, cumulative_us
+
+
+def wall_ms(argv: List[str], repeat: int) -> float:
+    """
+    运行命令 repeat 次，返回最快一次的耗时（毫秒），包括解释器启动。
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(argv, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the import time of monitor.py")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最快的一次")
+    parser.add_argument("--top", type=int, default=15, help="列出最慢的多少个模块")
+    parser.add_argument("--max-ms", type=float, default=0, help="import monitor 的耗时上限（毫秒），0 表示不检查")
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(max(1, args.repeat))]
+    # 每个模块取各次中最快的值，减少磁盘缓存和其他进程的干扰
+    best_self = {name: min(r[0].get(name, 0) for r in runs) for name in runs[0][0]}
+    best_cumulative = {name: min(r[1].get(name, 0) for r in runs) for name in runs[0][1]}
+    monitor_ms = best_cumulative.get("monitor", 0) / 1000
+
+    print(f"{'python -c pass':<32} {wall_ms([sys.executable, '-c', 'pass'], args.repeat):>8.1f} ms")
+    print(f"{'python monitor.py --help':<32} {wall_ms([sys.executable, 'monitor.py', '--help'], args.repeat):>8.1f} ms")
+    print(f"{'import monitor':<32} {monitor_ms:>8.1f} ms")
+    print()
+    header = f"{'module':<40} {'self ms':>8} {'cumulative ms':>14}"
+    print(header)
+    print("-" * len(header))
+    for name, us in sorted(best_self.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<40} {us / 1000:>8.2f} {best_cumulative[name] / 1000:>14.2f}")
+
+    failed = False
+    loaded = [m for m in LAZY_MODULES if m in runs[0][0]]
+    if loaded:
+        print(f"\n以下模块应该在用到时才导入，但 import monitor 时已经导入: {', '.join(loaded)}", file=sys.stderr)
+        failed = True
+    if args.max_ms and monitor_ms > args.max_ms:
+        print(f"\nimport monitor 耗时 {monitor_ms:.1f} ms，超过上限 {args.max_ms:.1f} ms", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
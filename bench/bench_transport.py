@@ -0,0 +1,309 @@
+"""
+传输层（transport.py）的基准：在本地启动一个代替 api.fanbox.cc 的 TLS 服务器（openssl 生成的自签名证书），
+为每次 TCP 握手、TLS 握手（TLS 1.3 一个往返；TLS 1.2 完整握手两个、恢复会话一个）和每个请求加入 --rtt 的往返延迟，
+为每次 DNS 解析加入 --dns 的延迟，比较三种会话拿到响应的时间：
+  - baseline：原来的会话（requests 默认的 HTTPAdapter，每个新连接重新加载 CA 证书包）
+  - requests：transport="requests"（共用 SSLContext、TLS 会话恢复、DNS 缓存文件）
+  - httpx：transport="httpx"（HTTP/2 多路复用；需要 pip install "httpx[http2]"，没有安装时跳过）
+场景：
+  - cold：新建会话后的第一个请求（DNS 缓存文件是上一次运行留下的；TLS 会话不能跨进程保存，仍是完整握手）
+  - reconnect：空闲连接断开后，同一个会话上的下一个请求
+  - burst：新建会话后同时发出 --concurrency 个请求，全部完成的时间
+CA 证书包为 certifi 加上测试证书，加载开销与实际相同。需要 openssl 命令。
+
+用法：
+    python bench/bench_transport.py
+    python bench/bench_transport.py --rtt 80 --dns 30 --tls12
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+
+import requests  # noqa: E402
+from requests.adapters import HTTPAdapter  # noqa: E402
+
+from api import FanboxAPI  # noqa: E402
+from mock_server import SyntheticFanbox  # noqa: E402
+from transport import DNSCache  # noqa: E402
+
+HOST = "fanbox.test"
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+except ImportError:
+    h2 = None
+
+
+def make_certificate(workdir: str) -> Dict[str, str]:
+    """
+    生成 fanbox.test 的自签名证书，并把它追加到 certifi 证书包的副本里。
+    """
+    cert, key, bundle = (os.path.join(workdir, name) for name in ("cert.pem", "key.pem", "bundle.pem"))
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1", "-nodes",
+            "-keyout", key, "-out", cert, "-days", "1", "-subj", f"/CN={HOST}", "-addext", f"subjectAltName=DNS:{HOST}",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    from requests.utils import DEFAULT_CA_BUNDLE_PATH
+
+    shutil.copyfile(DEFAULT_CA_BUNDLE_PATH, bundle)
+    with open(bundle, "a", encoding="ascii") as out, open(cert, encoding="ascii") as f:
+        out.write("\n" + f.read())
+    return {"cert": cert, "key": key, "bundle": bundle}
+
+
+class TLSServer:
+    """
+    模拟 api.fanbox.cc 的 TLS 服务器：HTTP/1.1 keep-alive，装有 h2 时通过 ALPN 提供 HTTP/2。
+    每个请求都返回同一个 post.listSupporting 响应。
+    """
+
+    def __init__(self, cert: str, key: str, rtt: float, tls12: bool) -> None:
+        self.rtt = rtt
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(cert, key)
+        if tls12:
+            self.context.maximum_version = ssl.TLSVersion.TLSv1_2
+        if h2 is not None:
+            self.context.set_alpn_protocols(["h2", "http/1.1"])
+        data = SyntheticFanbox(creators=20, supporting=20)
+        self.body = json.dumps({"body": {"items": data.list_supporting(10, None), "nextUrl": None}}).encode("utf-8")
+        self.handshakes = {"full": 0, "resumed": 0}
+        self._lock = threading.Lock()
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(128)
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            raw, _ = self.sock.accept()
+            threading.Thread(target=self._handle, args=(raw,), daemon=True).start()
+
+    def _handle(self, raw: socket.socket) -> None:
+        try:
+            conn = self.context.wrap_socket(raw, server_side=True)
+            resumed = conn.session_reused
+            rounds = 1 if conn.version() == "TLSv1.3" or resumed else 2
+            with self._lock:
+                self.handshakes["resumed" if resumed else "full"] += 1
+            time.sleep(self.rtt * rounds)
+            if conn.selected_alpn_protocol() == "h2":
+                self._serve_h2(conn)
+            else:
+                self._serve_http1(conn)
+        except (OSError, ssl.SSLError):
+            pass
+        finally:
+            raw.close()
+
+    def _serve_http1(self, conn: ssl.SSLSocket) -> None:
+        reader = conn.makefile("rb")
+        head = (
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=utf-8\r\n"
+            b"Content-Length: %d\r\n\r\n" % len(self.body)
+        )
+        while True:
+            line = reader.readline()
+            if not line:
+                return
+            while reader.readline() not in (b"\r\n", b"\n", b""):
+                pass
+            # 请求和响应的往返
+            time.sleep(self.rtt)
+            conn.sendall(head + self.body)
+
+    def _serve_h2(self, conn: ssl.SSLSocket) -> None:
+        h2conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        lock = threading.Lock()
+
+        def respond(stream_id: int) -> None:
+            with lock:
+                h2conn.send_headers(stream_id, [
+                    (":status", "200"),
+                    ("content-type", "application/json; charset=utf-8"),
+                    ("content-length", str(len(self.body))),
+                ])
+                size = h2conn.max_outbound_frame_size
+                for i in range(0, len(self.body), size):
+                    h2conn.send_data(stream_id, self.body[i:i + size], end_stream=i + size >= len(self.body))
+                conn.sendall(h2conn.data_to_send())
+
+        with lock:
+            h2conn.initiate_connection()
+            conn.sendall(h2conn.data_to_send())
+        while True:
+            data = conn.recv(65536)
+            if not data:
+                return
+            with lock:
+                events = h2conn.receive_data(data)
+                conn.sendall(h2conn.data_to_send())
+            for event in events:
+                if isinstance(event, h2.events.RequestReceived):
+                    # 每个请求各自一个往返，同一连接上的请求互不等待（多路复用）
+                    timer = threading.Timer(self.rtt, respond, (event.stream_id,))
+                    timer.daemon = True
+                    timer.start()
+
+
+def slow_resolver(delay: float) -> Callable[..., List]:
+    """
+    带延迟的 getaddrinfo：把 fanbox.test 解析到 127.0.0.1。
+    """
+    resolve = socket.getaddrinfo
+
+    def getaddrinfo(host: Any, port: Any, *args: Any, **kwargs: Any) -> List:
+        if host == HOST:
+            time.sleep(delay)
+            host = "127.0.0.1"
+        return resolve(host, port, *args, **kwargs)
+
+    return getaddrinfo
+
+
+def slow_connect(port: int, rtt: float) -> None:
+    """
+    连接到 port 时在客户端等待一个往返，模拟 TCP 握手。
+    在客户端模拟是因为握手完成之前客户端不能做别的（例如加载证书），在服务器端等待会和这些开销重叠。
+    """
+    connect = socket.socket.connect
+
+    def delayed(self: socket.socket, address: Any) -> None:
+        connect(self, address)
+        if isinstance(address, tuple) and address[1] == port:
+            time.sleep(rtt)
+
+    socket.socket.connect = delayed
+
+
+def baseline_api(base_url: str, pool_size: int) -> FanboxAPI:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return FanboxAPI("x", base_url=base_url, max_retries=0, session=session)
+
+
+def timed_ms(func: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+
+def run_variant(
+    make_api: Callable[[], FanboxAPI], repeat: int, concurrency: int
+) -> Dict[str, float]:
+    cold: List[float] = []
+    reconnect: List[float] = []
+    burst: List[float] = []
+    for _ in range(repeat):
+        # 会话的创建（加载证书等）也算在第一个请求的时间里
+        holder: List[FanboxAPI] = []
+        cold.append(timed_ms(lambda: holder.append(make_api()) or holder[0].list_supporting_posts(10)))
+        api = holder[0]
+        # 服务器关闭空闲连接之后：连接池清空，但会话（SSLContext、TLS 会话、DNS 缓存）还在
+        api.session.close()
+        reconnect.append(timed_ms(lambda: api.list_supporting_posts(10)))
+        api.session.close()
+
+        api = make_api()
+        with ThreadPoolExecutor(concurrency) as pool:
+            burst.append(timed_ms(lambda: list(pool.map(lambda _: api.list_supporting_posts(10), range(concurrency)))))
+        api.session.close()
+    return {
+        "cold": statistics.median(cold),
+        "reconnect": statistics.median(reconnect),
+        "burst": statistics.median(burst),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark time-to-first-response of the Fanbox API transports")
+    parser.add_argument("--rtt", type=float, default=50, help="模拟的往返延迟（毫秒）")
+    parser.add_argument("--dns", type=float, default=20, help="模拟的 DNS 解析延迟（毫秒）")
+    parser.add_argument("--tls12", action="store_true", help="服务器只支持 TLS 1.2（完整握手两个往返）")
+    parser.add_argument("--concurrency", type=int, default=8, help="burst 场景同时发出的请求数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个场景重复次数，取中位数")
+    args = parser.parse_args()
+
+    if shutil.which("openssl") is None:
+        print("需要 openssl 命令生成测试证书", file=sys.stderr)
+        sys.exit(1)
+    workdir = tempfile.mkdtemp(prefix="fanbox_transport_")
+    files = make_certificate(workdir)
+    # requests、transport 和 httpx 会话都从这个环境变量读取 CA 证书包
+    os.environ["REQUESTS_CA_BUNDLE"] = files["bundle"]
+    resolver = slow_resolver(args.dns / 1000)
+    socket.getaddrinfo = resolver
+    server = TLSServer(files["cert"], files["key"], args.rtt / 1000, args.tls12)
+    slow_connect(server.port, args.rtt / 1000)
+    base_url = f"https://{HOST}:{server.port}"
+    pool_size = max(10, args.concurrency)
+
+    # 上一次运行留下的 DNS 缓存文件
+    dns_file = os.path.join(workdir, "dns.json")
+    warm = DNSCache(dns_file, resolver=resolver)
+    warm.resolve(HOST, server.port)
+    warm.save()
+
+    def tuned(transport: str) -> Callable[[], FanboxAPI]:
+        return lambda: FanboxAPI(
+            "x", base_url=base_url, max_retries=0, pool_size=pool_size, transport=transport,
+            dns_cache=DNSCache(dns_file, resolver=resolver),
+        )
+
+    variants: Dict[str, Callable[[], FanboxAPI]] = {
+        "baseline": lambda: baseline_api(base_url, pool_size),
+        "requests": tuned("requests"),
+    }
+    try:
+        import httpx  # noqa: F401
+
+        if h2 is not None:
+            variants["httpx (HTTP/2)"] = tuned("httpx")
+    except ImportError:
+        pass
+    if len(variants) < 3:
+        print('没有安装 httpx[http2]，跳过 HTTP/2', file=sys.stderr)
+
+    print(f"rtt {args.rtt:g} ms, dns {args.dns:g} ms, {'TLS 1.2' if args.tls12 else 'TLS 1.3'}, "
+          f"burst of {args.concurrency}, median of {args.repeat}")
+    header = f"{'transport':<16} {'cold ms':>9} {'reconnect ms':>13} {'burst ms':>9} {'handshakes full/resumed':>24}"
+    print(header)
+    print("-" * len(header))
+    for name, make_api in variants.items():
+        before = dict(server.handshakes)
+        result = run_variant(make_api, args.repeat, args.concurrency)
+        full = server.handshakes["full"] - before["full"]
+        resumed = server.handshakes["resumed"] - before["resumed"]
+        print(f"{name:<16} {result['cold']:>9.1f} {result['reconnect']:>13.1f} {result['burst']:>9.1f} "
+              f"{f'{full}/{resumed}':>24}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
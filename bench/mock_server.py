@@ -0,0 +1,428 @@
+"""
+本地的 Fanbox API 和 Bark 模拟服务器，用于在不访问 api.fanbox.cc 的情况下测试和压测本项目。
+
+模拟的接口：
+  - post.listSupporting / plan.listSupporting / creator.listFollowing / post.listCreator（支持 limit / maxPublishedDatetime / maxId 分页和 ETag）
+  - Bark 推送（任意路径的 POST 都返回成功）
+  - /_control/stats：请求数、字节数和注入的错误数，?reset=1 时读取后清零
+  - /_control/advance?creators=K&posts=P：让前 K 个创作者各发布 P 篇新投稿
+
+创作者和投稿都是按编号计算出来的，不预先生成，一万个创作者也只占很少的内存。
+
+用法：
+    python bench/mock_server.py --creators 1000 --latency 0.02 --error-rate 0.01 --rate-429 0.01
+然后把 FanboxAPI 的 base_url 设为 http://127.0.0.1:18080，配置里的 bark_server 设为 http://127.0.0.1:18081/push。
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+JST = timezone(timedelta(hours=9))
+# 初始的投稿都发布在这个时间点之前，之后通过 /_control/advance 发布的投稿都在它之后
+EPOCH = datetime(2024, 1, 1, tzinfo=JST)
+FEES = (0, 100, 500, 1000, 3000)
+
+
+class SyntheticFanbox:
+    """
+    合成的 Fanbox 数据：creator{k} 有 posts[k] 篇投稿，第 j 篇的 id 和发布时间都由 (k, j) 算出。
+    初始投稿的发帖间隔因创作者而异（1 小时到 3 天），之后新发布的投稿每篇间隔一分钟，
+    所以新投稿总是比所有初始投稿都新，id 和发布时间都随 j 单调递增。
+    """
+
+    def __init__(self, creators: int, posts_per_creator: int = 20, supporting: int = 20) -> None:
+        self.creators = creators
+        self.supporting = min(supporting, creators)
+        self.initial_posts = posts_per_creator
+        self.posts = [posts_per_creator] * creators
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def creator_id(k: int) -> str:
+        return f"creator{k}"
+
+    @staticmethod
+    def creator_index(creator_id: str) -> Optional[int]:
+        if not creator_id.startswith("creator"):
+            return None
+        try:
+            return int(creator_id[len("creator"):])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def cadence(k: int) -> int:
+        return 3600 * (1 + k % 72)
+
+    def post_key(self, k: int, j: int) -> Tuple[str, int]:
+        """
+        返回第 k 个创作者第 j 篇投稿的 (发布时间, id)，用作分页游标的比较。
+        """
+        if j <= self.initial_posts:
+            offset = (j - self.initial_posts - 1) * self.cadence(k) + k % 3600
+        else:
+            offset = (j - self.initial_posts) * 60 + k % 60
+        published = EPOCH + timedelta(seconds=offset)
+        return published.isoformat(), k * 1000000 + j
+
+    def post(self, k: int, j: int) -> Dict[str, Any]:
+        published, post_id = self.post_key(k, j)
+        post_id = str(post_id)
+        creator_id = self.creator_id(k)
+        return {
+            "id": post_id,
+            "title": f"{creator_id} の投稿 #{j}",
+            "feeRequired": FEES[(k + j) % len(FEES)],
+            "publishedDatetime": published,
+            "updatedDatetime": published,
+            "tags": ["illust", f"tag{j % 7}"],
+            "isLiked": False,
+            "likeCount": (k * 31 + j * 17) % 500,
+            "commentCount": (k + j) % 20,
+            "isRestricted": (k + j) % 3 == 0,
+            "user": {
+                "userId": str(100000 + k),
+                "name": f"Creator {k}",
+                "iconUrl": f"https://pixiv.pximg.net/c/160x160_90_a2_g5/fanbox/public/images/user/{100000 + k}/icon.jpeg",
+            },
+            "creatorId": creator_id,
+            "hasAdultContent": False,
+            "cover": {
+                "type": "cover_image",
+                "url": f"https://pixiv.pximg.net/c/1200x630_90_a2_g5/fanbox/public/images/post/{post_id}/cover.jpeg",
+            },
+            "excerpt": "サンプルの本文です。" * 4,
+        }
+
+    def advance(self, creators: int, posts: int) -> None:
+        with self._lock:
+            for k in range(min(creators, self.creators)):
+                self.posts[k] += posts
+
+    def list_creator(self, k: int, limit: int, cursor: Optional[Tuple[str, int]]) -> List[Dict[str, Any]]:
+        items = []
+        for j in range(self.posts[k], 0, -1):
+            if cursor is not None and self.post_key(k, j) > cursor:
+                continue
+            items.append(self.post(k, j))
+            if len(items) >= limit:
+                break
+        return items
+
+    def list_supporting(self, limit: int, cursor: Optional[Tuple[str, int]]) -> List[Dict[str, Any]]:
+        candidates = []
+        for k in range(self.supporting):
+            taken = 0
+            for j in range(self.posts[k], 0, -1):
+                key = self.post_key(k, j)
+                if cursor is not None and key > cursor:
+                    continue
+                candidates.append((key, k, j))
+                taken += 1
+                # 每个创作者最多取 limit 条就够了
+                if taken >= limit:
+                    break
+        candidates.sort(reverse=True)
+        return [self.post(k, j) for _, k, j in candidates[:limit]]
+
+    def list_plans(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": str(500000 + k),
+                "title": "サポーター",
+                "fee": FEES[k % len(FEES)] or 100,
+                "creatorId": self.creator_id(k),
+                "user": {
+                    "userId": str(100000 + k),
+                    "name": f"Creator {k}",
+                    "iconUrl": f"https://pixiv.pximg.net/c/160x160_90_a2_g5/fanbox/public/images/user/{100000 + k}/icon.jpeg",
+                },
+            }
+            for k in range(self.supporting)
+        ]
+
+    def list_following(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "creatorId": self.creator_id(k),
+                "user": {
+                    "userId": str(100000 + k),
+                    "name": f"Creator {k}",
+                    "iconUrl": f"https://pixiv.pximg.net/c/160x160_90_a2_g5/fanbox/public/images/user/{100000 + k}/icon.jpeg",
+                },
+                "description": "",
+                "hasAdultContent": False,
+            }
+            for k in range(self.creators)
+        ]
+
+
+class Faults:
+    """
+    注入的延迟和错误。所有处理线程共用一个带锁的随机数生成器，给定 seed 时结果可复现。
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_429: float = 0.0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter) if self.jitter else self.latency
+
+    def pick(self) -> Optional[int]:
+        """
+        返回要注入的状态码（429 / 500），不注入时返回 None。
+        """
+        with self._lock:
+            r = self._random.random()
+        if r < self.rate_429:
+            return 429
+        if r < self.rate_429 + self.error_rate:
+            return 500
+        return None
+
+
+class Stats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._data: Dict[str, int] = {}
+
+    def add(self, **counters: int) -> None:
+        with self._lock:
+            for name, value in counters.items():
+                self._data[name] = self._data.get(name, 0) + value
+
+    def snapshot(self, reset: bool = False) -> Dict[str, int]:
+        with self._lock:
+            data = dict(self._data)
+            if reset:
+                self._data.clear()
+        return data
+
+
+def parse_cursor(query: Dict[str, List[str]]) -> Optional[Tuple[str, int]]:
+    max_published = (query.get("maxPublishedDatetime") or [""])[0]
+    max_id = (query.get("maxId") or [""])[0]
+    if not max_published:
+        return None
+    # 合成投稿的时间都是 +09:00，统一成同样的格式以便按字符串比较
+    try:
+        max_published = datetime.fromisoformat(max_published.replace("Z", "+00:00")).astimezone(JST).isoformat()
+        max_id_value = int(max_id) if max_id else sys.maxsize
+    except ValueError:
+        return None
+    return max_published, max_id_value
+
+
+class Handler(BaseHTTPRequestHandler):
+    # 使用 HTTP/1.1 以便客户端复用连接
+    protocol_version = "HTTP/1.1"
+    data: SyntheticFanbox
+    faults: Faults
+    stats: Stats
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> int:
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if payload:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        return len(payload)
+
+    def inject_fault(self) -> bool:
+        """
+        按配置注入延迟和错误，返回是否已经发送了错误响应。
+        """
+        delay = self.faults.delay()
+        if delay > 0:
+            time.sleep(delay)
+        status = self.faults.pick()
+        if status == 429:
+            self.stats.add(injected_429=1)
+            self.send_json(429, {"error": "too many requests"}, {"Retry-After": f"{self.faults.retry_after:g}"})
+            return True
+        if status == 500:
+            self.stats.add(injected_500=1)
+            self.send_json(500, {"error": "internal server error"})
+            return True
+        return False
+
+
+class FanboxHandler(Handler):
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+
+        if url.path.startswith("/_control/"):
+            self.control(endpoint, query)
+            return
+
+        if self.inject_fault():
+            return
+        limit = max(1, min(300, int((query.get("limit") or ["10"])[0])))
+        if endpoint == "post.listSupporting":
+            body: Any = {"items": self.data.list_supporting(limit, parse_cursor(query)), "nextUrl": None}
+        elif endpoint == "plan.listSupporting":
+            body = self.data.list_plans()
+        elif endpoint == "creator.listFollowing":
+            body = self.data.list_following()
+        elif endpoint == "post.listCreator":
+            k = self.data.creator_index((query.get("creatorId") or [""])[0])
+            if k is None or k >= self.data.creators:
+                self.stats.add(requests=1)
+                self.send_json(404, {"error": "general_error"})
+                return
+            body = self.data.list_creator(k, limit, parse_cursor(query))
+        else:
+            self.send_json(404, {"error": "not found"})
+            return
+
+        payload = json.dumps({"body": body}, ensure_ascii=False).encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(payload).hexdigest()
+        self.stats.add(requests=1, **{f"requests.{endpoint}": 1})
+        if self.headers.get("If-None-Match") == etag:
+            self.stats.add(not_modified=1)
+            self.send_json(304, None, {"ETag": etag})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(payload)
+        self.stats.add(bytes=len(payload))
+
+    def control(self, endpoint: str, query: Dict[str, List[str]]) -> None:
+        if endpoint == "stats":
+            reset = (query.get("reset") or ["0"])[0] == "1"
+            self.send_json(200, self.stats.snapshot(reset))
+        elif endpoint == "advance":
+            creators = int((query.get("creators") or ["1"])[0])
+            posts = int((query.get("posts") or ["1"])[0])
+            self.data.advance(creators, posts)
+            self.send_json(200, {"ok": True})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+
+class BarkHandler(Handler):
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self.inject_fault():
+            return
+        self.stats.add(notifications=1)
+        self.send_json(200, {"code": 200, "message": "success", "timestamp": int(time.time())})
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/_control/stats":
+            reset = (parse_qs(url.query).get("reset") or ["0"])[0] == "1"
+            self.send_json(200, self.stats.snapshot(reset))
+        else:
+            self.do_POST()
+
+
+def make_server(
+    handler: type,
+    port: int,
+    host: str = "127.0.0.1",
+    **attrs: Any,
+) -> ThreadingHTTPServer:
+    """
+    创建模拟服务器。attrs 会成为处理类的属性（data / faults / stats）。
+    """
+    handler_cls = type(handler.__name__, (handler,), attrs)
+    server = ThreadingHTTPServer((host, port), handler_cls)
+    server.daemon_threads = True
+    return server
+
+
+# 默认的 listen backlog 只有 5，并发请求多时连接会被拒绝或重置
+ThreadingHTTPServer.request_queue_size = 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock Fanbox API and Bark server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080, help="Fanbox API 端口")
+    parser.add_argument("--bark-port", type=int, default=18081, help="Bark 端口，0 表示不启动")
+    parser.add_argument("--creators", type=int, default=100, help="关注的创作者数量")
+    parser.add_argument("--supporting", type=int, default=20, help="其中正在赞助的创作者数量")
+    parser.add_argument("--posts", type=int, default=20, help="每个创作者初始的投稿数量")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="在固定延迟上额外增加的随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的概率")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="返回 429 的概率")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 响应里的 Retry-After（秒）")
+    parser.add_argument("--bark-latency", type=float, default=0.0, help="Bark 请求的固定延迟（秒）")
+    parser.add_argument("--bark-error-rate", type=float, default=0.0, help="Bark 返回 500 的概率")
+    parser.add_argument("--seed", type=int, default=None, help="随机数种子，用于复现错误注入")
+    args = parser.parse_args()
+
+    fanbox = make_server(
+        FanboxHandler,
+        args.port,
+        args.host,
+        data=SyntheticFanbox(args.creators, args.posts, args.supporting),
+        faults=Faults(args.latency, args.jitter, args.error_rate, args.rate_429, args.retry_after, args.seed),
+        stats=Stats(),
+    )
+    servers = [fanbox]
+    if args.bark_port:
+        servers.append(make_server(
+            BarkHandler,
+            args.bark_port,
+            args.host,
+            faults=Faults(args.bark_latency, 0.0, args.bark_error_rate, 0.0, 1.0, args.seed),
+            stats=Stats(),
+        ))
+    for server in servers[1:]:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(
+        f"Fanbox mock: http://{args.host}:{args.port}  Bark mock: "
+        + (f"http://{args.host}:{args.bark_port}/push" if args.bark_port else "disabled"),
+        file=sys.stderr,
+        flush=True,
+    )
+    try:
+        fanbox.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,29 @@
 import json
-from dataclasses import dataclass
+import os
+import stat
+import tempfile
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Any, Optional, Dict, List
 
 from i18n import get_language
+from notifiers import validate_target
+
+
+@dataclass
+class AccountConfig:
+    """
+    一个 Fanbox 账号的配置。多个账号在同一个进程里检测，各自有自己的 Cookie、代理、状态文件和通知目标。
+    """
+    name: str
+    cookie: str
+    proxy: Optional[str] = None
+    bark_key: Optional[str] = None
+    bark_group: str = "Fanbox更新跟踪"
+    check_following: bool = False
+    state_file: str = "fanbox_monitor_state.json"
+    creators_file: str = "fanbox_monitor_creators.json"
+    notifiers: List[Dict[str, Any]] = field(default_factory=list)
 
 
 @dataclass
@@ -18,6 +38,86 @@ class MonitorConfig:
     creators_file: str = "fanbox_monitor_creators.json"  # 保存赞助者和关注者列表的文件
     proxy: Optional[str] = None  # HTTP 代理地址，例如 "http://172.17.0.1:7890"，不设置则不使用代理
     language: Optional[str] = None  # 语言代码 (en, zh, zh-tw, ja, ko)，不设置则自动检测
+    concurrency: int = 4  # 检查关注者时并发请求的创作者数量，1 表示逐个顺序请求
+    state_backend: str = "json"  # 状态存储方式："json"（单个 JSON 文件）或 "sqlite"（带历史记录的 SQLite 数据库）
+    poll_interval: int = 300  # 守护模式（--daemon）下两次检测之间的间隔（秒）
+    adaptive_polling: bool = False  # 是否根据发帖节奏调整每个关注者的检查频率
+    min_poll_interval: int = 300  # 自适应轮询时每个关注者的最短检查间隔（秒）
+    max_poll_interval: int = 86400  # 自适应轮询时每个关注者的最长检查间隔（秒）
+    hourly_request_budget: int = 0  # 自适应轮询时每小时最多检查多少次关注者，0 表示不限制
+    schedule_file: str = "fanbox_monitor_schedule.json"  # 保存各关注者发帖节奏的文件
+    first_page_size: int = 10  # 检查关注者时第一页取多少条，没有找到上次的投稿时继续翻页（每页最多 limit 条）
+    max_posts: int = 200  # 每次检查最多向后翻到多少条投稿
+    probe_first: bool = True  # 检查关注者时先用 limit=1 探测最新投稿，没有变化就不再获取完整列表
+    print_stats: bool = False  # 是否在每次检查关注者后打印请求数、下载量和节省的流量
+    rate_limit: float = 0  # 每秒最多请求数（所有并发请求共用），收到 429 时会自动降速，0 表示不限速
+    rate_burst: int = 5  # 限速时允许的突发请求数
+    max_retries: int = 3  # 遇到 429 / 5xx / 网络错误时最多重试几次
+    backoff_base: float = 1.0  # 第一次重试前的等待时间（秒），之后每次翻倍并加入随机抖动；有 Retry-After 时以其为准
+    backoff_max: float = 60.0  # 单次重试等待时间的上限（秒）
+    notify_workers: int = 2  # 同时发送通知的线程数
+    notify_retries: int = 3  # 单条通知发送失败时最多重试几次
+    outbox_file: str = "fanbox_monitor_outbox.json"  # 保存未送达通知的文件，下次运行时重新发送
+    bark_server: Optional[str] = None  # 自建 Bark 服务器的推送地址，例如 "https://bark.example.com/push"，不设置则使用官方服务器
+    digest_threshold: int = 0  # 同一创作者一次有这么多篇新投稿时合并成一条摘要通知，0 表示不合并
+    digest_window: int = 0  # 发布时间相差多少秒以内的投稿才合并，0 表示本轮检测到的都合并
+    max_notifications_per_run: int = 0  # 每轮最多发送多少条通知，超过时合并成一条总摘要，0 表示不限制
+    metrics_file: Optional[str] = None  # 每次检测后写入 JSON 运行报告（各阶段耗时、各接口延迟、请求计数、最慢的创作者）的文件
+    metrics_port: int = 0  # 守护模式下提供 Prometheus 格式 /metrics 接口的端口，0 表示不提供
+    metrics_host: str = "127.0.0.1"  # /metrics 接口监听的地址
+    following_ttl: int = 3600  # 关注者列表和赞助中的创作者列表的缓存时间（秒），守护模式下过期前在后台刷新，0 表示每次都重新获取
+    archive_file: Optional[str] = None  # 保存所有看到过的投稿的 SQLite 数据库（用 archive.py 查询），不设置则不归档
+    event_output: Optional[str] = None  # 新投稿的 NDJSON 事件流："-" 为标准输出，"unix:路径" 为 Unix socket，其他为文件；不设置则不输出
+    event_file_max_bytes: int = 10 * 1024 * 1024  # 事件文件超过这个大小（字节）时轮转，0 表示不轮转
+    event_file_backups: int = 5  # 轮转时保留几个旧的事件文件
+    http_transport: str = "requests"  # 请求 Fanbox API 的方式："requests"（HTTP/1.1）或 "httpx"（HTTP/2，需要安装 httpx[http2]）
+    dns_cache_file: Optional[str] = None  # 保存 DNS 解析结果的文件，多次运行之间共用，不设置则只在进程内缓存
+    dns_cache_ttl: int = 300  # DNS 解析结果的缓存时间（秒），0 表示不缓存
+    notifiers: List[Dict[str, Any]] = field(default_factory=list)  # 通知目标（bark / webhook / telegram / file / onepush），不设置时使用 bark_key
+    accounts: List[AccountConfig] = field(default_factory=list)  # 要检测的账号；没有配置 accounts 时只有一个由顶层配置组成的账号
+
+
+def atomic_write_text(path: str, text: str) -> None:
+    """
+    原子地写入文本文件：先写到同目录下的临时文件，再用 os.replace 替换目标文件。
+    写入过程中崩溃或被杀掉时，目标文件要么是旧内容，要么是新内容，不会被截断。
+    目标文件已经存在时保留它的权限（mkstemp 创建的临时文件权限是 0600）。
+    """
+    p = Path(path)
+    try:
+        mode: Optional[int] = stat.S_IMODE(p.stat().st_mode)
+    except OSError:
+        mode = None
+    fd, tmp_path = tempfile.mkstemp(dir=str(p.parent), prefix=f".{p.name}.", suffix=".tmp")
+    try:
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, p)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_text_if_changed(path: str, text: str) -> bool:
+    """
+    文件内容与 text 相同时不写入，否则原子地写入。返回是否写入了文件。
+    避免每次运行都重写没有变化的文件（减少闪存写入，也不会触发文件同步工具）。
+    """
+    p = Path(path)
+    try:
+        if p.read_text(encoding="utf-8") == text:
+            return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    atomic_write_text(path, text)
+    return True
 
 
 def load_creator_min_fees(config_path: str) -> Dict[str, int]:
@@ -38,6 +138,19 @@ def load_creator_min_fees(config_path: str) -> Dict[str, int]:
     return {}
 
 
+def load_min_fee_defaults(path: str) -> Dict[str, int]:
+    """
+    读取单独保存的最小监听金额默认值（creator_id -> 金额），文件不存在或无法解析时返回空字典。
+    """
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if isinstance(data, dict):
+            return {str(k): int(v) for k, v in data.items()}
+    except Exception:
+        pass
+    return {}
+
+
 def save_creator_min_fees(config_path: str, creator_min_fees: Dict[str, int]) -> None:
     """
     将每个创作者的最小监听金额配置保存到配置文件。
@@ -54,7 +167,7 @@ def save_creator_min_fees(config_path: str, creator_min_fees: Dict[str, int]) ->
             data = {}
     
     data["creator_min_fees"] = creator_min_fees
-    p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_text_if_changed(config_path, json.dumps(data, ensure_ascii=False, indent=2))
 
 
 def ensure_creator_min_fee(config_path: str, creator_id: str, default_fee: int = 0) -> int:
@@ -70,6 +183,116 @@ def ensure_creator_min_fee(config_path: str, creator_id: str, default_fee: int =
     return creator_min_fees.get(creator_id, default_fee)
 
 
+class CreatorMinFeeStore:
+    """
+    每个创作者最小监听金额的内存缓存。
+    创建时读取一次配置文件，之后的查询都在内存中完成；
+    遇到新的创作者时先记下默认值，调用 flush() 时再一次性写回配置文件。
+    传入 defaults_file 时默认值写到这个单独的文件而不是配置文件（分片工作进程使用，见 shard.merge_min_fees），
+    多个进程不会同时改写同一个配置文件。
+    """
+
+    def __init__(self, config_path: str, default_fee: int = 0, defaults_file: Optional[str] = None) -> None:
+        self.config_path = config_path
+        self.default_fee = default_fee
+        self.defaults_file = defaults_file
+        self._fees = load_creator_min_fees(config_path)
+        if defaults_file is not None:
+            for creator_id, fee in load_min_fee_defaults(defaults_file).items():
+                self._fees.setdefault(creator_id, fee)
+        self._pending: Dict[str, int] = {}
+
+    def get(self, creator_id: str) -> int:
+        """
+        返回该创作者的最小监听金额；没有配置时使用默认值，并在 flush() 时写入配置文件。
+        """
+        fee = self._fees.get(creator_id)
+        if fee is None:
+            fee = self.default_fee
+            self._fees[creator_id] = fee
+            self._pending[creator_id] = fee
+        return fee
+
+    def flush(self) -> None:
+        """
+        将本次运行中新发现的创作者的默认值写回配置文件，没有新增时不做任何 I/O。
+        """
+        if not self._pending:
+            return
+        if self.defaults_file is not None:
+            defaults = load_min_fee_defaults(self.defaults_file)
+            defaults.update(self._pending)
+            write_text_if_changed(self.defaults_file, json.dumps(defaults, ensure_ascii=False, indent=2))
+            self._pending.clear()
+            return
+        # 写回前重新读取一次，只补充新增的创作者，避免覆盖运行期间用户手动修改过的值
+        creator_min_fees = load_creator_min_fees(self.config_path)
+        for creator_id, fee in self._pending.items():
+            creator_min_fees.setdefault(creator_id, fee)
+        save_creator_min_fees(self.config_path, creator_min_fees)
+        self._fees.update(creator_min_fees)
+        self._pending.clear()
+
+
+def account_file(path: str, account_name: str) -> str:
+    """
+    为某个账号生成独立的文件名，例如 fanbox_monitor_state.json -> fanbox_monitor_state.alice.json。
+    """
+    p = Path(path)
+    return str(p.with_name(f"{p.stem}.{account_name}{p.suffix}"))
+
+
+def parse_notifiers(raw_notifiers: Any, bark_key: Optional[str], where: str = "notifiers") -> List[Dict[str, Any]]:
+    """
+    解析通知目标列表（每一项的格式见 notifiers.py）。
+    没有配置 notifiers 时，填写了 bark_key 就只有一个 Bark 目标，否则不发送通知。
+    """
+    if raw_notifiers is None:
+        return [{"type": "bark", "key": bark_key}] if bark_key else []
+    if not isinstance(raw_notifiers, list):
+        raise ValueError(f"{where} 必须是列表。")
+    return [validate_target(target, where) for target in raw_notifiers]
+
+
+def parse_accounts(raw_accounts: Any, defaults: AccountConfig) -> List[AccountConfig]:
+    """
+    解析配置中的 accounts 列表。没有填写的项继承顶层配置（defaults），
+    state_file 和 creators_file 默认在顶层文件名后加上账号名，保证每个账号的状态互不干扰。
+    """
+    if not isinstance(raw_accounts, list) or not raw_accounts:
+        raise ValueError("accounts 必须是非空的列表。")
+    accounts: List[AccountConfig] = []
+    names = set()
+    for i, item in enumerate(raw_accounts):
+        if not isinstance(item, dict):
+            raise ValueError(f"accounts 的第 {i + 1} 项不是对象。")
+        name = str(item.get("name") or f"account{i + 1}")
+        if name in names:
+            raise ValueError(f"accounts 中的账号名 {name} 重复。")
+        names.add(name)
+        cookie = item.get("cookie") or ""
+        if not cookie:
+            raise ValueError(f"账号 {name} 缺少 cookie 字段。")
+        if "notifiers" in item:
+            notifiers = parse_notifiers(item["notifiers"], None, f"账号 {name} 的 notifiers")
+        elif item.get("bark_key"):
+            notifiers = parse_notifiers(None, item["bark_key"])
+        else:
+            notifiers = defaults.notifiers
+        accounts.append(AccountConfig(
+            name=name,
+            cookie=cookie,
+            proxy=item.get("proxy") or defaults.proxy,
+            bark_key=item.get("bark_key") or defaults.bark_key,
+            bark_group=item.get("bark_group") or defaults.bark_group,
+            check_following=bool(item.get("check_following", defaults.check_following)),
+            state_file=str(item.get("state_file") or account_file(defaults.state_file, name)),
+            creators_file=str(item.get("creators_file") or account_file(defaults.creators_file, name)),
+            notifiers=notifiers,
+        ))
+    return accounts
+
+
 def load_config(path: str = "fanbox_monitor_config.json") -> MonitorConfig:
     """
     从 JSON 文件加载配置。
@@ -84,8 +307,55 @@ def load_config(path: str = "fanbox_monitor_config.json") -> MonitorConfig:
       "min_fee_required": 0,
       "creators_file": "fanbox_monitor_creators.json",
       "proxy": "http://172.17.0.1:7890",
-      "language": "zh"
+      "language": "zh",
+      "concurrency": 4,
+      "state_backend": "json",
+      "poll_interval": 300,
+      "adaptive_polling": false,
+      "min_poll_interval": 300,
+      "max_poll_interval": 86400,
+      "hourly_request_budget": 0,
+      "schedule_file": "fanbox_monitor_schedule.json",
+      "first_page_size": 10,
+      "max_posts": 200,
+      "probe_first": true,
+      "print_stats": false,
+      "rate_limit": 0,
+      "rate_burst": 5,
+      "max_retries": 3,
+      "backoff_base": 1.0,
+      "backoff_max": 60,
+      "notify_workers": 2,
+      "notify_retries": 3,
+      "outbox_file": "fanbox_monitor_outbox.json",
+      "bark_server": "https://bark.example.com/push",
+      "digest_threshold": 0,
+      "digest_window": 0,
+      "max_notifications_per_run": 0,
+      "metrics_file": "fanbox_monitor_metrics.json",
+      "metrics_port": 0,
+      "metrics_host": "127.0.0.1",
+      "following_ttl": 3600,
+      "archive_file": "fanbox_monitor_archive.db",
+      "event_output": "fanbox_monitor_events.ndjson",
+      "event_file_max_bytes": 10485760,
+      "event_file_backups": 5,
+      "http_transport": "requests",
+      "dns_cache_file": "fanbox_monitor_dns.json",
+      "dns_cache_ttl": 300,
+      "notifiers": [
+        {"type": "bark", "key": "...", "server": "https://bark.example.com/push"},
+        {"type": "webhook", "url": "https://example.com/hook", "headers": {"Authorization": "Bearer ..."}},
+        {"type": "telegram", "token": "123456:ABC...", "chat_id": "123456789"},
+        {"type": "file", "path": "fanbox_monitor_notifications.jsonl"}
+      ]
     }
+    同一个进程里检测多个账号时，使用 accounts 列表代替顶层的 cookie，
+    其中没有填写的项继承顶层配置：
+      "accounts": [
+        {"name": "alice", "cookie": "...", "bark_key": "...", "check_following": true},
+        {"name": "bob", "cookie": "...", "proxy": "http://172.17.0.1:7890", "state_file": "bob_state.json"}
+      ]
     """
     p = Path(path)
     if not p.exists():
@@ -94,7 +364,7 @@ def load_config(path: str = "fanbox_monitor_config.json") -> MonitorConfig:
         )
     data = json.loads(p.read_text(encoding="utf-8"))
     cookie = data.get("cookie") or ""
-    if not cookie:
+    if not cookie and not data.get("accounts"):
         raise ValueError("配置文件中缺少 cookie 字段。")
     limit = int(data.get("limit") or 50)
     state_file = str(data.get("state_file") or "fanbox_monitor_state.json")
@@ -105,6 +375,61 @@ def load_config(path: str = "fanbox_monitor_config.json") -> MonitorConfig:
     creators_file = str(data.get("creators_file") or "fanbox_monitor_creators.json")
     proxy = data.get("proxy") or None
     language = data.get("language") or None
+    concurrency = max(1, int(data.get("concurrency") or 4))
+    state_backend = str(data.get("state_backend") or "json")
+    if state_backend not in ("json", "sqlite"):
+        raise ValueError(f"state_backend 只能是 json 或 sqlite，当前为 {state_backend}。")
+    poll_interval = max(1, int(data.get("poll_interval") or 300))
+    adaptive_polling = bool(data.get("adaptive_polling") or False)
+    min_poll_interval = max(1, int(data.get("min_poll_interval") or 300))
+    max_poll_interval = max(min_poll_interval, int(data.get("max_poll_interval") or 86400))
+    hourly_request_budget = max(0, int(data.get("hourly_request_budget") or 0))
+    schedule_file = str(data.get("schedule_file") or "fanbox_monitor_schedule.json")
+    first_page_size = max(1, int(data.get("first_page_size") or 10))
+    max_posts = max(limit, int(data.get("max_posts") or 200))
+    probe_first = bool(data.get("probe_first", True))
+    print_stats = bool(data.get("print_stats") or False)
+    rate_limit = max(0.0, float(data.get("rate_limit") or 0))
+    rate_burst = max(1, int(data.get("rate_burst") or 5))
+    max_retries = max(0, int(data.get("max_retries", 3) or 0))
+    backoff_base = max(0.0, float(data.get("backoff_base", 1.0) or 0))
+    backoff_max = max(backoff_base, float(data.get("backoff_max") or 60.0))
+    notify_workers = max(1, int(data.get("notify_workers") or 2))
+    notify_retries = max(0, int(data.get("notify_retries", 3) or 0))
+    outbox_file = str(data.get("outbox_file") or "fanbox_monitor_outbox.json")
+    bark_server = data.get("bark_server") or None
+    digest_threshold = max(0, int(data.get("digest_threshold") or 0))
+    digest_window = max(0, int(data.get("digest_window") or 0))
+    max_notifications_per_run = max(0, int(data.get("max_notifications_per_run") or 0))
+    metrics_file = data.get("metrics_file") or None
+    metrics_port = max(0, int(data.get("metrics_port") or 0))
+    metrics_host = str(data.get("metrics_host") or "127.0.0.1")
+    following_ttl = max(0, int(data.get("following_ttl", 3600) or 0))
+    archive_file = data.get("archive_file") or None
+    event_output = data.get("event_output") or None
+    event_file_max_bytes = max(0, int(data.get("event_file_max_bytes", 10 * 1024 * 1024) or 0))
+    event_file_backups = max(0, int(data.get("event_file_backups", 5) or 0))
+    http_transport = str(data.get("http_transport") or "requests")
+    if http_transport not in ("requests", "httpx"):
+        raise ValueError(f"http_transport 只能是 requests 或 httpx，当前为 {http_transport}。")
+    dns_cache_file = data.get("dns_cache_file") or None
+    dns_cache_ttl = max(0, int(data.get("dns_cache_ttl", 300) or 0))
+    notifiers = parse_notifiers(data.get("notifiers"), bark_key)
+    default_account = AccountConfig(
+        name="default",
+        cookie=cookie,
+        proxy=proxy,
+        bark_key=bark_key,
+        bark_group=bark_group,
+        check_following=check_following,
+        state_file=state_file,
+        creators_file=creators_file,
+        notifiers=notifiers,
+    )
+    if data.get("accounts"):
+        accounts = parse_accounts(data["accounts"], default_account)
+    else:
+        accounts = [default_account]
     # 获取实际使用的语言
     language = get_language(language)
     return MonitorConfig(
@@ -118,5 +443,42 @@ def load_config(path: str = "fanbox_monitor_config.json") -> MonitorConfig:
         creators_file=creators_file,
         proxy=proxy,
         language=language,
+        concurrency=concurrency,
+        state_backend=state_backend,
+        poll_interval=poll_interval,
+        adaptive_polling=adaptive_polling,
+        min_poll_interval=min_poll_interval,
+        max_poll_interval=max_poll_interval,
+        hourly_request_budget=hourly_request_budget,
+        schedule_file=schedule_file,
+        first_page_size=first_page_size,
+        max_posts=max_posts,
+        probe_first=probe_first,
+        print_stats=print_stats,
+        rate_limit=rate_limit,
+        rate_burst=rate_burst,
+        max_retries=max_retries,
+        backoff_base=backoff_base,
+        backoff_max=backoff_max,
+        notify_workers=notify_workers,
+        notify_retries=notify_retries,
+        outbox_file=outbox_file,
+        bark_server=bark_server,
+        digest_threshold=digest_threshold,
+        digest_window=digest_window,
+        max_notifications_per_run=max_notifications_per_run,
+        metrics_file=metrics_file,
+        metrics_port=metrics_port,
+        metrics_host=metrics_host,
+        following_ttl=following_ttl,
+        archive_file=archive_file,
+        event_output=event_output,
+        event_file_max_bytes=event_file_max_bytes,
+        event_file_backups=event_file_backups,
+        http_transport=http_transport,
+        dns_cache_file=dns_cache_file,
+        dns_cache_ttl=dns_cache_ttl,
+        notifiers=notifiers,
+        accounts=accounts,
     )
 
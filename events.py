@@ -0,0 +1,276 @@
+"""
+新投稿的事件流：检测到新投稿时立即写出一行 JSON（NDJSON），供其他程序逐条处理，
+不必等检测结束后再解析日志。
+
+每行一个事件，例如：
+    {"event": "new_post", "source": "following", "account": "default", "detected_at": "2024-09-01T12:00:00Z",
+     "url": "https://www.fanbox.cc/@creator/posts/123", "post": {"id": "123", "title": "...", ...}}
+
+输出位置由配置中的 event_output 决定：
+    "-"                     标准输出（此时 [NEW] 等文字提示改为输出到标准错误，标准输出只有事件）
+    "unix:/path/to/socket"  连接到本地 Unix socket（由接收方监听），断开后自动重连
+    其他                    追加到文件，超过 event_file_max_bytes 时轮转
+"""
+import json
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional, TextIO
+
+from api import FanboxPost, post_to_dict
+
+UNIX_PREFIX = "unix:"
+
+
+class EventSink(ABC):
+    """
+    事件的输出位置：write() 写出一行（已包含换行符），close() 释放资源。
+    """
+
+    @abstractmethod
+    def write(self, line: str) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class StreamSink(EventSink):
+    """
+    写到一个文本流（默认是创建时的标准输出），每行之后立即 flush。
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        # 记住创建时的标准输出：检测期间 sys.stdout 会被重定向到标准错误
+        self.stream = stream or sys.stdout
+
+    def write(self, line: str) -> None:
+        self.stream.write(line)
+        self.stream.flush()
+
+
+class RotatingFileSink(EventSink):
+    """
+    追加写入文件，文件超过 max_bytes 时依次改名为 path.1、path.2……，最多保留 backups 个旧文件。
+    max_bytes 为 0 时不轮转。
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 5) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file: Optional[TextIO] = None
+        self._size = 0
+
+    def _open(self) -> TextIO:
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._size = self._file.tell()
+        return self._file
+
+    def _rotate(self) -> None:
+        self.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def write(self, line: str) -> None:
+        data = line.encode("utf-8")
+        f = self._open()
+        if self.max_bytes > 0 and self._size > 0 and self._size + len(data) > self.max_bytes:
+            self._rotate()
+            f = self._open()
+        f.write(line)
+        f.flush()
+        self._size += len(data)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class UnixSocketSink(EventSink):
+    """
+    连接到接收方监听的 Unix socket（SOCK_STREAM）并写出事件。
+    write() 只把事件放进内存队列（最多 buffer_size 条，超出时丢弃最旧的），由后台线程按顺序发送，
+    接收方读得慢或不可用时不会拖慢检测。
+    连接不上或连接断开时每隔 retry_interval 秒重试，连上后按顺序补发。
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0, buffer_size: int = 10000, retry_interval: float = 5.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._sock = None
+        self._pending: Deque[bytes] = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._reported = False
+
+    def _connect(self) -> bool:
+        if self._sock is not None:
+            return True
+        import socket
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            if not self._reported:
+                # 接收方没有启动时只提示一次，恢复连接后再次出错时才会重新提示
+                print(f"无法连接事件 socket {self.path}，事件暂存在内存中: {e}", file=sys.stderr)
+                self._reported = True
+            return False
+        self._sock = sock
+        self._reported = False
+        return True
+
+    def write(self, line: str) -> None:
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-socket", daemon=True)
+                self._thread.start()
+            self._pending.append(line.encode("utf-8"))
+            self._cond.notify()
+
+    def _run(self) -> None:
+        import socket
+
+        # 正在发送的一行和其中已经发出的字节数：发送超时时可能只发出了一部分
+        current: Optional[bytes] = None
+        offset = 0
+        while True:
+            with self._cond:
+                while current is None and not self._pending and not self._closed:
+                    self._cond.wait()
+                if current is None:
+                    if not self._pending:
+                        return
+                    current, offset = self._pending.popleft(), 0
+                closed = self._closed
+            if not self._connect():
+                if closed:
+                    self._drop(1)
+                    return
+                # 等 retry_interval 秒再重连（期间写入的新事件不会提前唤醒），关闭时立即最后再试一次
+                deadline = time.monotonic() + self.retry_interval
+                with self._cond:
+                    remaining = self.retry_interval
+                    while not self._closed and remaining > 0:
+                        self._cond.wait(remaining)
+                        remaining = deadline - time.monotonic()
+                continue
+            try:
+                offset += self._sock.send(current[offset:])
+            except socket.timeout:
+                if closed:
+                    self._drop(1)
+                    return
+                # 接收方读得慢：保留连接和已发出的位置，之后接着发这一行的剩余部分
+                continue
+            except OSError as e:
+                print(f"事件 socket {self.path} 写入失败，稍后重连: {e}", file=sys.stderr)
+                self._disconnect()
+                self._reported = True
+                # 在新连接上从行首重新发送。旧连接上只发出一部分的那一行没有换行符，接收方随连接关闭丢弃它
+                offset = 0
+                continue
+            if offset == len(current):
+                current = None
+
+    def _drop(self, in_flight: int) -> None:
+        with self._cond:
+            dropped = len(self._pending) + in_flight
+            self._pending.clear()
+        print(f"事件 socket {self.path} 不可用，丢弃了 {dropped} 条事件", file=sys.stderr)
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def close(self) -> None:
+        # 退出前把队列里的事件发完。接收方不可用时后台线程最后重试一次连接，
+        # 发送超时时丢弃剩下的事件，所以最多等两个 timeout
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(self.timeout * 2)
+            if thread.is_alive():
+                return
+        self._disconnect()
+
+
+def open_sink(output: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 5) -> EventSink:
+    """
+    根据 event_output 的值创建输出位置（见模块说明）。
+    """
+    if output == "-":
+        return StreamSink()
+    if output.startswith(UNIX_PREFIX):
+        return UnixSocketSink(output[len(UNIX_PREFIX):])
+    return RotatingFileSink(output, max_bytes, backups)
+
+
+class EventStream:
+    """
+    把新投稿写成 NDJSON 事件。多个账号的检测共用一个输出位置，
+    bind() 返回附带额外字段（例如账号名）的视图。写入加锁，可以在多个线程里调用；
+    写入失败只打印错误，不影响检测和通知。
+    """
+
+    def __init__(
+        self,
+        sink: EventSink,
+        fields: Optional[Dict[str, Any]] = None,
+        lock: Optional[threading.Lock] = None,
+    ) -> None:
+        self.sink = sink
+        self.fields = fields or {}
+        self._lock = lock or threading.Lock()
+
+    @property
+    def to_stdout(self) -> bool:
+        return isinstance(self.sink, StreamSink)
+
+    def bind(self, **fields: Any) -> "EventStream":
+        return EventStream(self.sink, {**self.fields, **fields}, self._lock)
+
+    def emit(self, event: str, **data: Any) -> None:
+        record = {
+            "event": event,
+            **self.fields,
+            "detected_at": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
+            **data,
+        }
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            try:
+                self.sink.write(line)
+            except Exception as e:
+                print(f"写出事件失败: {e}", file=sys.stderr)
+
+    def new_post(self, post: FanboxPost, source: str, url: Optional[str] = None) -> None:
+        """
+        检测到一篇新投稿。source 是 "supporting"（赞助）或 "following"（关注）。
+        """
+        self.emit("new_post", source=source, url=url, post=post_to_dict(post))
+
+    def close(self) -> None:
+        with self._lock:
+            self.sink.close()
@@ -13,6 +13,9 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "config_load_error": "Failed to load configuration",
         "detection_error": "Detection error",
         "runtime_error": "Runtime error",
+        "supporting_digest_title": "{creator_name} you support posted {count} new posts!",
+        "following_digest_title": "{creator_name} you follow posted {count} new posts!",
+        "run_digest_title": "{count} new posts from {creators} creators",
     },
     "zh": {
         "error_title": "Fanbox 监听器运行错误",
@@ -21,6 +24,9 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "config_load_error": "加载配置失败",
         "detection_error": "检测时发生错误",
         "runtime_error": "运行时发生错误",
+        "supporting_digest_title": "你赞助的{creator_name}发布了 {count} 篇新投稿！",
+        "following_digest_title": "你关注的{creator_name}发布了 {count} 篇新投稿！",
+        "run_digest_title": "{creators} 位创作者共有 {count} 篇新投稿",
     },
     "zh-tw": {
         "error_title": "Fanbox 監聽器運行錯誤",
@@ -29,6 +35,9 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "config_load_error": "載入配置失敗",
         "detection_error": "檢測時發生錯誤",
         "runtime_error": "運行時發生錯誤",
+        "supporting_digest_title": "你贊助的{creator_name}發布了 {count} 篇新投稿！",
+        "following_digest_title": "你關注的{creator_name}發布了 {count} 篇新投稿！",
+        "run_digest_title": "{creators} 位創作者共有 {count} 篇新投稿",
     },
     "ja": {
         "error_title": "Fanbox モニター実行エラー",
@@ -37,6 +46,9 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "config_load_error": "設定の読み込みに失敗しました",
         "detection_error": "検出中にエラーが発生しました",
         "runtime_error": "実行中にエラーが発生しました",
+        "supporting_digest_title": "あなたが支援している{creator_name}が{count}件の新しい投稿をしました！",
+        "following_digest_title": "あなたがフォローしている{creator_name}が{count}件の新しい投稿をしました！",
+        "run_digest_title": "{creators}人のクリエイターから{count}件の新しい投稿",
     },
     "ko": {
         "error_title": "Fanbox 모니터 런타임 오류",
@@ -45,6 +57,9 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "config_load_error": "구성 로드 실패",
         "detection_error": "검색 중 오류 발생",
         "runtime_error": "런타임 오류 발생",
+        "supporting_digest_title": "후원하는 {creator_name}이(가) 새 게시물 {count}개를 올렸습니다!",
+        "following_digest_title": "팔로우하는 {creator_name}이(가) 새 게시물 {count}개를 올렸습니다!",
+        "run_digest_title": "크리에이터 {creators}명의 새 게시물 {count}개",
     },
 }
 
@@ -0,0 +1,288 @@
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+from config import atomic_write_text
+
+# 延迟直方图的桶上限（秒），与 Prometheus 客户端的默认值相同
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 运行报告里列出最慢的多少个创作者
+SLOWEST_CREATORS = 20
+
+
+class Histogram:
+    """
+    固定桶的延迟直方图。不保存每个样本，内存占用与请求数无关；分位数按桶的上限估算。
+    不是线程安全的，由 RunMetrics 加锁保护。
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        # 最后一个桶是 +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram") -> None:
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """
+        估算分位数：返回累计数达到 q 的那个桶的上限（不超过观察到的最大值）。
+        """
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            cumulative += n
+            if cumulative >= target:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_s": round(self.sum, 6),
+            "avg_s": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50_s": self.quantile(0.5),
+            "p90_s": self.quantile(0.9),
+            "p99_s": self.quantile(0.99),
+            "max_s": round(self.max, 6),
+        }
+
+
+class RunMetrics:
+    """
+    一次（或守护模式下累计多次）检测的计时和计数，所有线程共用一个实例：
+      - phase(name)：各阶段的耗时（列出关注者、拉取投稿、保存文件、发送通知等），同名阶段累加
+      - observe_request()：每个接口的请求延迟直方图、状态码和下载字节数
+      - count()：重试、429、304 等计数
+      - observe_creator()：每个创作者的拉取耗时
+    FanboxAPI 和 NotificationDispatcher 的 metrics 属性指向它时才会记录，否则没有任何开销。
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.endpoints: Dict[str, Histogram] = {}
+        self.statuses: Dict[Tuple[str, str], int] = {}
+        self.counters: Dict[str, int] = {}
+        self.creator_latency = Histogram()
+        self.creators: List[Tuple[float, str, int]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe_request(self, endpoint: str, seconds: float, status: Any, nbytes: int = 0) -> None:
+        """
+        记录一次请求。status 是 HTTP 状态码，网络错误时传入错误类型的名字。
+        """
+        with self._lock:
+            histogram = self.endpoints.get(endpoint)
+            if histogram is None:
+                histogram = self.endpoints[endpoint] = Histogram()
+            histogram.observe(seconds)
+            key = (endpoint, str(status))
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+            self.counters["requests"] = self.counters.get("requests", 0) + 1
+            self.counters["bytes"] = self.counters.get("bytes", 0) + nbytes
+
+    def observe_creator(self, creator_id: str, seconds: float, posts: int) -> None:
+        with self._lock:
+            self.creator_latency.observe(seconds)
+            self.creators.append((seconds, creator_id, posts))
+
+    def finish(self) -> None:
+        self.finished_at = time.time()
+
+    def merge(self, other: "RunMetrics") -> None:
+        """
+        把一次检测的结果累加进来（守护模式下的累计值）。每个创作者的明细不累计，只累计直方图。
+        """
+        with self._lock:
+            for name, seconds in other.phases.items():
+                self.phases[name] = self.phases.get(name, 0.0) + seconds
+            for endpoint, histogram in other.endpoints.items():
+                self.endpoints.setdefault(endpoint, Histogram()).merge(histogram)
+            for key, n in other.statuses.items():
+                self.statuses[key] = self.statuses.get(key, 0) + n
+            for name, value in other.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            self.creator_latency.merge(other.creator_latency)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        生成 JSON 运行报告。
+        """
+        with self._lock:
+            finished_at = self.finished_at or time.time()
+            statuses: Dict[str, Dict[str, int]] = {}
+            for (endpoint, status), n in sorted(self.statuses.items()):
+                statuses.setdefault(endpoint, {})[status] = n
+            endpoints = {}
+            for endpoint, histogram in sorted(self.endpoints.items()):
+                endpoints[endpoint] = {**histogram.summary(), "status": statuses.get(endpoint, {})}
+            slowest = sorted(self.creators, reverse=True)[:SLOWEST_CREATORS]
+            return {
+                "started_at": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(timespec="seconds"),
+                "duration_s": round(finished_at - self.started_at, 3),
+                "phases_s": {name: round(seconds, 6) for name, seconds in sorted(self.phases.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "endpoints": endpoints,
+                "creators": {
+                    **self.creator_latency.summary(),
+                    "slowest": [
+                        {"creator_id": creator_id, "seconds": round(seconds, 6), "posts": posts}
+                        for seconds, creator_id, posts in slowest
+                    ],
+                },
+            }
+
+    def write_report(self, path: str) -> None:
+        atomic_write_text(path, json.dumps(self.report(), ensure_ascii=False, indent=2))
+
+
+def timed(metrics: Optional[RunMetrics], name: str) -> ContextManager[None]:
+    """
+    metrics 为 None 时不做任何事的 phase()，方便在可选的地方计时。
+    """
+    return metrics.phase(name) if metrics is not None else nullcontext()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_prometheus(total: RunMetrics, last: Optional[RunMetrics], runs: int) -> str:
+    """
+    按 Prometheus 文本格式输出累计的指标，以及最近一次检测的耗时。
+    """
+    lines: List[str] = []
+    with total._lock:
+        lines.append("# HELP fanbox_monitor_runs_total Number of completed polls.")
+        lines.append("# TYPE fanbox_monitor_runs_total counter")
+        lines.append(f"fanbox_monitor_runs_total {runs}")
+
+        lines.append("# HELP fanbox_monitor_phase_seconds_total Time spent in each phase of a poll.")
+        lines.append("# TYPE fanbox_monitor_phase_seconds_total counter")
+        for name, seconds in sorted(total.phases.items()):
+            lines.append(f'fanbox_monitor_phase_seconds_total{{phase="{_escape(name)}"}} {seconds:.6f}')
+
+        lines.append("# HELP fanbox_monitor_events_total Requests, bytes, retries, 429s, 304s and other events.")
+        lines.append("# TYPE fanbox_monitor_events_total counter")
+        for name, value in sorted(total.counters.items()):
+            lines.append(f'fanbox_monitor_events_total{{event="{_escape(name)}"}} {value}')
+
+        lines.append("# HELP fanbox_monitor_responses_total Responses by endpoint and status.")
+        lines.append("# TYPE fanbox_monitor_responses_total counter")
+        for (endpoint, status), n in sorted(total.statuses.items()):
+            lines.append(
+                f'fanbox_monitor_responses_total{{endpoint="{_escape(endpoint)}",status="{_escape(status)}"}} {n}'
+            )
+
+        lines.append("# HELP fanbox_monitor_request_duration_seconds Request latency by endpoint.")
+        lines.append("# TYPE fanbox_monitor_request_duration_seconds histogram")
+        histograms = [(f'endpoint="{_escape(e)}"', h) for e, h in sorted(total.endpoints.items())]
+        for labels, histogram in histograms:
+            _format_histogram(lines, "fanbox_monitor_request_duration_seconds", labels, histogram)
+
+        lines.append("# HELP fanbox_monitor_creator_duration_seconds Time to fetch one creator's posts.")
+        lines.append("# TYPE fanbox_monitor_creator_duration_seconds histogram")
+        _format_histogram(lines, "fanbox_monitor_creator_duration_seconds", "", total.creator_latency)
+
+    if last is not None:
+        lines.append("# HELP fanbox_monitor_last_run_timestamp_seconds Start time of the last poll.")
+        lines.append("# TYPE fanbox_monitor_last_run_timestamp_seconds gauge")
+        lines.append(f"fanbox_monitor_last_run_timestamp_seconds {last.started_at:.3f}")
+        if last.finished_at is not None:
+            lines.append("# HELP fanbox_monitor_last_run_duration_seconds Duration of the last poll.")
+            lines.append("# TYPE fanbox_monitor_last_run_duration_seconds gauge")
+            lines.append(f"fanbox_monitor_last_run_duration_seconds {last.finished_at - last.started_at:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+def _format_histogram(lines: List[str], name: str, labels: str, histogram: Histogram) -> None:
+    prefix = f"{labels}," if labels else ""
+    cumulative = 0
+    for bound, n in zip(histogram.buckets, histogram.counts):
+        cumulative += n
+        lines.append(f'{name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+
+
+class MetricsServer:
+    """
+    守护模式下在后台线程里提供 Prometheus 格式的 /metrics 接口。
+    render 每次被请求时调用，返回完整的文本。
+    """
+
+    def __init__(self, host: str, port: int, render) -> None:
+        # 只有守护模式下开启 /metrics 时才需要 http.server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
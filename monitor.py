@@ -1,35 +1,33 @@
+import argparse
+import contextlib
 import json
+import os
+import signal
 import sys
-from datetime import datetime
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterator, List, Optional, Tuple
 
 # 独立脚本形式：假设在同一目录下有 api.py 和 config.py
 from api import FanboxAPI, FanboxPost
-from config import load_config, ensure_creator_min_fee
-from onepush import get_notifier
+from archive import PostArchive
+from config import AccountConfig, MonitorConfig, load_config, CreatorMinFeeStore, write_text_if_changed
+from events import EventStream, open_sink
+from notifiers import close_direct_notifiers, send_to_targets
+from notify import NotificationDispatcher
+from scheduler import AdaptivePollScheduler, parse_published
+from shard import ShardSpec, apply_shard, parse_shard
+from state import SUPPORTING_FEED_CURSOR, StateStore, open_state_store
 from i18n import translate
+from metrics import MetricsServer, RunMetrics, format_prometheus, timed
 
-
-def load_state(path: Path) -> Dict[str, str]:
-    """
-    读取上次已知的每个创作者的最新投稿 id。
-    返回格式: {"supporting:creator_id": last_post_id, "following:creator_id": last_post_id}
-    使用 "type:creator_id" 作为 key 来区分赞助和关注。
-    """
-    if not path.exists():
-        return {}
-    try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-        if isinstance(data, dict):
-            return {str(k): str(v) for k, v in data.items()}
-    except Exception:
-        pass
-    return {}
-
-
-def save_state(path: Path, state: Dict[str, str]) -> None:
-    path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+if TYPE_CHECKING:
+    # transport 会导入 requests，只在创建会话时才导入
+    from transport import DNSCache
 
 
 def group_latest_by_creator(posts: list[FanboxPost]) -> Dict[str, FanboxPost]:
@@ -58,6 +56,10 @@ def format_datetime(datetime_str: str) -> str:
         return datetime_str
 
 
+# 总摘要通知打开的页面：关注和赞助的创作者的投稿动态
+FANBOX_HOME_URL = "https://www.fanbox.cc/home"
+
+
 def build_post_url(post: FanboxPost) -> str:
     """
     根据 creatorId 和 post.id 构造一个大多数情况下可用的网页地址。
@@ -67,21 +69,59 @@ def build_post_url(post: FanboxPost) -> str:
     return f"https://www.fanbox.cc/@{post.creator_id}/posts/{post.id}"
 
 
+def bark_targets(bark_key: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    只有一个 Bark key 时的通知目标列表（见 notifiers.py）。
+    """
+    return [{"type": "bark", "key": bark_key}] if bark_key else []
+
+
+def send_notification(
+    message: Dict[str, Any],
+    targets: List[Dict[str, Any]],
+    dispatcher: Optional[NotificationDispatcher] = None,
+) -> None:
+    """
+    把一条通知发送到所有目标：有 dispatcher 时放进发送队列后立即返回，否则直接发送（多个目标时并行）。
+    """
+    if dispatcher is not None:
+        for target in targets:
+            dispatcher.submit(message, target)
+        return
+    send_to_targets(message, targets)
+
+
 def notify_bark(
     bark_key: Optional[str],
     bark_group: str,
     post: FanboxPost,
     post_type: str,  # "supporting" 或 "following"
     language: str = "en",
+    dispatcher: Optional[NotificationDispatcher] = None,
 ) -> None:
     """
-    使用 onepush 的 bark 通知。
+    不经过 NotificationCoalescer 时，直接发送一条新投稿的 Bark 通知。
     :param post_type: "supporting"（赞助）或 "following"（关注）
     :param language: 语言代码
+    :param dispatcher: 通知发送队列，不传时同步发送
     """
     if not bark_key:
         return
-    notifier = get_notifier("bark")
+    try:
+        send_notification(build_post_params(bark_group, post, post_type, language), bark_targets(bark_key), dispatcher)
+    except Exception as e:
+        print(f"通知发送失败: {e}", file=sys.stderr)
+
+
+def build_post_params(
+    bark_group: str,
+    post: FanboxPost,
+    post_type: str,
+    language: str = "en",
+) -> Dict[str, Any]:
+    """
+    构造单条新投稿的通知消息（格式见 notifiers.py）。
+    """
     if post_type == "supporting":
         title = translate("supporting_title", language, creator_name=post.creator_name)
     else:
@@ -89,54 +129,191 @@ def notify_bark(
     formatted_date = format_datetime(post.published_datetime)
     msg = f"{post.title}({post.fee_required}日元)\n发布于 {formatted_date}"
     url = build_post_url(post)
-    try:
-        # Bark 通知参数：icon 用于设置通知图标
-        notify_params = {
-            "key": bark_key,
-            "title": title,
-            "content": msg,
-            "url": url,
-            "group": bark_group + ' - ' + post.creator_name,
-        }
-        # 如果有头像 URL，添加到通知参数中
-        if post.creator_icon_url:
-            notify_params["icon"] = post.creator_icon_url
-        notifier.notify(**notify_params)
-    except Exception as e:
-        print(f"Bark 通知失败: {e}", file=sys.stderr)
+    # icon 用于设置通知图标（Bark 支持），group 用于按创作者折叠通知
+    notify_params = {
+        "title": title,
+        "content": msg,
+        "url": url,
+        "group": bark_group + ' - ' + post.creator_name,
+    }
+    # 如果有头像 URL，添加到通知参数中
+    if post.creator_icon_url:
+        notify_params["icon"] = post.creator_icon_url
+    return notify_params
 
 
-def notify_error_bark(
-    bark_key: Optional[str],
+def notify_error(
+    targets: List[Dict[str, Any]],
     bark_group: str,
     error_message: str,
     language: str = "en",
+    dispatcher: Optional[NotificationDispatcher] = None,
 ) -> None:
     """
-    发送错误通知到 Bark。
+    发送错误通知到所有通知目标。
     """
-    if not bark_key:
+    if not targets:
         return
     try:
-        notifier = get_notifier("bark")
         notify_params = {
-            "key": bark_key,
             "title": translate("error_title", language),
             "content": error_message,
             "group": bark_group,
         }
-        notifier.notify(**notify_params)
+        send_notification(notify_params, targets, dispatcher)
     except Exception as e:
         print(f"发送错误通知失败: {e}", file=sys.stderr)
 
 
+class NotificationCoalescer:
+    """
+    检测和通知之间的合并层：检测到的新投稿先放在这里，一轮检测结束后调用 flush() 统一发送。
+      - 同一创作者在 digest_window 秒内连续发布的投稿达到 digest_threshold 篇时，合并成一条摘要通知
+        （digest_window 为 0 表示本轮检测到的该创作者的投稿都算在一起）
+      - 合并后本轮的通知仍多于 max_notifications 条时，再合并成一条总的摘要通知
+    这样无论积压了多少新投稿，每轮发出的通知数都有上限。阈值为 0 表示不做对应的合并。
+    两个阈值都为 0（默认）时不需要合并，add() 直接发送（有 dispatcher 时放进发送队列），
+    第一条通知不必等到整轮检测结束。
+    """
+
+    # 摘要通知里最多列出多少行
+    DIGEST_MAX_LINES = 5
+
+    def __init__(
+        self,
+        targets: List[Dict[str, Any]],
+        bark_group: str,
+        language: str = "en",
+        dispatcher: Optional[NotificationDispatcher] = None,
+        digest_threshold: int = 0,
+        digest_window: int = 0,
+        max_notifications: int = 0,
+    ) -> None:
+        """
+        :param targets: 通知目标列表（见 notifiers.py），为空时不发送通知
+        """
+        self.targets = targets
+        self.bark_group = bark_group
+        self.language = language
+        self.dispatcher = dispatcher
+        self.digest_threshold = digest_threshold
+        self.digest_window = digest_window
+        self.max_notifications = max_notifications
+        self._pending: List[Tuple[FanboxPost, str]] = []
+
+    def add(self, post: FanboxPost, post_type: str) -> None:
+        """
+        记录一篇需要通知的新投稿（按从旧到新的顺序调用）。
+        """
+        if not self.targets:
+            return
+        if self.digest_threshold <= 0 and self.max_notifications <= 0:
+            self._send(build_post_params(self.bark_group, post, post_type, self.language))
+            return
+        self._pending.append((post, post_type))
+
+    def _send(self, notify_params: Dict[str, Any]) -> None:
+        try:
+            send_notification(notify_params, self.targets, self.dispatcher)
+        except Exception as e:
+            print(f"通知发送失败: {e}", file=sys.stderr)
+
+    def _clusters(self, posts: List[FanboxPost]) -> List[List[FanboxPost]]:
+        """
+        按发布时间把同一创作者的投稿分段：相邻两篇间隔超过 digest_window 时断开。
+        """
+        if self.digest_window <= 0:
+            return [posts]
+        clusters: List[List[FanboxPost]] = []
+        last_published: Optional[float] = None
+        for post in posts:
+            published = parse_published(post.published_datetime)
+            if (
+                not clusters
+                or last_published is None
+                or published is None
+                or abs(published - last_published) > self.digest_window
+            ):
+                clusters.append([])
+            clusters[-1].append(post)
+            last_published = published
+        return clusters
+
+    def _creator_digest(self, posts: List[FanboxPost], post_type: str) -> Dict[str, Any]:
+        latest = posts[-1]
+        title = translate(
+            f"{post_type}_digest_title", self.language, creator_name=latest.creator_name, count=len(posts)
+        )
+        lines = [f"{p.title}({p.fee_required}日元)" for p in reversed(posts[-self.DIGEST_MAX_LINES:])]
+        if len(posts) > self.DIGEST_MAX_LINES:
+            lines.append(f"…… 等 {len(posts)} 篇")
+        notify_params = {
+            "title": title,
+            "content": "\n".join(lines),
+            "url": build_post_url(latest),
+            "group": self.bark_group + ' - ' + latest.creator_name,
+        }
+        if latest.creator_icon_url:
+            notify_params["icon"] = latest.creator_icon_url
+        return notify_params
+
+    def _run_digest(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for post, _ in self._pending:
+            counts[post.creator_name] = counts.get(post.creator_name, 0) + 1
+        title = translate("run_digest_title", self.language, count=len(self._pending), creators=len(counts))
+        lines = [f"{name}: {count} 篇" for name, count in list(counts.items())[:self.DIGEST_MAX_LINES]]
+        if len(counts) > self.DIGEST_MAX_LINES:
+            lines.append(f"…… 等 {len(counts)} 位创作者")
+        return {
+            "title": title,
+            "content": "\n".join(lines),
+            "url": FANBOX_HOME_URL,
+            "group": self.bark_group,
+        }
+
+    def flush(self) -> None:
+        """
+        合并并发送本轮积累的通知。
+        """
+        if not self._pending:
+            return
+        # 按 (来源, 创作者) 分组，保持首次出现的顺序
+        grouped: Dict[Tuple[str, str], List[FanboxPost]] = {}
+        for post, post_type in self._pending:
+            grouped.setdefault((post_type, post.creator_id), []).append(post)
+
+        messages: List[Dict[str, Any]] = []
+        for (post_type, _), posts in grouped.items():
+            for cluster in self._clusters(posts):
+                if self.digest_threshold > 0 and len(cluster) >= self.digest_threshold:
+                    messages.append(self._creator_digest(cluster, post_type))
+                else:
+                    messages.extend(
+                        build_post_params(self.bark_group, p, post_type, self.language)
+                        for p in cluster
+                    )
+        if self.max_notifications > 0 and len(messages) > self.max_notifications:
+            messages = [self._run_digest()]
+
+        self._pending.clear()
+        for notify_params in messages:
+            self._send(notify_params)
+
+
 def save_creators(
     creators_file: str,
     supporting_creators: list[Dict[str, str]],
     following_creators: Optional[list[Dict[str, str]]] = None,
+    following_updated_at: Optional[float] = None,
+    supporting_plans: Optional[list[Dict[str, str]]] = None,
+    supporting_plans_updated_at: Optional[float] = None,
 ) -> None:
     """
     将赞助者和关注者列表保存到配置文件。
+    following_updated_at 是关注者列表上次从接口获取的时间，下次运行时据此判断缓存是否过期。
+    supporting_plans 是 plan.listSupporting 返回的赞助中的创作者（见 SupportingPlansCache），同样带有获取时间。
+    列表没有变化时不重写文件；需要写入时先写临时文件再替换，中途崩溃也不会留下半个文件。
     """
     data = {
         "supporting": [
@@ -157,163 +334,568 @@ def save_creators(
             }
             for c in following_creators
         ]
-    path = Path(creators_file)
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        if following_updated_at is not None:
+            data["followingUpdatedAt"] = datetime.fromtimestamp(following_updated_at, timezone.utc).isoformat()
+    if supporting_plans is not None and supporting_plans_updated_at is not None:
+        data["supportingPlans"] = [
+            {
+                "creatorId": c["creatorId"],
+                "name": c["name"],
+                "iconUrl": c.get("iconUrl"),
+            }
+            for c in supporting_plans
+        ]
+        data["supportingPlansUpdatedAt"] = datetime.fromtimestamp(
+            supporting_plans_updated_at, timezone.utc
+        ).isoformat()
+    write_text_if_changed(creators_file, json.dumps(data, ensure_ascii=False, indent=2))
+
+
+class FollowingCache:
+    """
+    关注者列表（creator.listFollowing）的缓存。关注列表很少变化，不需要每次运行都请求这个很大的接口。
+      - 初始内容从 creators_file 读取（由 save_creators 写入，包括获取时间）
+      - 缓存不超过 ttl 秒时直接使用；过期时重新获取，获取失败则继续使用旧的列表
+      - 守护模式下调用 refresh_in_background() 在后台提前刷新，检测时不用等待
+      - 刷新后与旧列表比较，新关注和取消关注的创作者通过 pop_changes() 取出
+    ttl 为 0 表示每次都重新获取。
+    子类改写 LIST_KEY / NAME / fetch() 缓存其他创作者列表（见 SupportingPlansCache）。
+    """
+
+    # 列表在 creators_file 里的 key，获取时间保存在 "<LIST_KEY>UpdatedAt"
+    LIST_KEY = "following"
+    # 出错提示里的列表名称
+    NAME = "关注者列表"
+
+    def __init__(self, api: FanboxAPI, creators_file: str, ttl: int = 3600) -> None:
+        self.api = api
+        self.ttl = ttl
+        self.creators: List[Dict[str, Any]] = []
+        self.updated_at: Optional[float] = None
+        self._added: List[Dict[str, Any]] = []
+        self._removed: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._load(creators_file)
+
+    def _load(self, creators_file: str) -> None:
+        try:
+            data = json.loads(Path(creators_file).read_text(encoding="utf-8"))
+        except Exception:
+            return
+        creators = data.get(self.LIST_KEY)
+        updated_at = parse_published(str(data.get(f"{self.LIST_KEY}UpdatedAt") or ""))
+        if isinstance(creators, list) and updated_at is not None:
+            self.creators = [c for c in creators if isinstance(c, dict) and c.get("creatorId")]
+            self.updated_at = updated_at
+
+    def stale(self, margin: float = 0.0) -> bool:
+        """
+        margin 秒之后缓存是否已经过期。
+        """
+        return self.updated_at is None or time.time() + margin - self.updated_at >= self.ttl
+
+    def fetch(self) -> List[Dict[str, Any]]:
+        return self.api.list_following_creators()
+
+    def refresh(self) -> None:
+        """
+        从接口重新获取列表，并记录与旧列表相比的变化。
+        """
+        creators = self.fetch()
+        with self._lock:
+            if self.updated_at is not None:
+                old_ids = {c["creatorId"] for c in self.creators}
+                new_ids = {c["creatorId"] for c in creators}
+                self._added.extend(c for c in creators if c["creatorId"] not in old_ids)
+                self._removed.extend(c for c in self.creators if c["creatorId"] not in new_ids)
+            self.creators = creators
+            self.updated_at = time.time()
+
+    def _refresh_quietly(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"后台刷新{self.NAME}失败: {e}", file=sys.stderr)
+
+    def refresh_in_background(self, margin: float = 0.0) -> None:
+        """
+        如果 margin 秒后缓存会过期，就在后台线程里刷新（已经在刷新时不重复启动）。
+        """
+        if not self.stale(margin) or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._refresh_quietly, name=f"{self.LIST_KEY}-refresh", daemon=True)
+        self._thread.start()
+
+    def get(self) -> List[Dict[str, Any]]:
+        """
+        返回缓存的列表。缓存过期时同步刷新（后台正在刷新时直接使用旧列表）；
+        刷新失败时使用旧列表，没有旧列表时抛出异常。
+        """
+        refreshing = self._thread is not None and self._thread.is_alive()
+        if self.stale() and not (refreshing and self.creators):
+            try:
+                self.refresh()
+            except Exception as e:
+                if not self.creators:
+                    raise
+                print(f"获取{self.NAME}失败，继续使用缓存的列表: {e}", file=sys.stderr)
+        with self._lock:
+            return list(self.creators)
+
+    def pop_changes(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        取出上次调用以来新关注和取消关注的创作者。
+        """
+        with self._lock:
+            added, removed = self._added, self._removed
+            self._added, self._removed = [], []
+        return added, removed
+
+
+class SupportingPlansCache(FollowingCache):
+    """
+    赞助中的创作者列表（plan.listSupporting）的缓存，与关注者列表使用同一个 ttl。
+    只用于同时赞助和关注的创作者只检测一次（见 CreatorRegistry），赞助列表同样很少变化；
+    本轮赞助投稿流里出现的创作者总是算作赞助中，所以缓存过期前新赞助的创作者也不会被检测两次。
+    """
+
+    LIST_KEY = "supportingPlans"
+    NAME = "赞助中的创作者列表"
+
+    def fetch(self) -> List[Dict[str, Any]]:
+        return self.api.list_supporting_creators()
+
+
+# 每个创作者每轮最多通知几篇新投稿
+MAX_NEW_POSTS = 10
+# 并发拉取关注者投稿时，最多提前提交并发数的几倍个请求
+FETCH_WINDOW = 2
+
+
+class CreatorRegistry:
+    """
+    一轮检测中一个账号正在赞助的创作者，用于合并赞助和关注两个来源。
+    post.listSupporting 一个请求就覆盖了所有赞助中的创作者的新投稿，
+    所以同时赞助和关注的创作者只由赞助这一路检测（通知也标为赞助），不再用 post.listCreator 单独拉取。
+    赞助中的创作者包括本轮赞助投稿流里出现的创作者，以及 plan.listSupporting 返回的创作者（最近没有投稿的也在内）。
+    """
+
+    def __init__(self) -> None:
+        self.supporting: Dict[str, Dict[str, Any]] = {}
+
+    def add_supporting(self, creators: List[Dict[str, Any]]) -> None:
+        for c in creators:
+            self.supporting.setdefault(c["creatorId"], c)
+
+    def is_supporting(self, creator_id: str) -> bool:
+        return creator_id in self.supporting
+
+
+class PostScan:
+    """
+    在一个创作者的投稿里查找新投稿：按从新到旧的顺序逐篇 feed()，
+    遇到上次最新的投稿 last_id，或者符合条件的新投稿达到 MAX_NEW_POSTS 篇时结束。
+    last_id 为 None（第一次看到这个创作者）时只记录最新的一篇，不算作新投稿。
+    """
+
+    __slots__ = ("last_id", "min_fee", "newest_id", "seen_posts", "new_posts", "done")
+
+    def __init__(self, last_id: Optional[str], min_fee: int) -> None:
+        self.last_id = last_id
+        self.min_fee = min_fee
+        self.newest_id: Optional[str] = None
+        # 比 last_id 新的投稿，以及其中达到最小监听金额的投稿（都是从新到旧）
+        self.seen_posts: List[FanboxPost] = []
+        self.new_posts: List[FanboxPost] = []
+        self.done = False
+
+    def feed(self, post: FanboxPost) -> bool:
+        """
+        处理下一篇（更旧的）投稿，返回扫描是否已经结束。
+        """
+        if self.newest_id is None:
+            self.newest_id = post.id
+            if self.last_id is None:
+                self.seen_posts.append(post)
+                self.done = True
+                return True
+        if str(post.id) == str(self.last_id):
+            # 找到上次的帖子，停止继续查找
+            self.done = True
+            return True
+        self.seen_posts.append(post)
+        if post.fee_required >= self.min_fee:
+            self.new_posts.append(post)
+            if len(self.new_posts) >= MAX_NEW_POSTS:
+                self.done = True
+        return self.done
+
+
+def diff_supporting_feed(
+        posts: Iterator[FanboxPost],
+        state: StateStore,
+        fee_store: CreatorMinFeeStore,
+        creators: Dict[str, Dict[str, Any]],
+        shard: Optional[ShardSpec] = None,
+) -> Iterator[Tuple[str, PostScan]]:
+    """
+    赞助投稿流的比较阶段。投稿流按发布时间从新到旧排列，多个创作者的投稿交错出现：
+    逐篇读取，某个创作者的扫描一结束就产出 (创作者 id, 扫描结果)，不必等整个投稿流读完；
+    投稿流读完后再产出其余的创作者。内存中只保留还没有结束的创作者的投稿。
+    出现过的创作者信息记录到 creators（包括不属于 shard 的创作者）。
+    """
+    scans: Dict[str, PostScan] = {}
+    finished: set = set()
+    for post in posts:
+        creator_id = post.creator_id
+        if creator_id not in creators:
+            creators[creator_id] = {
+                "creatorId": creator_id,
+                "name": post.creator_name,
+                "iconUrl": post.creator_icon_url,
+            }
+        if creator_id in finished or (shard is not None and not shard.owns(creator_id)):
+            continue
+        scan = scans.get(creator_id)
+        if scan is None:
+            last_id = state.get_last_id("supporting", creator_id)
+            if last_id is None:
+                # 之前只关注、刚开始赞助的创作者，从关注这一路看到的位置继续
+                last_id = state.get_last_id("following", creator_id)
+            # 获取该创作者的最小监听金额（没有配置时会在运行结束后写入默认值）
+            scan = scans[creator_id] = PostScan(last_id, fee_store.get(creator_id))
+        if scan.feed(post):
+            finished.add(creator_id)
+            yield creator_id, scans.pop(creator_id)
+    # 投稿流到头了还没有遇到上次最新投稿的创作者
+    for creator_id, scan in scans.items():
+        yield creator_id, scan
+
+
+def announce_new_posts(
+        post_type: str,
+        new_posts: List[FanboxPost],
+        bark_key: Optional[str],
+        bark_group: str,
+        language: str = "en",
+        dispatcher: Optional[NotificationDispatcher] = None,
+        coalescer: Optional[NotificationCoalescer] = None,
+        events: Optional[EventStream] = None,
+) -> None:
+    """
+    通知阶段：从最老的新投稿开始，打印提示、写出事件，并交给 coalescer（或直接发送 Bark 通知）。
+    new_posts 按从新到旧排列（PostScan.new_posts）。
+    """
+    label = "赞助" if post_type == "supporting" else "关注"
+    for post in reversed(new_posts):
+        formatted_date = format_datetime(post.published_datetime)
+        fee_info = f" (收费: {post.fee_required}日元)" if post.fee_required > 0 else " (免费)"
+        print(
+            f"[NEW] {label} - {post.creator_name} ({post.creator_id}) 有新投稿："
+            f"{post.title} (id={post.id}, 发布于 {formatted_date}{fee_info})"
+        )
+        if events is not None:
+            events.new_post(post, post_type, build_post_url(post))
+        if coalescer is not None:
+            coalescer.add(post, post_type)
+        else:
+            notify_bark(bark_key, bark_group, post, post_type, language, dispatcher)
 
 
 def check_supporting_posts(
         api: FanboxAPI,
-        state: Dict[str, str],
+        state: StateStore,
         bark_key: Optional[str],
         bark_group: str,
         limit: int,
-        default_min_fee: int,
-        config_path: str,
+        fee_store: CreatorMinFeeStore,
         language: str = "en",
-) -> Tuple[Dict[str, str], list[Dict[str, str]]]:
+        max_posts: int = 200,
+        dispatcher: Optional[NotificationDispatcher] = None,
+        coalescer: Optional[NotificationCoalescer] = None,
+        events: Optional[EventStream] = None,
+        shard: Optional[ShardSpec] = None,
+) -> list[Dict[str, str]]:
     """
-    检查正在赞助的创作者是否有新投稿。
-    返回 (更新后的 state, 创作者列表)。
+    检查正在赞助的创作者是否有新投稿，并把最新投稿 id 写入 state。
+    先取一页 limit 条，如果这一页里的投稿都比上次看到的更新，就继续向后翻页（最多 max_posts 条），
+    避免短时间内大量更新时漏掉投稿。
+    投稿流按 获取 -> 比较（diff_supporting_feed）-> 通知逐篇流过，不会先把整个投稿流读进内存，
+    一个创作者比较完就立即通知，并把它的最新投稿 id 写入 state。
+    投稿流的位置等投稿流完整读完后才写入：中途某一页请求失败时位置保持不变，下一轮从原来的位置重新读取，
+    不会漏掉还没读到的投稿；已经比较完的创作者遇到刚写入的最新投稿 id 就结束，不会再通知一次。
+    传入 events 时，每发现一篇新投稿就写出一条事件。
+    传入 shard 时只检测属于这个分片的创作者。
+    返回创作者列表（包括不属于这个分片的创作者）。
     """
-    raw = api.list_supporting_posts(limit=limit)
-    posts = api.parse_posts_from_supporting(raw)
+    cursor = state.get_cursor(SUPPORTING_FEED_CURSOR)
+    watermark = parse_published(cursor) if cursor else None
+    if watermark is None:
+        # 还没有记录过（或无法解析）时只取一页
+        posts = api.iter_supporting_posts(lambda post: True, limit, limit, limit)
+    else:
+        def reached_watermark(post: FanboxPost) -> bool:
+            published = parse_published(post.published_datetime)
+            return published is not None and published <= watermark
 
-    # 按创作者分组
-    posts_by_creator = {}
-    for post in posts:
-        if post.creator_id not in posts_by_creator:
-            posts_by_creator[post.creator_id] = []
-        posts_by_creator[post.creator_id].append(post)
-
-    # 收集创作者信息（用于保存到配置文件）
-    creators_list = []
-    for creator_id, creator_posts in posts_by_creator.items():
-        if creator_posts:
-            post = creator_posts[0]  # 最新的帖子
-            creators_list.append({
-                "creatorId": creator_id,
-                "name": post.creator_name,
-                "iconUrl": post.creator_icon_url,
-            })
+        posts = api.iter_supporting_posts(reached_watermark, limit, limit, max(limit, max_posts))
 
-    new_state = dict(state)
-    for creator_id, creator_posts in posts_by_creator.items():
-        # 确保配置文件中存在该创作者的最小监听金额配置
-        creator_min_fee = ensure_creator_min_fee(config_path, creator_id, default_min_fee)
+    # 投稿流里最新一篇的发布时间，读完投稿流后作为下次的位置
+    newest_published: Optional[str] = None
 
-        state_key = creator_id
-        last_id = state.get(state_key)
+    def track_cursor(posts: Iterator[FanboxPost]) -> Iterator[FanboxPost]:
+        nonlocal newest_published
+        for i, post in enumerate(posts):
+            if i == 0:
+                newest_published = post.published_datetime
+            yield post
 
-        if last_id is None:
-            # 第一次看到这个创作者，记录最新 id，不提示
-            if creator_posts:
-                new_state[state_key] = creator_posts[0].id
-            continue
+    # 出现过的创作者信息（用于保存到配置文件）
+    creators: Dict[str, Dict[str, Any]] = {}
+    for creator_id, scan in diff_supporting_feed(track_cursor(posts), state, fee_store, creators, shard):
+        announce_new_posts(
+            "supporting", scan.new_posts, bark_key, bark_group, language, dispatcher, coalescer, events
+        )
+        state.record_posts("supporting", scan.seen_posts, (post.id for post in scan.new_posts))
+        # 更新状态为最新的帖子ID
+        state.set_last_id("supporting", creator_id, scan.newest_id)
 
-        # 查找所有符合条件的新帖子（最多10个）
-        new_posts = []
-        for post in creator_posts:
-            if str(post.id) == str(last_id):
-                # 找到上次的帖子，停止继续查找
-                break
-            if post.fee_required >= creator_min_fee:
-                new_posts.append(post)
-            if len(new_posts) >= 10:  # 最多10个
-                break
-
-        # 通知所有符合条件的新帖子
-        for post in reversed(new_posts):  # 从最老的新帖开始通知
-            formatted_date = format_datetime(post.published_datetime)
-            fee_info = f" (收费: {post.fee_required}日元)" if post.fee_required > 0 else " (免费)"
-            print(
-                f"[NEW] 赞助 - {post.creator_name} ({creator_id}) 有新投稿："
-                f"{post.title} (id={post.id}, 发布于 {formatted_date}{fee_info})"
-            )
-            notify_bark(bark_key, bark_group, post, "supporting", language)
+    # 投稿流已经完整读完，再更新投稿流的位置
+    if newest_published is not None:
+        state.set_cursor(SUPPORTING_FEED_CURSOR, newest_published)
+    return list(creators.values())
 
-        # 更新状态为最新的帖子ID
-        if creator_posts:
-            new_state[state_key] = creator_posts[0].id
 
-    return new_state, creators_list
+def fetch_creators_posts(
+        api: FanboxAPI,
+        creators: List[Dict[str, str]],
+        last_ids: Dict[str, Optional[str]],
+        limit: int,
+        first_page_size: int = 10,
+        max_posts: int = 200,
+        concurrency: int = 1,
+        probe: bool = True,
+        post_cache: Optional[Dict[Tuple[str, Optional[str]], List[FanboxPost]]] = None,
+) -> Iterator[Tuple[Dict[str, str], Optional[List[FanboxPost]], Optional[Exception]]]:
+    """
+    拉取每个创作者的投稿列表，按 creators 的原始顺序逐个产出 (创作者信息, 投稿列表, 异常)。
+    每个创作者先取 first_page_size 条，直到遇到 last_ids 中记录的上次最新投稿才停止翻页
+    （每页最多 limit 条，总共最多 max_posts 条）；没有记录的创作者只需要最新的一条。
+    probe 为 True 时先用 limit=1 探测最新投稿，没有变化的创作者只需要这一次很小的请求。
+    concurrency > 1 时使用线程池并发请求（共享同一个 FanboxAPI 会话），
+    但结果仍按原顺序产出，保证通知顺序和状态更新是确定的。
+    这是一个生成器，调用方边拉取边处理：同时在内存中的投稿列表只有窗口内的几个，与关注者数量无关。
+    单个创作者请求失败时，投稿列表为 None 并附带异常，不影响其他创作者。
+    post_cache 以 (创作者 id, 上次最新投稿 id) 为 key 保存本轮已经拉取过的结果：
+    多个账号关注同一个创作者时，投稿列表只拉取一次，其他账号直接使用。
+    投稿列表里的标题、收费金额和发布时间对所有账号都一样，与账号是否赞助无关。
+    """
+    def fetch(creator_info: Dict[str, str]) -> Tuple[Optional[List[FanboxPost]], Optional[Exception]]:
+        creator_id = creator_info["creatorId"]
+        last_id = last_ids.get(creator_id)
+        if post_cache is not None:
+            cached = post_cache.get((creator_id, last_id))
+            if cached is not None:
+                return cached, None
+        started = time.perf_counter()
+        try:
+            posts = list(api.iter_creator_posts(
+                creator_id,
+                creator_info["name"],
+                creator_info.get("iconUrl"),
+                until_id=last_id,
+                first_page_size=first_page_size if last_id is not None else 1,
+                page_size=limit,
+                max_posts=max_posts if last_id is not None else 1,
+                probe=probe and last_id is not None,
+            ))
+            if post_cache is not None:
+                post_cache[(creator_id, last_id)] = posts
+            if api.metrics is not None:
+                api.metrics.observe_creator(creator_id, time.perf_counter() - started, len(posts))
+            return posts, None
+        except Exception as e:
+            return None, e
 
+    if concurrency <= 1:
+        for creator_info in creators:
+            yield (creator_info, *fetch(creator_info))
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # 不用 Executor.map：它会一次提交所有创作者，消费跟不上时已完成的投稿列表全部堆在内存里。
+        # 这里最多只有 FETCH_WINDOW 倍并发数的请求在进行或等待消费，内存占用与关注者数量无关；
+        # 结果仍按提交顺序产出，排在前面的创作者一完成就可以处理和通知
+        pending: Deque[Tuple[Dict[str, str], Any]] = deque()
+        remaining = iter(creators)
+        for creator_info in islice(remaining, concurrency * FETCH_WINDOW):
+            pending.append((creator_info, pool.submit(fetch, creator_info)))
+        while pending:
+            creator_info, future = pending.popleft()
+            result = future.result()
+            next_info = next(remaining, None)
+            if next_info is not None:
+                pending.append((next_info, pool.submit(fetch, next_info)))
+            yield (creator_info, *result)
+
+
+def print_fetch_stats(
+        api: FanboxAPI,
+        stats_before: Dict[str, int],
+        checked: int,
+        unchanged: int,
+        posts_fetched: int,
+        probe_page_size: int,
+) -> None:
+    """
+    打印本次检查关注者的请求统计。
+    探测省下的流量按"没有变化的创作者本来要多下载 probe_page_size - 1 条投稿"估算。
+    """
+    stats = api.stats.snapshot()
+    requests_made = stats["requests"] - stats_before["requests"]
+    bytes_downloaded = stats["bytes"] - stats_before["bytes"]
+    not_modified = stats["not_modified"] - stats_before["not_modified"]
+    bytes_saved = stats["bytes_saved"] - stats_before["bytes_saved"]
+    retries = stats["retries"] - stats_before["retries"]
+    if probe_page_size > 1 and posts_fetched:
+        bytes_saved += int(unchanged * (probe_page_size - 1) * bytes_downloaded / posts_fetched)
+    print(
+        f"[STATS] 关注 - 检查 {checked} 个创作者，{unchanged} 个没有变化；"
+        f"请求 {requests_made} 次（其中 304 {not_modified} 次，重试 {retries} 次），下载 {bytes_downloaded} 字节，"
+        f"约节省 {bytes_saved} 字节"
+    )
 
 
 def check_following_posts(
         api: FanboxAPI,
-        state: Dict[str, str],
+        state: StateStore,
         bark_key: Optional[str],
         bark_group: str,
         limit: int,
-        default_min_fee: int,
-        config_path: str,
+        fee_store: CreatorMinFeeStore,
         language: str = "en",
-) -> Tuple[Dict[str, str], list[Dict[str, str]]]:
+        concurrency: int = 1,
+        scheduler: Optional[AdaptivePollScheduler] = None,
+        first_page_size: int = 10,
+        max_posts: int = 200,
+        probe: bool = True,
+        print_stats: bool = False,
+        dispatcher: Optional[NotificationDispatcher] = None,
+        coalescer: Optional[NotificationCoalescer] = None,
+        post_cache: Optional[Dict[Tuple[str, Optional[str]], List[FanboxPost]]] = None,
+        following_cache: Optional[FollowingCache] = None,
+        registry: Optional[CreatorRegistry] = None,
+        events: Optional[EventStream] = None,
+        shard: Optional[ShardSpec] = None,
+) -> list[Dict[str, str]]:
     """
-    检查关注的创作者是否有新投稿。
-    返回 (更新后的 state, 创作者列表)。
+    检查关注的创作者是否有新投稿，并把最新投稿 id 写入 state。
+    probe 为 True 时先用 limit=1 探测每个创作者的最新投稿，只有变化了才继续获取，
+    否则从 first_page_size 条的小页开始，翻页到上次看到的投稿为止。
+    print_stats 为 True 时打印本次的请求数、下载量以及探测和条件请求省下的流量。
+    concurrency > 1 时并发拉取各创作者的投稿列表。
+    传入 scheduler 时只检查按发帖节奏到期的创作者。
+    传入 post_cache 时与其他账号共用本轮已经拉取过的投稿列表（见 fetch_creators_posts）。
+    传入 following_cache 时从缓存中取关注者列表，并打印新关注和取消关注的创作者。
+    传入 registry 时跳过同时在赞助的创作者（已经由赞助投稿流检测过），
+    只把它们在关注这一路的最新投稿 id 同步为赞助这一路的，取消赞助后从正确的位置继续检测。
+    传入 events 时，每发现一篇新投稿就写出一条事件。
+    传入 shard 时只检测属于这个分片的创作者，新关注和取消关注的提示也只打印属于这个分片的。
+    返回创作者列表（包括本轮没有检查的创作者和其他分片的创作者）。
     """
     try:
-        creators = api.list_following_creators()
+        with timed(api.metrics, "list_following"):
+            if following_cache is not None:
+                creators = following_cache.get()
+            else:
+                creators = api.list_following_creators()
     except Exception as e:
         print(f"获取关注者列表失败: {e}", file=sys.stderr)
-        return state, []
+        return []
+
+    if following_cache is not None:
+        added, removed = following_cache.pop_changes()
+        for c in added:
+            if shard is None or shard.owns(c["creatorId"]):
+                print(f"[FOLLOW] 关注 - 新关注了 {c['name']} ({c['creatorId']})")
+        for c in removed:
+            if shard is None or shard.owns(c["creatorId"]):
+                print(f"[UNFOLLOW] 关注 - 取消关注了 {c['name']} ({c['creatorId']})")
 
     if not creators:
-        return state, []
+        return []
+
+    due_creators = creators
+    if shard is not None:
+        due_creators = [c for c in creators if shard.owns(c["creatorId"])]
+    if registry is not None:
+        owned = due_creators
+        due_creators = []
+        for c in owned:
+            creator_id = c["creatorId"]
+            if not registry.is_supporting(creator_id):
+                due_creators.append(c)
+                continue
+            supporting_last_id = state.get_last_id("supporting", creator_id)
+            if supporting_last_id is not None and state.get_last_id("following", creator_id) != supporting_last_id:
+                state.set_last_id("following", creator_id, supporting_last_id)
+        if api.metrics is not None:
+            api.metrics.count("following_deduplicated", len(owned) - len(due_creators))
+    if scheduler is not None:
+        due_ids = set(scheduler.due([c["creatorId"] for c in due_creators]))
+        due_creators = [c for c in due_creators if c["creatorId"] in due_ids]
+
+    stats_before = api.stats.snapshot()
+    posts_fetched = 0
+    unchanged = 0
 
-    new_state = dict(state)
-    for creator_info in creators:
+    # state 只在当前线程里访问，先查好每个创作者上次的最新投稿 id 再交给抓取线程
+    last_ids = {c["creatorId"]: state.get_last_id("following", c["creatorId"]) for c in due_creators}
+    fetched = fetch_creators_posts(
+        api, due_creators, last_ids, limit, first_page_size, max_posts, concurrency, probe, post_cache
+    )
+    for creator_info, posts, fetch_error in fetched:
         creator_id = creator_info["creatorId"]
         creator_name = creator_info["name"]
-        creator_icon_url = creator_info.get("iconUrl")
 
         try:
-            raw = api.list_creator_posts(creator_id, limit=limit)
-            posts = api.parse_posts_from_creator(raw, creator_id, creator_name, creator_icon_url)
+            if fetch_error is not None:
+                raise fetch_error
 
-            if not posts:
-                continue
-
-            state_key = creator_id
-            last_id = state.get(state_key)
+            posts_fetched += len(posts)
+            # 有记录的创作者没有产出投稿，说明条件请求返回了 304
+            if last_ids[creator_id] is not None and (not posts or str(posts[0].id) == str(last_ids[creator_id])):
+                unchanged += 1
 
-            # 确保配置文件中存在该创作者的最小监听金额配置
-            creator_min_fee = ensure_creator_min_fee(config_path, creator_id, default_min_fee)
+            if scheduler is not None:
+                scheduler.observe(creator_id, posts)
 
-            if last_id is None:
-                # 第一次看到这个创作者，记录最新 id，不提示
-                new_state[state_key] = posts[0].id
+            if not posts:
                 continue
 
-            # 查找所有符合条件的新帖子（最多10个）
-            new_posts = []
+            # 获取该创作者的最小监听金额（没有配置时会在运行结束后写入默认值）
+            scan = PostScan(last_ids[creator_id], fee_store.get(creator_id))
             for post in posts:
-                if str(post.id) == str(last_id):
-                    # 找到上次的帖子，停止继续查找
+                if scan.feed(post):
                     break
-                if post.fee_required >= creator_min_fee:
-                    new_posts.append(post)
-                if len(new_posts) >= 10:  # 最多10个
-                    break
-
-            # 通知所有符合条件的新帖子
-            for post in reversed(new_posts):  # 从最老的新帖开始通知
-                formatted_date = format_datetime(post.published_datetime)
-                fee_info = f" (收费: {post.fee_required}日元)" if post.fee_required > 0 else " (免费)"
-                print(
-                    f"[NEW] 关注 - {post.creator_name} ({creator_id}) 有新投稿："
-                    f"{post.title} (id={post.id}, 发布于 {formatted_date}{fee_info})"
-                )
-                notify_bark(bark_key, bark_group, post, "following", language)
+            announce_new_posts(
+                "following", scan.new_posts, bark_key, bark_group, language, dispatcher, coalescer, events
+            )
+            state.record_posts("following", scan.seen_posts, (post.id for post in scan.new_posts))
 
             # 更新状态为最新的帖子ID
-            new_state[state_key] = posts[0].id
+            state.set_last_id("following", creator_id, scan.newest_id)
 
         except Exception as e:
             print(f"检查关注者 {creator_name} ({creator_id}) 的投稿失败: {e}", file=sys.stderr)
             continue
 
+    if print_stats:
+        print_fetch_stats(api, stats_before, len(due_creators), unchanged, posts_fetched, first_page_size if probe else 0)
+
     # 返回创作者列表（用于保存到配置文件）
     creators_list = [
         {
@@ -323,94 +905,525 @@ def check_following_posts(
         }
         for c in creators
     ]
-    return new_state, creators_list
+    return creators_list
 
 
 
 def run_once(
     api: FanboxAPI,
-    state: Dict[str, str],
+    state: StateStore,
     bark_key: Optional[str],
     bark_group: str,
     limit: int,
     check_following: bool,
-    default_min_fee: int,
+    fee_store: CreatorMinFeeStore,
     creators_file: str,
-    config_path: str,
     language: str = "en",
-) -> Dict[str, str]:
+    concurrency: int = 1,
+    scheduler: Optional[AdaptivePollScheduler] = None,
+    first_page_size: int = 10,
+    max_posts: int = 200,
+    probe: bool = True,
+    print_stats: bool = False,
+    dispatcher: Optional[NotificationDispatcher] = None,
+    coalescer: Optional[NotificationCoalescer] = None,
+    post_cache: Optional[Dict[Tuple[str, Optional[str]], List[FanboxPost]]] = None,
+    following_cache: Optional[FollowingCache] = None,
+    events: Optional[EventStream] = None,
+    shard: Optional[ShardSpec] = None,
+    supporting_cache: Optional[SupportingPlansCache] = None,
+) -> None:
     """
     执行一次检测：
       - 检查正在赞助的创作者（post.listSupporting）
-      - 如果配置开启，也检查关注的创作者（creator.listFollowing + post.listCreator）
-      - 与 state 比较，打印"发现新投稿"的提示并发送 Bark 通知
-      - 保存赞助者和关注者列表到配置文件
-      - 返回更新后的 state
-    """
-    # 检查赞助的创作者
-    new_state, supporting_creators = check_supporting_posts(
-        api, state, bark_key, bark_group, limit, default_min_fee, config_path, language
-    )
+      - 如果配置开启，也检查关注的创作者（creator.listFollowing + post.listCreator），
+        同时在赞助的创作者（plan.listSupporting）只检测一次，按赞助通知；
+        传入 scheduler 时只检查按发帖节奏到期的关注者，传入 following_cache 时关注者列表从缓存中取，
+        传入 supporting_cache 时赞助中的创作者列表也从缓存中取
+      - 与 state 比较，打印"发现新投稿"的提示并发送通知（传入 coalescer 时在本轮结束后合并发送到它的所有通知目标，
+        否则发送 bark_key 对应的 Bark 通知；传入 dispatcher 时放进发送队列）；传入 events 时同时写出 NDJSON 事件
+      - 传入 shard 时只检测属于这个分片的创作者（见 shard.py），创作者列表仍然保存完整的
+      - 保存赞助者和关注者列表到配置文件，并写回新创作者的最小监听金额默认值
+      - 提交 state 的变化
+    """
+    metrics = api.metrics
+    try:
+        # 检查赞助的创作者
+        with timed(metrics, "supporting"):
+            supporting_creators = check_supporting_posts(
+                api, state, bark_key, bark_group, limit, fee_store, language, max_posts, dispatcher, coalescer, events,
+                shard,
+            )
+
+        # 如果配置开启，也检查关注的创作者（其中列出关注者单独计入 list_following）
+        following_creators = None
+        if check_following:
+            # 同时在赞助的创作者已经由上面的赞助投稿流检测过，关注这一路跳过它们
+            registry = CreatorRegistry()
+            registry.add_supporting(supporting_creators)
+            try:
+                with timed(metrics, "list_supporting"):
+                    if supporting_cache is not None:
+                        registry.add_supporting(supporting_cache.get())
+                    else:
+                        registry.add_supporting(api.list_supporting_creators())
+            except Exception as e:
+                # 拿不到完整的赞助列表时，只跳过本轮赞助投稿流里出现过的创作者
+                print(f"获取赞助中的创作者列表失败: {e}", file=sys.stderr)
+            with timed(metrics, "following"):
+                following_creators = check_following_posts(
+                    api, state, bark_key, bark_group, limit, fee_store, language, concurrency, scheduler,
+                    first_page_size, max_posts, probe, print_stats, dispatcher, coalescer, post_cache, following_cache,
+                    registry, events, shard,
+                )
+
+        # 保存创作者列表到配置文件
+        with timed(metrics, "save_creators"):
+            save_creators(
+                creators_file,
+                supporting_creators,
+                following_creators,
+                following_cache.updated_at if following_cache is not None else None,
+                supporting_cache.creators if supporting_cache is not None else None,
+                supporting_cache.updated_at if supporting_cache is not None else None,
+            )
+        # 一次性写回新发现的创作者的最小监听金额默认值
+        with timed(metrics, "save_fees"):
+            fee_store.flush()
+    finally:
+        # 合并本轮的通知并发出；检测中途出错时，已经检测到的通知也照样发出
+        if coalescer is not None:
+            with timed(metrics, "notify"):
+                coalescer.flush()
+    # 先等通知发送完（未送达的保存到 outbox），再提交 state
+    if dispatcher is not None:
+        with timed(metrics, "notify_drain"):
+            dispatcher.drain()
+    with timed(metrics, "save_state"):
+        state.commit()
+    if scheduler is not None:
+        with timed(metrics, "save_schedule"):
+            scheduler.save()
+
+
+class Monitor:
+    """
+    持有检测所需的全部对象：配置、每个账号的 FanboxAPI 会话和状态存储、最小监听金额缓存、轮询调度器和通知发送队列。
+    所有账号共用同一个连接池、限速器、调度器和通知发送队列，一轮检测中依次检测每个账号，
+    多个账号关注的同一个创作者只拉取一次投稿列表。
+    单次运行（cron）时只调用一次 poll()；守护模式下这些对象在多次 poll() 之间常驻内存，
+    只有配置文件的修改时间变化时才重新加载配置。
+    """
 
-    # 如果配置开启，也检查关注的创作者
-    following_creators = None
-    if check_following:
-        new_state, following_creators = check_following_posts(
-            api, new_state, bark_key, bark_group, limit, default_min_fee, config_path, language
+    def __init__(self, config_path: str, shard: Optional[ShardSpec] = None) -> None:
+        self.config_path = config_path
+        # 作为分片工作进程运行时只检测属于这个分片的创作者，状态等文件也是分片自己的（见 shard.apply_shard）
+        self.shard = shard
+        self.cfg: Optional[MonitorConfig] = None
+        self.apis: Dict[str, FanboxAPI] = {}
+        self.states: Dict[str, StateStore] = {}
+        self.fee_store: Optional[CreatorMinFeeStore] = None
+        self.scheduler: Optional[AdaptivePollScheduler] = None
+        self.dispatcher: Optional[NotificationDispatcher] = None
+        self.following_caches: Dict[str, FollowingCache] = {}
+        self.supporting_caches: Dict[str, SupportingPlansCache] = {}
+        self.archive: Optional[PostArchive] = None
+        self.events: Optional[EventStream] = None
+        self.dns_cache: Optional["DNSCache"] = None
+        # 守护模式下的累计指标和最近一次检测的指标
+        self.total_metrics = RunMetrics()
+        self.last_metrics: Optional[RunMetrics] = None
+        self.runs = 0
+        self._config_mtime: Optional[int] = None
+        self.load_config()
+
+    @property
+    def language(self) -> str:
+        return self.cfg.language or "en"
+
+    def load_config(self) -> None:
+        """
+        加载（或重新加载）配置。加载失败时抛出异常，并保留原来的配置。
+        会话和状态存储只有在相关配置变化时才重新创建，实际创建推迟到下一次 poll()。
+        """
+        mtime = os.stat(self.config_path).st_mtime_ns
+        cfg = load_config(self.config_path)
+        if self.shard is not None:
+            cfg = apply_shard(cfg, self.shard)
+        old = self.cfg
+        self.cfg = cfg
+        self._config_mtime = mtime
+        if old is None or self._api_settings(old) != self._api_settings(cfg):
+            self._close_apis()
+        if old is None or self._state_settings(old) != self._state_settings(cfg):
+            self._close_state()
+        if old is None or self._dispatcher_settings(old) != self._dispatcher_settings(cfg):
+            self._close_dispatcher()
+        if old is None or old.archive_file != cfg.archive_file:
+            self._close_archive()
+        if old is None or self._event_settings(old) != self._event_settings(cfg):
+            self._close_events()
+        # creator_min_fees 也保存在配置文件里，配置变化时需要重新读取
+        self.fee_store = None
+        self.scheduler = None
+        # 关注者列表和赞助中的创作者列表的缓存会从 creators_file 重新读取，不会因此多请求一次
+        self.following_caches = {}
+        self.supporting_caches = {}
+
+    @staticmethod
+    def _api_settings(cfg: MonitorConfig) -> Tuple:
+        """
+        影响 FanboxAPI 会话的配置项，变化时需要重新创建会话。
+        """
+        return (
+            tuple((a.name, a.cookie, a.proxy) for a in cfg.accounts),
+            cfg.concurrency,
+            cfg.rate_limit,
+            cfg.rate_burst,
+            cfg.max_retries,
+            cfg.backoff_base,
+            cfg.backoff_max,
+            cfg.http_transport,
+            cfg.dns_cache_file,
+            cfg.dns_cache_ttl,
         )
 
-    # 保存创作者列表到配置文件
-    save_creators(creators_file, supporting_creators, following_creators)
+    @staticmethod
+    def _state_settings(cfg: MonitorConfig) -> Tuple:
+        return (tuple((a.name, a.state_file) for a in cfg.accounts), cfg.state_backend)
 
-    return new_state
+    @staticmethod
+    def _dispatcher_settings(cfg: MonitorConfig) -> Tuple:
+        return (cfg.outbox_file, cfg.notify_workers, cfg.notify_retries, cfg.bark_server)
 
+    @staticmethod
+    def _event_settings(cfg: MonitorConfig) -> Tuple:
+        return (cfg.event_output, cfg.event_file_max_bytes, cfg.event_file_backups)
 
-def main() -> None:
-    config_path = "fanbox_monitor_config.json"
-    cfg = None
-    try:
-        cfg = load_config(config_path)
-    except Exception as e:
-        error_msg = f"{translate('config_load_error', 'en')}: {e}"
-        print(error_msg, file=sys.stderr)
-        # 如果配置加载失败，无法获取 bark_key，所以无法发送通知
-        sys.exit(1)
+    def reload_config_if_changed(self) -> bool:
+        """
+        配置文件的修改时间变化时重新加载配置，返回是否重新加载。
+        """
+        try:
+            mtime = os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._config_mtime:
+            return False
+        self.load_config()
+        return True
 
-    language = cfg.language or "en"
-    
-    try:
-        api = FanboxAPI(cookie=cfg.cookie, proxy=cfg.proxy)
-        state_path = Path(cfg.state_file)
-        state = load_state(state_path)
+    def _open(self) -> None:
+        cfg = self.cfg
+        if not self.apis:
+            self.dns_cache = None
+            if cfg.dns_cache_ttl > 0:
+                from transport import DNSCache
+
+                self.dns_cache = DNSCache(cfg.dns_cache_file, cfg.dns_cache_ttl)
+            shared: Optional[FanboxAPI] = None
+            for account in cfg.accounts:
+                # 第一个账号创建连接池和限速器，其余账号共用
+                api = FanboxAPI(
+                    cookie=account.cookie,
+                    proxy=account.proxy,
+                    pool_size=max(10, cfg.concurrency),
+                    rate_limit=cfg.rate_limit,
+                    rate_burst=cfg.rate_burst,
+                    max_retries=cfg.max_retries,
+                    backoff_base=cfg.backoff_base,
+                    backoff_max=cfg.backoff_max,
+                    session=shared.session if shared is not None else None,
+                    rate_limiter=shared.rate_limiter if shared is not None else None,
+                    transport=cfg.http_transport,
+                    dns_cache=self.dns_cache,
+                )
+                shared = shared or api
+                self.apis[account.name] = api
+        if not self.following_caches:
+            for account in cfg.accounts:
+                if account.check_following:
+                    self.following_caches[account.name] = FollowingCache(
+                        self.apis[account.name], account.creators_file, cfg.following_ttl
+                    )
+                    self.supporting_caches[account.name] = SupportingPlansCache(
+                        self.apis[account.name], account.creators_file, cfg.following_ttl
+                    )
+        if not self.states:
+            for account in cfg.accounts:
+                self.states[account.name] = open_state_store(account.state_file, cfg.state_backend)
+        if self.fee_store is None:
+            self.fee_store = CreatorMinFeeStore(
+                self.config_path,
+                cfg.min_fee_required,
+                self.shard.min_fees_path(self.config_path) if self.shard is not None else None,
+            )
+        if self.dispatcher is None:
+            self.dispatcher = NotificationDispatcher(
+                cfg.outbox_file, cfg.notify_workers, cfg.notify_retries, bark_server=cfg.bark_server
+            )
+        if self.archive is None and cfg.archive_file:
+            self.archive = PostArchive(cfg.archive_file)
+        if self.scheduler is None and cfg.adaptive_polling:
+            self.scheduler = AdaptivePollScheduler(
+                cfg.schedule_file,
+                cfg.min_poll_interval,
+                cfg.max_poll_interval,
+                cfg.hourly_request_budget,
+            )
+
+    def _open_events(self) -> None:
+        cfg = self.cfg
+        if self.events is not None or not cfg.event_output:
+            return
+        try:
+            self.events = EventStream(
+                open_sink(cfg.event_output, cfg.event_file_max_bytes, cfg.event_file_backups),
+                {"shard": self.shard.name} if self.shard is not None else None,
+            )
+        except Exception as e:
+            # 事件流打不开时照常检测和通知，下一轮再试
+            print(f"打开事件输出 {cfg.event_output} 失败: {e}", file=sys.stderr)
 
-        # 单次执行：用于外部定时器调用（如计划任务 / cron）
+    def poll(self) -> None:
+        """
+        依次检测每个账号，出错时打印错误并发送错误通知，不会抛出异常。
+        一个账号出错（例如 Cookie 过期）不影响其他账号。
+        """
+        self._open_events()
+        if self.events is not None and self.events.to_stdout:
+            # 标准输出只留给事件流，[NEW] 等文字提示在检测期间改为输出到标准错误
+            with contextlib.redirect_stdout(sys.stderr):
+                self._poll()
+        else:
+            self._poll()
+
+    def _poll(self) -> None:
+        cfg = self.cfg
+        language = self.language
+        run_metrics = RunMetrics()
         try:
-            new_state = run_once(
-                api,
-                state,
-                cfg.bark_key,
-                cfg.bark_group,
+            self._open()
+            for api in self.apis.values():
+                api.metrics = run_metrics
+                api.archive = self.archive
+            self.dispatcher.metrics = run_metrics
+            # 守护模式下，上一轮没有送达的通知在这一轮重新发送
+            self.dispatcher.resend_pending()
+            if self.scheduler is not None:
+                self.scheduler.begin_cycle()
+            # 只有一个账号时没有可以共用的结果
+            post_cache = {} if len(cfg.accounts) > 1 else None
+            for account in cfg.accounts:
+                self._poll_account(account, post_cache)
+        except Exception as e:
+            error_msg = f"{translate('runtime_error', language)}: {e}"
+            print(error_msg, file=sys.stderr)
+            for account in cfg.accounts:
+                notify_error(account.notifiers, account.bark_group, error_msg, language, self.dispatcher)
+        finally:
+            # 正常情况下 run_once 提交 state 前已经等过（并计入 notify_drain），这里只送出出错时剩下的通知
+            if self.dispatcher is not None:
+                self.dispatcher.drain()
+            if self.archive is not None:
+                try:
+                    with run_metrics.phase("save_archive"):
+                        run_metrics.count("archived", self.archive.flush())
+                except Exception as e:
+                    print(f"写入投稿归档失败: {e}", file=sys.stderr)
+            if self.dns_cache is not None:
+                try:
+                    self.dns_cache.save()
+                except Exception as e:
+                    print(f"保存 DNS 缓存失败: {e}", file=sys.stderr)
+            self._record_metrics(run_metrics)
+
+    def _record_metrics(self, run_metrics: RunMetrics) -> None:
+        """
+        累计本次检测的指标，并按配置写出 JSON 运行报告。
+        """
+        run_metrics.finish()
+        self.last_metrics = run_metrics
+        self.total_metrics.merge(run_metrics)
+        self.runs += 1
+        if self.cfg.metrics_file:
+            try:
+                run_metrics.write_report(self.cfg.metrics_file)
+            except Exception as e:
+                print(f"写入运行报告失败: {e}", file=sys.stderr)
+
+    def render_metrics(self) -> str:
+        """
+        Prometheus 文本格式的指标，供守护模式的 /metrics 接口使用。
+        """
+        return format_prometheus(self.total_metrics, self.last_metrics, self.runs)
+
+    def _poll_account(
+            self,
+            account: AccountConfig,
+            post_cache: Optional[Dict[Tuple[str, Optional[str]], List[FanboxPost]]],
+    ) -> None:
+        cfg = self.cfg
+        language = self.language
+        coalescer = NotificationCoalescer(
+            account.notifiers,
+            account.bark_group,
+            language,
+            self.dispatcher,
+            cfg.digest_threshold,
+            cfg.digest_window,
+            cfg.max_notifications_per_run,
+        )
+        try:
+            run_once(
+                self.apis[account.name],
+                self.states[account.name],
+                account.bark_key,
+                account.bark_group,
                 cfg.limit,
-                cfg.check_following,
-                cfg.min_fee_required,
-                cfg.creators_file,
-                config_path,
+                account.check_following,
+                self.fee_store,
+                account.creators_file,
                 language,
+                cfg.concurrency,
+                self.scheduler,
+                cfg.first_page_size,
+                cfg.max_posts,
+                cfg.probe_first,
+                cfg.print_stats,
+                self.dispatcher,
+                coalescer,
+                post_cache,
+                self.following_caches.get(account.name),
+                self.events.bind(account=account.name) if self.events is not None else None,
+                self.shard,
+                self.supporting_caches.get(account.name),
             )
-            save_state(state_path, new_state)
         except Exception as e:
             error_msg = f"{translate('detection_error', language)}: {e}"
+            if len(cfg.accounts) > 1:
+                error_msg = f"[{account.name}] {error_msg}"
             print(error_msg, file=sys.stderr)
             # 发送错误通知
-            notify_error_bark(cfg.bark_key, cfg.bark_group, error_msg, language)
+            notify_error(account.notifiers, account.bark_group, error_msg, language, self.dispatcher)
+
+    def prefetch_following(self) -> None:
+        """
+        守护模式下每轮检测之后调用：下一轮之前会过期的关注者列表和赞助中的创作者列表缓存在后台提前刷新。
+        """
+        if self.cfg.following_ttl <= 0:
+            return
+        for cache in (*self.following_caches.values(), *self.supporting_caches.values()):
+            cache.refresh_in_background(margin=self.cfg.poll_interval)
+
+    def _close_apis(self) -> None:
+        # 所有账号可能共用同一个会话，每个会话只关闭一次
+        sessions = {id(api.session): api for api in self.apis.values()}
+        for api in sessions.values():
+            api.close()
+        self.apis = {}
+
+    def _close_state(self) -> None:
+        for state in self.states.values():
+            state.close()
+        self.states = {}
+
+    def _close_dispatcher(self) -> None:
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+            self.dispatcher = None
+
+    def _close_archive(self) -> None:
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+
+    def _close_events(self) -> None:
+        if self.events is not None:
+            self.events.close()
+            self.events = None
+
+    def close(self) -> None:
+        self._close_apis()
+        self._close_dispatcher()
+        self._close_state()
+        self._close_archive()
+        self._close_events()
+        close_direct_notifiers()
+
+
+def run_daemon(monitor: Monitor) -> None:
+    """
+    守护模式：在进程内按 poll_interval 循环检测，直到收到 SIGTERM / SIGINT。
+    收到信号后会等当前这一轮检测完成、状态保存后再退出。
+    """
+    stop = threading.Event()
+
+    def handle_signal(signum, frame) -> None:
+        print(f"收到信号 {signum}，本轮检测完成后退出", file=sys.stderr)
+        stop.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    metrics_server = None
+    if monitor.cfg.metrics_port:
+        metrics_server = MetricsServer(monitor.cfg.metrics_host, monitor.cfg.metrics_port, monitor.render_metrics)
+        host, port = metrics_server.address
+        print(f"Prometheus 指标：http://{host}:{port}/metrics", file=sys.stderr)
+
+    try:
+        while not stop.is_set():
+            started = time.monotonic()
+            try:
+                if monitor.reload_config_if_changed():
+                    print("配置文件已变化，已重新加载", file=sys.stderr)
+            except Exception as e:
+                # 新配置有问题时继续使用旧配置
+                print(f"{translate('config_load_error', monitor.language)}: {e}", file=sys.stderr)
+            monitor.poll()
+            monitor.prefetch_following()
+            elapsed = time.monotonic() - started
+            stop.wait(max(0.0, monitor.cfg.poll_interval - elapsed))
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        monitor.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fanbox creator update monitor")
+    parser.add_argument("--config", default="fanbox_monitor_config.json", help="配置文件路径")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="常驻运行，按配置中的 poll_interval 循环检测（默认只检测一次，适合 cron 调用）",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        help="作为分片工作进程运行，格式为 i/N（i 从 0 开始）：只检测按 creator_id 哈希分到第 i 个分片的创作者",
+    )
+    args = parser.parse_args()
+
+    try:
+        monitor = Monitor(args.config, args.shard)
     except Exception as e:
-        error_msg = f"{translate('runtime_error', language)}: {e}"
+        error_msg = f"{translate('config_load_error', 'en')}: {e}"
         print(error_msg, file=sys.stderr)
-        # 发送错误通知（如果配置已加载）
-        if cfg:
-            notify_error_bark(cfg.bark_key, cfg.bark_group, error_msg, language)
+        # 如果配置加载失败，无法获取通知目标，所以无法发送通知
+        sys.exit(1)
+
+    if args.daemon:
+        run_daemon(monitor)
+        return
+
+    # 单次执行：用于外部定时器调用（如计划任务 / cron）
+    try:
+        monitor.poll()
+    finally:
+        monitor.close()
 
 
 if __name__ == "__main__":
     main()
-
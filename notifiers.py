@@ -0,0 +1,293 @@
+import json
+import sys
+from abc import ABC, abstractmethod
+import threading
+from typing import Any, Dict, List, Optional
+
+# 通知消息的格式（与具体后端无关）：
+#   {"title": 标题, "content": 正文, "url": 点击后打开的地址（可选）,
+#    "group": 分组（可选，Bark 用来折叠同一创作者的通知）, "icon": 图标地址（可选）}
+#
+# 通知目标的配置（配置文件里 notifiers 列表的每一项）：
+#   {"type": "bark", "key": "...", "server": "https://bark.example.com/push"}
+#   {"type": "webhook", "url": "https://example.com/hook", "headers": {"Authorization": "..."}}
+#   {"type": "telegram", "token": "123:abc", "chat_id": "456", "api_url": "https://api.telegram.org"}
+#   {"type": "file", "path": "notifications.jsonl"}（path 为 "-" 时输出到标准输出）
+#   {"type": "onepush", "provider": "wechatworkbot", ...}（其余的项原样传给 onepush）
+
+# 官方 Bark 服务器的推送地址
+BARK_SERVER = "https://api.day.app/push"
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+# 每种后端必填的配置项
+REQUIRED_FIELDS = {
+    "bark": ("key",),
+    "webhook": ("url",),
+    "telegram": ("token", "chat_id"),
+    "file": ("path",),
+    "onepush": ("provider",),
+}
+
+
+class NotificationError(RuntimeError):
+    """
+    通知后端返回了失败的结果。status 是 HTTP 状态码（没有时为 None）。
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def validate_target(target: Any, where: str = "notifiers") -> Dict[str, Any]:
+    """
+    检查一个通知目标的配置，返回原样的 dict，有问题时抛出 ValueError。
+    """
+    if not isinstance(target, dict):
+        raise ValueError(f"{where} 的每一项都必须是对象。")
+    kind = target.get("type")
+    if kind not in REQUIRED_FIELDS:
+        raise ValueError(f"{where} 中的 type 只能是 {' / '.join(REQUIRED_FIELDS)}，当前为 {kind}。")
+    for name in REQUIRED_FIELDS[kind]:
+        if not target.get(name):
+            raise ValueError(f"{where} 中 {kind} 类型的通知目标缺少 {name} 字段。")
+    return target
+
+
+class Notifier(ABC):
+    """
+    通知后端的接口：send() 发送一条消息，成功时返回状态（用于统计），失败时抛出异常。
+    同一个实例会被多个发送线程共用，实现必须是线程安全的。
+    """
+
+    kind = ""
+
+    @abstractmethod
+    def send(self, message: Dict[str, Any]) -> Any:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class HTTPNotifier(Notifier):
+    """
+    通过 HTTP 发送的后端的基类：所有发送共用一个 requests.Session，
+    连接保持复用（keep-alive），不必每条通知都重新建立 TCP 和 TLS 连接。
+    """
+
+    def __init__(self, timeout: float = 10, pool_size: int = 4) -> None:
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def _post(self, url: str, **kwargs: Any) -> int:
+        resp = self.session.post(url, timeout=self.timeout, **kwargs)
+        if not resp.ok:
+            raise NotificationError(f"HTTP {resp.status_code} {resp.text[:200]}", resp.status_code)
+        return resp.status_code
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class BarkNotifier(HTTPNotifier):
+    """
+    Bark（https://github.com/Finb/Bark）推送，使用 Bark 服务器的 JSON 接口。
+    """
+
+    kind = "bark"
+
+    def __init__(self, key: str, server: Optional[str] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.key = key
+        url = (server or BARK_SERVER).rstrip("/")
+        # 与 onepush 一样，地址不以 /push 结尾时自动补上
+        self.url = url if url.endswith("/push") else url + "/push"
+
+    def send(self, message: Dict[str, Any]) -> Any:
+        payload = {
+            "device_key": self.key,
+            "title": message.get("title"),
+            "body": message.get("content"),
+            "url": message.get("url"),
+            "group": message.get("group"),
+            "icon": message.get("icon"),
+        }
+        return self._post(self.url, json={k: v for k, v in payload.items() if v is not None})
+
+
+class WebhookNotifier(HTTPNotifier):
+    """
+    通用 Webhook：把消息原样以 JSON POST 到指定地址，可以附加自定义请求头（例如鉴权）。
+    """
+
+    kind = "webhook"
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.url = url
+        self.headers = dict(headers or {})
+
+    def send(self, message: Dict[str, Any]) -> Any:
+        return self._post(self.url, json=message, headers=self.headers)
+
+
+class TelegramNotifier(HTTPNotifier):
+    """
+    Telegram Bot 的 sendMessage 接口。api_url 可以指向自建的 Bot API 服务器或兼容的服务。
+    """
+
+    kind = "telegram"
+
+    def __init__(self, token: str, chat_id: str, api_url: Optional[str] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.url = f"{(api_url or TELEGRAM_API_URL).rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+
+    def send(self, message: Dict[str, Any]) -> Any:
+        lines = [message.get("title"), message.get("content"), message.get("url")]
+        text = "\n".join(str(line) for line in lines if line)
+        return self._post(self.url, json={"chat_id": self.chat_id, "text": text})
+
+
+class FileNotifier(Notifier):
+    """
+    把每条消息作为一行 JSON 追加到本地文件（path 为 "-" 时输出到标准输出），方便调试或交给其他程序处理。
+    """
+
+    kind = "file"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, message: Dict[str, Any]) -> Any:
+        line = json.dumps(message, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self.path == "-":
+                sys.stdout.write(line)
+                sys.stdout.flush()
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        return "ok"
+
+
+class OnePushNotifier(Notifier):
+    """
+    通过 onepush 发送到它支持的其他渠道（企业微信、钉钉、Server 酱等）。
+    onepush 每次发送都新建连接，且 notifier 在发送时会修改自身属性，所以这里加锁逐条发送。
+    """
+
+    def __init__(self, provider: str, **params: Any) -> None:
+        self.kind = f"onepush.{provider}"
+        self.provider = provider
+        self.params = params
+        self._notifier = None
+        self._lock = threading.Lock()
+
+    def send(self, message: Dict[str, Any]) -> Any:
+        with self._lock:
+            if self._notifier is None:
+                from onepush import get_notifier
+
+                self._notifier = get_notifier(self.provider)
+            # onepush 出错时返回 None 而不是抛出异常
+            resp = self._notifier.notify(
+                title=message.get("title"), content=message.get("content"), **self.params
+            )
+        if resp is None:
+            raise NotificationError("no response")
+        if not resp.ok:
+            raise NotificationError(f"HTTP {resp.status_code}", resp.status_code)
+        return resp.status_code
+
+
+def create_notifier(target: Dict[str, Any]) -> Notifier:
+    """
+    根据通知目标的配置创建后端。
+    """
+    kind = validate_target(target)["type"]
+    if kind == "bark":
+        return BarkNotifier(str(target["key"]), target.get("server"))
+    if kind == "webhook":
+        return WebhookNotifier(str(target["url"]), target.get("headers"))
+    if kind == "telegram":
+        return TelegramNotifier(str(target["token"]), str(target["chat_id"]), target.get("api_url"))
+    if kind == "file":
+        return FileNotifier(str(target["path"]))
+    return OnePushNotifier(**{k: v for k, v in target.items() if k != "type"})
+
+
+def target_id(target: Dict[str, Any]) -> str:
+    """
+    通知目标的唯一标识，相同配置的目标共用一个后端实例（和连接池）。
+    """
+    return json.dumps(target, sort_keys=True, ensure_ascii=False)
+
+
+# send_to_targets 使用的后端，按 target_id 缓存：与 NotificationDispatcher 一样每个目标一个实例，
+# 直接发送的多条通知共用同一个连接池
+_direct_notifiers: Dict[str, Notifier] = {}
+_direct_lock = threading.Lock()
+
+
+def _direct_notifier(target: Dict[str, Any]) -> Notifier:
+    key = target_id(target)
+    with _direct_lock:
+        notifier = _direct_notifiers.get(key)
+        if notifier is None:
+            notifier = _direct_notifiers[key] = create_notifier(target)
+        return notifier
+
+
+def close_direct_notifiers() -> None:
+    """
+    关闭 send_to_targets 缓存的后端（释放连接池）。之后再发送时会重新创建。
+    """
+    with _direct_lock:
+        notifiers = list(_direct_notifiers.values())
+        _direct_notifiers.clear()
+    for notifier in notifiers:
+        notifier.close()
+
+
+def send_to_targets(message: Dict[str, Any], targets: List[Dict[str, Any]]) -> None:
+    """
+    不经过发送队列，直接把一条消息发送到所有目标。多个目标时并行发送，
+    总耗时取决于最慢的目标，而不是各目标耗时之和。单个目标失败时打印错误，不影响其他目标。
+    """
+    def send(target: Dict[str, Any]) -> None:
+        try:
+            _direct_notifier(target).send(message)
+        except Exception as e:
+            print(f"通知发送失败（{target['type']}）: {e}", file=sys.stderr)
+
+    if len(targets) <= 1:
+        for target in targets:
+            send(target)
+        return
+    threads = [threading.Thread(target=send, args=(target,), daemon=True) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
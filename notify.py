@@ -0,0 +1,231 @@
+import json
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from config import atomic_write_text
+from notifiers import Notifier, create_notifier, target_id
+
+if TYPE_CHECKING:
+    from metrics import RunMetrics
+
+# 发送失败的通知最多在 outbox 里保留多久（秒），超过后放弃
+OUTBOX_MAX_AGE = 7 * 24 * 3600
+
+
+class NotificationDispatcher:
+    """
+    通知的发送队列：检测循环只负责把通知放进队列，由后台线程池负责发送，
+    慢的通知服务不会拖慢对其他创作者的检测。
+      - 每个通知目标（见 notifiers.py）有自己的一组发送线程和一个后端实例，
+        后端在所有发送之间复用连接池；多个目标并行发送，增加一个目标不会让每条通知的耗时翻倍
+      - 同一目标、同一分组（即同一创作者）的通知总是由同一个线程按提交顺序发送，保持先旧后新的顺序
+      - 发送失败时按指数退避重试，仍然失败的通知保存在 outbox 文件里，下次运行时重新发送
+    outbox 在 drain() 时写入，调用方应在提交 state 之前调用 drain()：
+    这样即使进程中途崩溃，state 也没有前进，下次运行会重新检测到这些投稿。
+    """
+
+    def __init__(
+        self,
+        outbox_file: Optional[str] = None,
+        workers: int = 2,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        bark_server: Optional[str] = None,
+    ) -> None:
+        """
+        :param outbox_file: 保存未送达通知的文件，None 表示不持久化
+        :param workers: 每个通知目标同时发送通知的线程数
+        :param max_retries: 单条通知最多重试几次
+        :param backoff_base: 第一次重试前的等待时间（秒），之后每次翻倍
+        :param bark_server: 没有设置 server 的 Bark 目标使用的推送地址（例如 "https://bark.example.com/push"），
+                            None 表示使用官方服务器
+        """
+        self.outbox_path = Path(outbox_file) if outbox_file else None
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.bark_server = bark_server
+        # 设置后记录每次通知请求的延迟和结果（见 metrics.RunMetrics），按后端类型区分
+        self.metrics: Optional["RunMetrics"] = None
+        # 目标标识 -> 该目标的发送队列 / 后端实例
+        self._lanes: Dict[str, List["queue.Queue[Optional[str]]"]] = {}
+        self._notifiers: Dict[str, Notifier] = {}
+        self._outbox: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._queued: set = set()
+        self._dirty = False
+        self._load_outbox()
+
+    def _load_outbox(self) -> None:
+        if self.outbox_path is None or not self.outbox_path.exists():
+            return
+        try:
+            data = json.loads(self.outbox_path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        if not isinstance(data, dict):
+            return
+        now = time.time()
+        for item_id, item in data.items():
+            if not isinstance(item, dict) or not isinstance(item.get("params"), dict):
+                continue
+            if now - float(item.get("created_at") or 0) > OUTBOX_MAX_AGE:
+                self._dirty = True
+                continue
+            if not isinstance(item.get("target"), dict):
+                # 旧版本的 outbox 只有 Bark 通知，key 放在参数里
+                params = dict(item["params"])
+                key = params.pop("key", None)
+                if not key:
+                    self._dirty = True
+                    continue
+                item = {**item, "target": self._resolve({"type": "bark", "key": key}), "params": params}
+                self._dirty = True
+            self._outbox[item_id] = item
+        # 上次没有送达的通知，重新排队发送
+        self.resend_pending()
+
+    def resend_pending(self) -> None:
+        """
+        把 outbox 里还没有送达、也不在队列中的通知重新排队（守护模式下每轮检测开始时调用）。
+        """
+        with self._lock:
+            pending = [item_id for item_id in self._outbox if item_id not in self._queued]
+        for item_id in pending:
+            self._enqueue(item_id)
+
+    def _save_outbox(self) -> None:
+        if self.outbox_path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            text = json.dumps(self._outbox, ensure_ascii=False, indent=2)
+            self._dirty = False
+        atomic_write_text(str(self.outbox_path), text)
+
+    def _lane(self, key: str) -> List["queue.Queue[Optional[str]]"]:
+        """
+        返回目标 key 的发送队列，第一次用到时创建队列并启动发送线程。调用时必须持有 self._lock。
+        """
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = [queue.Queue() for _ in range(self.workers)]
+            for i, q in enumerate(lane):
+                thread = threading.Thread(
+                    target=self._worker, args=(key, q), name=f"notify-{len(self._lanes)}-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        return lane
+
+    def _enqueue(self, item_id: str) -> None:
+        with self._lock:
+            item = self._outbox[item_id]
+            self._queued.add(item_id)
+            group = str(item["params"].get("group") or "")
+            lane = self._lane(target_id(item["target"]))
+        lane[zlib.crc32(group.encode("utf-8")) % self.workers].put(item_id)
+
+    def submit(self, message: Dict[str, Any], target: Dict[str, Any]) -> None:
+        """
+        提交一条发往 target 的通知（消息格式和目标配置见 notifiers.py），立即返回。
+        """
+        target = self._resolve(target)
+        item_id = uuid.uuid4().hex
+        with self._lock:
+            self._outbox[item_id] = {"target": target, "params": message, "created_at": time.time()}
+            self._dirty = True
+        self._enqueue(item_id)
+
+    def _resolve(self, target: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        没有设置 server 的 Bark 目标使用 bark_server。
+        """
+        if target.get("type") == "bark" and not target.get("server") and self.bark_server:
+            return {**target, "server": self.bark_server}
+        return target
+
+    def _notifier(self, key: str, target: Dict[str, Any]) -> Notifier:
+        with self._lock:
+            notifier = self._notifiers.get(key)
+            if notifier is None:
+                notifier = self._notifiers[key] = create_notifier(target)
+            return notifier
+
+    def _worker(self, key: str, q: "queue.Queue[Optional[str]]") -> None:
+        while True:
+            item_id = q.get()
+            try:
+                if item_id is None:
+                    return
+                with self._lock:
+                    item = self._outbox.get(item_id)
+                if item is None:
+                    continue
+                if self._send(self._notifier(key, item["target"]), item["params"]):
+                    with self._lock:
+                        self._outbox.pop(item_id, None)
+                        self._dirty = True
+            except Exception as e:
+                print(f"通知发送失败: {e}", file=sys.stderr)
+            finally:
+                if item_id is not None:
+                    with self._lock:
+                        self._queued.discard(item_id)
+                q.task_done()
+
+    def _send(self, notifier: Notifier, message: Dict[str, Any]) -> bool:
+        """
+        发送一条通知，失败时按指数退避重试，返回是否成功。
+        """
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff_base * (2 ** (attempt - 1)) * random.uniform(0.5, 1.0))
+            metrics = self.metrics
+            started = time.perf_counter()
+            try:
+                status = notifier.send(message)
+                if metrics is not None:
+                    metrics.observe_request(notifier.kind, time.perf_counter() - started, status)
+                return True
+            except Exception as e:
+                if metrics is not None:
+                    status = getattr(e, "status", None) or type(e).__name__
+                    metrics.observe_request(notifier.kind, time.perf_counter() - started, status)
+                error = str(e)
+        print(f"通知发送失败（{notifier.kind}），下次运行时重试: {error}", file=sys.stderr)
+        return False
+
+    def drain(self) -> None:
+        """
+        等待队列中的通知全部发送完成（或用完重试次数），然后保存 outbox。
+        """
+        with self._lock:
+            queues = [q for lane in self._lanes.values() for q in lane]
+        for q in queues:
+            q.join()
+        self._save_outbox()
+
+    def close(self) -> None:
+        self.drain()
+        with self._lock:
+            queues = [q for lane in self._lanes.values() for q in lane]
+            self._lanes = {}
+        for q in queues:
+            q.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for notifier in self._notifiers.values():
+            notifier.close()
+        self._notifiers = {}
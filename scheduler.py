@@ -0,0 +1,180 @@
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from api import FanboxPost
+from config import atomic_write_text
+
+# 平均每个发帖间隔内轮询几次：间隔越短轮询越频繁
+POLLS_PER_POST = 4
+# 每个创作者保留最近多少篇投稿的发布时间，用来估计发帖间隔
+PUBLISHED_HISTORY = 10
+
+
+def parse_published(datetime_str: str) -> Optional[float]:
+    """
+    把 ISO 8601 时间字符串转换为时间戳，解析失败返回 None。
+    """
+    try:
+        return datetime.fromisoformat(datetime_str.replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+class AdaptivePollScheduler:
+    """
+    根据每个关注创作者的发帖节奏决定多久检查一次：
+      - 用观察到的 published_datetime 估计发帖间隔（取相邻投稿间隔的中位数）。最近几篇的发布时间会保存下来，
+        所以每次只看到一篇投稿（limit=1 的探测、第一次检查）时也能逐渐估计出间隔
+      - 很久没有发帖的创作者，按距上次发帖的时间放宽间隔
+      - 轮询间隔 = 发帖间隔 / POLLS_PER_POST，并限制在 [min_interval, max_interval] 之间
+      - 所有创作者的预计请求数超过每小时预算时，按比例放大全部间隔；额度按经过的时间累积（保留小数部分），
+        检测间隔很短时也不会因为取整而一直没有额度
+    调度信息保存在一个 JSON 文件里，cron 单次运行和守护模式都适用。
+    多个账号共用一个调度器时，每轮检测开始时调用 begin_cycle()：同一轮里对同一个创作者只做一次决定，
+    每小时预算的额度也在这一轮的所有账号之间共用。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        min_interval: int = 300,
+        max_interval: int = 86400,
+        hourly_budget: int = 0,
+    ) -> None:
+        """
+        :param path: 保存调度信息的文件
+        :param min_interval: 最短轮询间隔（秒），也是尚无发帖记录的创作者的轮询间隔
+        :param max_interval: 最长轮询间隔（秒）
+        :param hourly_budget: 每小时最多请求多少个创作者，0 表示不限制
+        """
+        self.path = Path(path)
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.hourly_budget = hourly_budget
+        self.last_run: Optional[float] = None
+        # 累积的请求额度（可以有小数），最多一小时的预算
+        self.credit = float(hourly_budget)
+        self.creators: Dict[str, Dict] = {}
+        self._dirty = False
+        # 本轮检测中已经做出的决定（creator_id -> 是否检查）和剩余的请求额度
+        self._decided: Dict[str, bool] = {}
+        self._allowance: Optional[int] = None
+        self._load()
+
+    def begin_cycle(self) -> None:
+        """
+        开始新一轮检测，清除上一轮的决定。
+        """
+        self._decided = {}
+        self._allowance = None
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.last_run = data.get("last_run")
+            if isinstance(data.get("credit"), (int, float)):
+                self.credit = min(float(data["credit"]), float(self.hourly_budget))
+            creators = data.get("creators") or {}
+            if isinstance(creators, dict):
+                self.creators = creators
+        except Exception:
+            pass
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        data = {"last_run": self.last_run, "credit": self.credit, "creators": self.creators}
+        atomic_write_text(str(self.path), json.dumps(data, ensure_ascii=False, indent=2))
+        self._dirty = False
+
+    def interval(self, creator_id: str, now: Optional[float] = None) -> float:
+        """
+        返回该创作者的轮询间隔（秒），不含预算带来的放大。
+        """
+        now = time.time() if now is None else now
+        info = self.creators.get(creator_id) or {}
+        cadence = info.get("cadence")
+        if not cadence:
+            return float(self.min_interval)
+        last_published = info.get("last_published")
+        if last_published:
+            # 超过平时的发帖间隔还没有新投稿，说明创作者可能不活跃了
+            cadence = max(cadence, now - last_published)
+        return float(min(self.max_interval, max(self.min_interval, cadence / POLLS_PER_POST)))
+
+    def due(self, creator_ids: List[str], now: Optional[float] = None) -> List[str]:
+        """
+        从 creator_ids 中选出这一轮应该检查的创作者，保持原有顺序。
+        """
+        now = time.time() if now is None else now
+        undecided = [creator_id for creator_id in dict.fromkeys(creator_ids) if creator_id not in self._decided]
+        if undecided:
+            selected = self._select(undecided, now)
+            for creator_id in undecided:
+                self._decided[creator_id] = creator_id in selected
+        return [creator_id for creator_id in creator_ids if self._decided.get(creator_id)]
+
+    def _select(self, creator_ids: List[str], now: float) -> set:
+        intervals = {creator_id: self.interval(creator_id, now) for creator_id in creator_ids}
+
+        scale = 1.0
+        allowance = len(creator_ids)
+        if self.hourly_budget > 0 and intervals:
+            hourly_rate = sum(3600.0 / i for i in intervals.values())
+            scale = max(1.0, hourly_rate / self.hourly_budget)
+            if self._allowance is None:
+                # 每轮开始时把距上次累积以来的时间换算成额度，最多一小时的预算
+                if self.last_run is not None:
+                    elapsed = max(0.0, now - self.last_run)
+                    self.credit = min(float(self.hourly_budget), self.credit + self.hourly_budget * elapsed / 3600.0)
+                self.last_run = now
+                self._allowance = int(self.credit)
+            allowance = self._allowance
+
+        overdue: Dict[str, float] = {}
+        for creator_id, interval in intervals.items():
+            last_polled = (self.creators.get(creator_id) or {}).get("last_polled")
+            if last_polled is None:
+                overdue[creator_id] = float("inf")
+            elif now - last_polled >= interval * scale:
+                overdue[creator_id] = (now - last_polled) / (interval * scale)
+
+        if len(overdue) > allowance:
+            # 额度不够时优先检查超期最久的创作者
+            selected = set(sorted(overdue, key=overdue.get, reverse=True)[:allowance])
+        else:
+            selected = set(overdue)
+        if self._allowance is not None:
+            self._allowance -= len(selected)
+            self.credit -= len(selected)
+        else:
+            self.last_run = now
+        self._dirty = True
+        return selected
+
+    def observe(self, creator_id: str, posts: List[FanboxPost], now: Optional[float] = None) -> None:
+        """
+        记录一次成功的检查，并根据投稿的发布时间更新发帖间隔的估计。
+        """
+        now = time.time() if now is None else now
+        info = self.creators.setdefault(creator_id, {})
+        info["last_polled"] = now
+        history = info.get("published") or ([info["last_published"]] if info.get("last_published") else [])
+        seen = (ts for ts in (parse_published(p.published_datetime) for p in posts) if ts is not None)
+        # 与之前看到的发布时间合并，只保留最近的 PUBLISHED_HISTORY 个
+        published = sorted(set(history).union(seen), reverse=True)[:PUBLISHED_HISTORY]
+        if published:
+            info["last_published"] = published[0]
+            info["published"] = published
+        gaps = [a - b for a, b in zip(published, published[1:]) if a > b]
+        if gaps:
+            # statistics 会连带导入 fractions / decimal 等模块，只在需要时导入
+            import statistics
+
+            info["cadence"] = statistics.median(gaps)
+        self._dirty = True
@@ -0,0 +1,247 @@
+"""
+按创作者分片：把关注（和赞助）的创作者按 creator_id 的稳定哈希分给 N 个工作进程，
+每个进程只检测、只通知属于自己的创作者，可以分布在同一台机器或多台机器上。
+
+单个工作进程（可以在不同机器上运行，编号从 0 开始）：
+    python monitor.py --shard 0/4 --daemon
+在本机启动全部工作进程，并定期合并各分片的创作者列表和最小监听金额：
+    python shard.py --workers 4 --daemon
+工作进程在其他机器上、分片文件在共享目录里时，只合并：
+    python shard.py --merge 4
+"""
+import argparse
+import dataclasses
+import json
+import signal
+import sys
+import threading
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from config import (
+    MonitorConfig,
+    account_file,
+    load_config,
+    load_creator_min_fees,
+    load_min_fee_defaults,
+    save_creator_min_fees,
+    write_text_if_changed,
+)
+
+MONITOR_SCRIPT = str(Path(__file__).resolve().with_name("monitor.py"))
+
+
+def shard_of(creator_id: str, count: int) -> int:
+    """
+    创作者所属的分片编号。使用 crc32，不受 PYTHONHASHSEED 影响，所有进程、所有机器上结果相同。
+    """
+    return zlib.crc32(creator_id.encode("utf-8")) % count
+
+
+@dataclass(frozen=True)
+class ShardSpec:
+    """
+    分片 index / count（index 从 0 开始）。
+    """
+    index: int
+    count: int
+
+    @property
+    def name(self) -> str:
+        return f"shard{self.index}-of-{self.count}"
+
+    def owns(self, creator_id: str) -> bool:
+        return shard_of(creator_id, self.count) == self.index
+
+    def path(self, path: str) -> str:
+        """
+        分片自己的文件名，例如 fanbox_monitor_state.json -> fanbox_monitor_state.shard0-of-4.json。
+        """
+        return account_file(path, self.name)
+
+    def min_fees_path(self, config_path: str) -> str:
+        """
+        分片写入新创作者最小监听金额默认值的文件，
+        例如 fanbox_monitor_config.json -> fanbox_monitor_config.min_fees.shard0-of-4.json。
+        """
+        p = Path(config_path)
+        return self.path(str(p.with_name(f"{p.stem}.min_fees{p.suffix}")))
+
+
+def parse_shard(value: str) -> ShardSpec:
+    """
+    解析命令行里的 "i/N"。
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"分片的格式应为 i/N（例如 0/4），当前为 {value}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"分片编号应满足 0 <= i < N，当前为 {value}")
+    return ShardSpec(index, count)
+
+
+def apply_shard(cfg: MonitorConfig, shard: ShardSpec) -> MonitorConfig:
+    """
+    返回分片使用的配置：
+      - 每个账号的 state_file、creators_file，以及 schedule_file、outbox_file、metrics_file 和写到文件的 event_output
+        改为分片自己的文件，分片之间互不干扰
+      - hourly_request_budget 平均分给各分片，metrics_port 依次加上分片编号，同一台机器上不冲突
+    archive_file 仍然共用（SQLite 支持多个进程同时写入）。
+    新创作者的最小监听金额默认值也写到分片自己的文件（见 ShardSpec.min_fees_path），由 merge_min_fees 合并到配置文件。
+    """
+    event_output = cfg.event_output
+    if event_output and event_output != "-" and not event_output.startswith("unix:"):
+        event_output = shard.path(event_output)
+    budget = cfg.hourly_request_budget
+    return dataclasses.replace(
+        cfg,
+        accounts=[
+            dataclasses.replace(
+                account, state_file=shard.path(account.state_file), creators_file=shard.path(account.creators_file)
+            )
+            for account in cfg.accounts
+        ],
+        schedule_file=shard.path(cfg.schedule_file),
+        outbox_file=shard.path(cfg.outbox_file),
+        metrics_file=shard.path(cfg.metrics_file) if cfg.metrics_file else None,
+        event_output=event_output,
+        hourly_request_budget=-(-budget // shard.count) if budget else 0,
+        metrics_port=cfg.metrics_port + shard.index if cfg.metrics_port else 0,
+    )
+
+
+def merge_creators(cfg: MonitorConfig, count: int) -> None:
+    """
+    把各分片的创作者列表合并到每个账号原来的 creators_file：
+    赞助者取各分片的并集，关注者列表和赞助中的创作者列表（supportingPlans）取最近一次从接口获取的那个分片的。
+    还没有运行过的分片会被跳过；内容没有变化时不重写文件。
+    """
+    for account in cfg.accounts:
+        supporting: Dict[str, Dict[str, Any]] = {}
+        # 带获取时间的列表：key -> (获取时间, 列表)
+        latest: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {}
+        found = False
+        for index in range(count):
+            path = Path(ShardSpec(index, count).path(account.creators_file))
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                print(f"读取分片的创作者列表 {path} 失败: {e}", file=sys.stderr)
+                continue
+            found = True
+            for c in data.get("supporting") or []:
+                supporting.setdefault(c["creatorId"], c)
+            for key in ("following", "supportingPlans"):
+                if isinstance(data.get(key), list):
+                    updated_at = data.get(f"{key}UpdatedAt") or ""
+                    if key not in latest or updated_at > latest[key][0]:
+                        latest[key] = (updated_at, data[key])
+        if not found:
+            continue
+        merged: Dict[str, Any] = {"supporting": list(supporting.values())}
+        for key, (updated_at, creators) in latest.items():
+            merged[key] = creators
+            if updated_at:
+                merged[f"{key}UpdatedAt"] = updated_at
+        write_text_if_changed(account.creators_file, json.dumps(merged, ensure_ascii=False, indent=2))
+
+
+def merge_min_fees(config_path: str, count: int) -> None:
+    """
+    把各分片记下的新创作者最小监听金额默认值补充到配置文件的 creator_min_fees，已有的值不覆盖。
+    只有这里写配置文件：分片工作进程各自改写同一个配置文件会互相覆盖，而且每次写入都会让所有分片重新加载配置。
+    没有新增的创作者时不重写文件。
+    """
+    creator_min_fees = load_creator_min_fees(config_path)
+    added = False
+    for index in range(count):
+        for creator_id, fee in load_min_fee_defaults(ShardSpec(index, count).min_fees_path(config_path)).items():
+            if creator_id not in creator_min_fees:
+                creator_min_fees[creator_id] = fee
+                added = True
+    if added:
+        save_creator_min_fees(config_path, creator_min_fees)
+
+
+class Coordinator:
+    """
+    在本机启动 N 个分片工作进程（monitor.py --shard i/N），并合并它们的创作者列表。
+      - 单次运行：等所有工作进程结束后合并一次，退出码取工作进程中最大的
+      - 守护模式：每隔 poll_interval 合并一次，意外退出的工作进程会被重新启动；
+        收到 SIGTERM / SIGINT 时转发给所有工作进程，等它们完成当前这一轮后再退出
+    """
+
+    def __init__(self, config_path: str, workers: int, daemon: bool = False) -> None:
+        self.config_path = config_path
+        self.workers = workers
+        self.daemon = daemon
+        self.stop = threading.Event()
+        self.processes: List[Any] = []
+
+    def _start(self, index: int):
+        import subprocess
+
+        args = [sys.executable, MONITOR_SCRIPT, "--config", self.config_path, "--shard", f"{index}/{self.workers}"]
+        if self.daemon:
+            args.append("--daemon")
+        return subprocess.Popen(args)
+
+    def merge(self) -> None:
+        try:
+            merge_creators(load_config(self.config_path), self.workers)
+            merge_min_fees(self.config_path, self.workers)
+        except Exception as e:
+            print(f"合并分片的创作者列表和最小监听金额失败: {e}", file=sys.stderr)
+
+    def run(self) -> int:
+        def handle_signal(signum, frame) -> None:
+            print(f"收到信号 {signum}，等待工作进程完成当前这一轮后退出", file=sys.stderr)
+            self.stop.set()
+            for process in self.processes:
+                if process.poll() is None:
+                    process.send_signal(signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, handle_signal)
+        signal.signal(signal.SIGINT, handle_signal)
+
+        self.processes = [self._start(i) for i in range(self.workers)]
+        if self.daemon:
+            interval = load_config(self.config_path).poll_interval
+            while not self.stop.wait(interval):
+                for i, process in enumerate(self.processes):
+                    if process.poll() is not None and not self.stop.is_set():
+                        print(f"分片 {i}/{self.workers} 已退出（退出码 {process.returncode}），重新启动", file=sys.stderr)
+                        self.processes[i] = self._start(i)
+                self.merge()
+        codes = [process.wait() for process in self.processes]
+        self.merge()
+        return max(codes, default=0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run or merge sharded Fanbox monitor workers")
+    parser.add_argument("--config", default="fanbox_monitor_config.json", help="配置文件路径")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--workers", type=int, help="在本机启动的分片工作进程数")
+    group.add_argument("--merge", type=int, metavar="N", help="只合并 N 个分片的创作者列表和最小监听金额，不启动工作进程")
+    parser.add_argument("--daemon", action="store_true", help="工作进程常驻运行（与 --workers 一起使用）")
+    args = parser.parse_args()
+
+    if args.merge is not None:
+        if args.merge < 1:
+            parser.error("--merge 必须大于 0")
+        merge_creators(load_config(args.config), args.merge)
+        merge_min_fees(args.config, args.merge)
+        return
+    if args.workers < 1:
+        parser.error("--workers 必须大于 0")
+    sys.exit(Coordinator(args.config, args.workers, args.daemon).run())
+
+
+if __name__ == "__main__":
+    main()
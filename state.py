@@ -0,0 +1,329 @@
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from api import FanboxPost
+from config import write_text_if_changed
+
+# 状态按来源区分：赞助（post.listSupporting）和关注（post.listCreator）
+SOURCES = ("supporting", "following")
+# 赞助投稿流上次看到的最新发布时间（见 StateStore.get_cursor）
+SUPPORTING_FEED_CURSOR = "supporting_feed"
+# 旧版本把赞助投稿流的位置当作一个名为 @feed 的赞助创作者保存
+LEGACY_FEED_CREATOR = "@feed"
+# JSON 状态文件里位置记录的 key 前缀
+CURSOR_PREFIX = "cursor"
+
+
+def load_state(path: Path) -> Dict[str, str]:
+    """
+    读取上次已知的每个创作者的最新投稿 id。
+    返回格式: {"supporting:creator_id": last_post_id, "following:creator_id": last_post_id}
+    使用 "type:creator_id" 作为 key 来区分赞助和关注。
+    旧版本的状态文件直接使用 creator_id 作为 key，读取时原样保留。
+    """
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(data, dict):
+            return {str(k): str(v) for k, v in data.items()}
+    except Exception:
+        pass
+    return {}
+
+
+def save_state(path: Path, state: Dict[str, str]) -> None:
+    """
+    原子地写入状态文件，内容没有变化时不写入。
+    """
+    write_text_if_changed(str(path), json.dumps(state, ensure_ascii=False, indent=2))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class StateStore(ABC):
+    """
+    状态存储接口：记录每个 (来源, 创作者) 上次看到的最新投稿 id，以及与创作者无关的位置记录
+    （例如赞助投稿流上次看到的最新发布时间，见 get_cursor）。
+    修改先缓存在内存中，调用 commit() 时再一次性持久化。
+    """
+
+    @abstractmethod
+    def get_last_id(self, source: str, creator_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set_last_id(self, source: str, creator_id: str, post_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def get_cursor(self, name: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set_cursor(self, name: str, value: str) -> None:
+        ...
+
+    def record_posts(self, source: str, posts: Iterable[FanboxPost], notified_ids: Iterable[str] = ()) -> None:
+        """
+        记录本次新看到的投稿及其通知状态。不保存历史的实现可以忽略。
+        """
+
+    @abstractmethod
+    def commit(self) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class JsonStateStore(StateStore):
+    """
+    基于单个 JSON 文件的状态存储（默认）。每次 commit 会整体重写文件，不保存历史。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._state = load_state(self.path)
+        self._dirty = self._migrate_legacy_keys()
+
+    def _migrate_legacy_keys(self) -> bool:
+        """
+        旧版本的状态文件直接使用 creator_id 作为 key（赞助和关注共用），把它们改成两种来源各一条；
+        赞助投稿流的位置从假的创作者 @feed 移到 cursor: 前缀下。
+        下一次 commit 时写回文件，之后文件里不再有旧格式的 key。返回是否做了迁移。
+        """
+        legacy = [key for key in self._state if key.partition(":")[0] not in SOURCES + (CURSOR_PREFIX,)]
+        for key in legacy:
+            post_id = self._state.pop(key)
+            for source in SOURCES:
+                self._state.setdefault(f"{source}:{key}", post_id)
+        feed = self._state.pop(f"supporting:{LEGACY_FEED_CREATOR}", None)
+        self._state.pop(f"following:{LEGACY_FEED_CREATOR}", None)
+        if feed is not None:
+            self._state.setdefault(f"{CURSOR_PREFIX}:{SUPPORTING_FEED_CURSOR}", feed)
+        return bool(legacy) or feed is not None
+
+    def get_last_id(self, source: str, creator_id: str) -> Optional[str]:
+        return self._state.get(f"{source}:{creator_id}")
+
+    def get_cursor(self, name: str) -> Optional[str]:
+        return self._state.get(f"{CURSOR_PREFIX}:{name}")
+
+    def set_cursor(self, name: str, value: str) -> None:
+        key = f"{CURSOR_PREFIX}:{name}"
+        if self._state.get(key) != value:
+            self._state[key] = value
+            self._dirty = True
+
+    def set_last_id(self, source: str, creator_id: str, post_id: str) -> None:
+        key = f"{source}:{creator_id}"
+        if self._state.get(key) != post_id:
+            self._state[key] = post_id
+            self._dirty = True
+
+    def commit(self) -> None:
+        if not self._dirty:
+            return
+        save_state(self.path, self._state)
+        self._dirty = False
+
+
+class SqliteStateStore(StateStore):
+    """
+    基于 SQLite 的状态存储。
+      - creator_state: 每个 (来源, 创作者) 最新的投稿 id
+      - cursors: 与创作者无关的位置记录（例如赞助投稿流上次看到的最新发布时间）
+      - seen_posts: 看到过的新投稿、发布时间和是否已通知
+    查询按主键逐条进行，commit 时只在一个事务里写入发生变化的行，
+    所以 I/O 只与变化量有关，与创作者总数无关。
+    使用 WAL 模式和 busy_timeout，两个重叠运行的 cron 任务会排队写入而不会互相破坏。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS creator_state (
+        source TEXT NOT NULL,
+        creator_id TEXT NOT NULL,
+        last_post_id TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (source, creator_id)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS cursors (
+        name TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS seen_posts (
+        source TEXT NOT NULL,
+        creator_id TEXT NOT NULL,
+        post_id TEXT NOT NULL,
+        published_datetime TEXT NOT NULL,
+        fee_required INTEGER NOT NULL DEFAULT 0,
+        notified INTEGER NOT NULL DEFAULT 0,
+        seen_at TEXT NOT NULL,
+        PRIMARY KEY (source, creator_id, post_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_seen_posts_creator_published
+        ON seen_posts (creator_id, published_datetime);
+    CREATE INDEX IF NOT EXISTS idx_seen_posts_seen_at
+        ON seen_posts (seen_at);
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0) -> None:
+        self.path = Path(path)
+        is_new = not self.path.exists()
+        # isolation_level=None：由我们自己用 BEGIN IMMEDIATE 控制事务
+        # 只有使用 SQLite 后端时才导入 sqlite3
+        import sqlite3
+
+        self._conn = sqlite3.connect(str(self.path), timeout=timeout, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._pending_state: Dict[Tuple[str, str], str] = {}
+        self._pending_cursors: Dict[str, str] = {}
+        self._pending_posts: List[Tuple[str, str, str, str, int, int, str]] = []
+        if is_new:
+            self._import_json_state()
+        else:
+            self._migrate_feed_cursor()
+
+    def _migrate_feed_cursor(self) -> None:
+        """
+        旧版本把赞助投稿流的位置保存成 creator_state 里名为 @feed 的创作者，移到 cursors 表。
+        """
+        row = self._conn.execute(
+            "SELECT last_post_id, updated_at FROM creator_state WHERE creator_id = ? AND source = 'supporting'",
+            (LEGACY_FEED_CREATOR,),
+        ).fetchone()
+        if row is None:
+            return
+        cur = self._conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            cur.execute(
+                "INSERT OR IGNORE INTO cursors (name, value, updated_at) VALUES (?, ?, ?)",
+                (SUPPORTING_FEED_CURSOR, row[0], row[1]),
+            )
+            cur.execute("DELETE FROM creator_state WHERE creator_id = ?", (LEGACY_FEED_CREATOR,))
+            cur.execute("COMMIT")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+
+    def _import_json_state(self) -> None:
+        """
+        第一次创建数据库时，如果旁边有同名的 JSON 状态文件，则导入其中的记录，避免切换后把已有投稿当成新投稿。
+        """
+        legacy = load_state(self.path.with_suffix(".json"))
+        for key, post_id in legacy.items():
+            source, sep, creator_id = key.partition(":")
+            if creator_id == LEGACY_FEED_CREATOR:
+                self._pending_cursors.setdefault(SUPPORTING_FEED_CURSOR, post_id)
+            elif sep and source == CURSOR_PREFIX:
+                self._pending_cursors[creator_id] = post_id
+            elif sep and source in SOURCES:
+                self._pending_state[(source, creator_id)] = post_id
+            else:
+                # 旧版本不区分来源，两种来源都使用同一个 id
+                for source in SOURCES:
+                    self._pending_state.setdefault((source, key), post_id)
+        self.commit()
+
+    def get_last_id(self, source: str, creator_id: str) -> Optional[str]:
+        pending = self._pending_state.get((source, creator_id))
+        if pending is not None:
+            return pending
+        row = self._conn.execute(
+            "SELECT last_post_id FROM creator_state WHERE source = ? AND creator_id = ?",
+            (source, creator_id),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_last_id(self, source: str, creator_id: str, post_id: str) -> None:
+        if self.get_last_id(source, creator_id) != post_id:
+            self._pending_state[(source, creator_id)] = post_id
+
+    def get_cursor(self, name: str) -> Optional[str]:
+        pending = self._pending_cursors.get(name)
+        if pending is not None:
+            return pending
+        row = self._conn.execute("SELECT value FROM cursors WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, name: str, value: str) -> None:
+        if self.get_cursor(name) != value:
+            self._pending_cursors[name] = value
+
+    def record_posts(self, source: str, posts: Iterable[FanboxPost], notified_ids: Iterable[str] = ()) -> None:
+        notified = set(notified_ids)
+        seen_at = _now()
+        for post in posts:
+            self._pending_posts.append((
+                source,
+                post.creator_id,
+                post.id,
+                post.published_datetime,
+                post.fee_required,
+                1 if post.id in notified else 0,
+                seen_at,
+            ))
+
+    def commit(self) -> None:
+        if not self._pending_state and not self._pending_cursors and not self._pending_posts:
+            return
+        updated_at = _now()
+        cur = self._conn.cursor()
+        # BEGIN IMMEDIATE 立即获取写锁，另一个进程正在写入时会等待 busy_timeout
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            cur.executemany(
+                "INSERT INTO creator_state (source, creator_id, last_post_id, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (source, creator_id) DO UPDATE SET "
+                "last_post_id = excluded.last_post_id, updated_at = excluded.updated_at",
+                [(source, creator_id, post_id, updated_at)
+                 for (source, creator_id), post_id in self._pending_state.items()],
+            )
+            cur.executemany(
+                "INSERT INTO cursors (name, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                [(name, value, updated_at) for name, value in self._pending_cursors.items()],
+            )
+            cur.executemany(
+                "INSERT INTO seen_posts "
+                "(source, creator_id, post_id, published_datetime, fee_required, notified, seen_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (source, creator_id, post_id) DO UPDATE SET "
+                "notified = MAX(notified, excluded.notified)",
+                self._pending_posts,
+            )
+            cur.execute("COMMIT")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+        self._pending_state.clear()
+        self._pending_cursors.clear()
+        self._pending_posts.clear()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def open_state_store(state_file: str, backend: str = "json") -> StateStore:
+    """
+    根据配置创建状态存储。
+    :param backend: "json"（默认）或 "sqlite"；使用 sqlite 时如果 state_file 以 .json 结尾，会改用同名的 .db 文件
+    """
+    if backend == "sqlite":
+        path = Path(state_file)
+        if path.suffix == ".json":
+            path = path.with_suffix(".db")
+        return SqliteStateStore(str(path))
+    if backend == "json":
+        return JsonStateStore(state_file)
+    raise ValueError(f"未知的 state_backend: {backend}")
@@ -0,0 +1,204 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import requests
+
+from api import FanboxAPI, FanboxHTTPError, FanboxPost, TokenBucket
+
+OK_BODY = b'{"body": []}'
+
+
+class FakeClock:
+    """
+    代替 time.monotonic / time.sleep：sleep 只让时间前进，并记录每次等待的时长。
+    """
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def response(status_code: int, content: bytes = b"", headers: dict = None) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp.reason = "reason"
+    resp._content = content
+    resp.headers.update(headers or {})
+    return resp
+
+
+class FakeSession:
+    """
+    按顺序返回给定的响应；响应是异常时抛出它。
+    """
+
+    def __init__(self, responses: list) -> None:
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        resp = self.responses.pop(0)
+        if isinstance(resp, Exception):
+            raise resp
+        return resp
+
+    def close(self) -> None:
+        pass
+
+
+class TestCaseWithClock(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        for name in ("monotonic", "sleep"):
+            patcher = mock.patch(f"time.{name}", getattr(self.clock, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class TokenBucketTest(TestCaseWithClock):
+    def test_burst_then_rate(self) -> None:
+        bucket = TokenBucket(2, burst=3)
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+        # 突发额度用完后每个令牌要等 1 / rate 秒
+        bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [0.5])
+
+    def test_throttled_halves_rate_and_success_recovers(self) -> None:
+        bucket = TokenBucket(4, min_rate=1)
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 2)
+        bucket.throttled()
+        bucket.throttled()
+        # 不会低于 min_rate
+        self.assertEqual(bucket.rate, 1)
+        for _ in range(100):
+            bucket.succeeded()
+        self.assertEqual(bucket.rate, 4)
+
+    def test_unlimited_bucket_ignores_throttle(self) -> None:
+        bucket = TokenBucket(0)
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 0)
+        for _ in range(10):
+            bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_pause_blocks_until_deadline(self) -> None:
+        bucket = TokenBucket(0)
+        bucket.pause(7)
+        bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [7])
+
+
+class RequestRetryTest(TestCaseWithClock):
+    def api(self, responses: list, rate_limit: float = 0, max_retries: int = 3) -> FanboxAPI:
+        return FanboxAPI(
+            "cookie",
+            rate_limit=rate_limit,
+            max_retries=max_retries,
+            backoff_base=1,
+            backoff_max=60,
+            session=FakeSession(responses),
+        )
+
+    def test_429_slows_down_and_retries(self) -> None:
+        api = self.api([response(429), response(200, OK_BODY)], rate_limit=4)
+        self.assertEqual(api._request("post.listSupporting"), {"body": []})
+        self.assertEqual(api.session.calls, 2)
+        # 收到 429 后速率减半，之后的成功请求只恢复一小步
+        self.assertLess(api.rate_limiter.rate, 4)
+        self.assertGreater(api.rate_limiter.rate, 2)
+        stats = api.stats.snapshot()
+        self.assertEqual((stats["throttled"], stats["retries"], stats["requests"]), (1, 1, 2))
+
+    def test_retry_after_pauses_requests(self) -> None:
+        api = self.api([response(429, headers={"Retry-After": "7"}), response(200, OK_BODY)])
+        api._request("post.listSupporting")
+        # 按服务器要求等待 7 秒，而不是指数退避的 0.5 ~ 1 秒
+        self.assertEqual(self.clock.sleeps, [7])
+        self.assertEqual(api.rate_limiter._paused_until, 1007)
+
+    def test_backoff_doubles_until_retries_run_out(self) -> None:
+        api = self.api([response(503)] * 4)
+        with self.assertRaises(FanboxHTTPError) as ctx:
+            api._request("post.listSupporting")
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(api.session.calls, 4)
+        # 每次重试的等待在 [50%, 100%] × 1、2、4 秒之间
+        self.assertEqual(len(self.clock.sleeps), 3)
+        for delay, base in zip(self.clock.sleeps, (1, 2, 4)):
+            self.assertTrue(base / 2 <= delay <= base)
+
+    def test_network_error_is_retried(self) -> None:
+        api = self.api([requests.ConnectionError("reset"), response(200, OK_BODY)])
+        self.assertEqual(api._request("post.listSupporting"), {"body": []})
+        self.assertEqual(api.stats.snapshot()["retries"], 1)
+
+    def test_client_error_is_not_retried(self) -> None:
+        api = self.api([response(403), response(200, OK_BODY)])
+        with self.assertRaises(FanboxHTTPError):
+            api._request("post.listSupporting")
+        self.assertEqual(api.session.calls, 1)
+        self.assertEqual(self.clock.sleeps, [])
+
+
+class IterPagesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # 按发布时间从新到旧排列的 30 篇投稿，id 越大越新
+        self.feed = [
+            FanboxPost(str(i), "title", f"2026-01-01T00:00:{i:02d}+09:00", "", "alice", "Alice")
+            for i in range(29, -1, -1)
+        ]
+        self.requests: list = []
+
+    def fetch_page(self, size: int, cursor_datetime: str, cursor_id: str) -> list:
+        self.requests.append((size, cursor_id))
+        start = 0
+        if cursor_id:
+            start = next(i for i, p in enumerate(self.feed) if p.id == cursor_id) + 1
+        return self.feed[start:start + size]
+
+    def ids(self, stop_id: str = None, max_posts: int = 100) -> list:
+        posts = FanboxAPI._iter_pages(
+            self.fetch_page, lambda p: p.id == stop_id, first_page_size=2, page_size=10, max_posts=max_posts
+        )
+        return [p.id for p in posts]
+
+    def test_stops_after_page_containing_known_post(self) -> None:
+        ids = self.ids(stop_id="26")
+        # 出现已知投稿的那一页完整产出，不再请求下一页
+        self.assertEqual(ids, ["29", "28", "27", "26", "25", "24"])
+        self.assertEqual(self.requests, [(2, ""), (4, "28")])
+
+    def test_page_size_grows_until_limit(self) -> None:
+        self.assertEqual(len(self.ids()), 30)
+        self.assertEqual([size for size, _ in self.requests], [2, 4, 8, 10, 10])
+
+    def test_short_page_ends_iteration(self) -> None:
+        del self.feed[5:]
+        self.assertEqual(len(self.ids()), 5)
+        # 第二页只有 3 篇（不足 4 篇），说明已经到底
+        self.assertEqual(len(self.requests), 2)
+
+    def test_max_posts_caps_total(self) -> None:
+        self.assertEqual(self.ids(max_posts=5), ["29", "28", "27", "26", "25"])
+        self.assertEqual(self.requests, [(2, ""), (3, "28")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from api import FanboxPost
+from archive import PostArchive, main
+from scheduler import parse_published
+
+
+def post(post_id: str, creator_id: str, day: int, fee: int = 0, title: str = None, updated: str = None) -> FanboxPost:
+    published = f"2026-01-{day:02d}T12:00:00+09:00"
+    return FanboxPost(
+        post_id, title or f"post {post_id}", published, updated or published, creator_id, creator_id.title(), None, fee
+    )
+
+
+POSTS = [
+    post("1", "alice", 1, 0, "新作の告知"),
+    post("2", "alice", 5, 500),
+    post("3", "alice", 9, 1000, "新作 完成版"),
+    post("4", "bob", 3, 1000),
+    post("5", "bob", 7, 300),
+]
+
+
+class PostArchiveTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = str(Path(tmp.name) / "archive.db")
+        self.archive = PostArchive(self.path)
+        self.addCleanup(self.archive.close)
+        self.archive.add(POSTS)
+        self.assertEqual(self.archive.flush(), len(POSTS))
+
+    def ids(self, **kwargs) -> list:
+        return [p.id for p in self.archive.query(**kwargs)]
+
+    def test_query_orders_newest_first(self) -> None:
+        self.assertEqual(self.ids(), ["3", "5", "2", "4", "1"])
+        self.assertEqual(self.ids(limit=2), ["3", "5"])
+        self.assertEqual(self.archive.query(creator_id="bob")[0], POSTS[4])
+
+    def test_query_filters(self) -> None:
+        self.assertEqual(self.ids(creator_id="alice"), ["3", "2", "1"])
+        # since 包含边界，until 不包含
+        since = parse_published("2026-01-05T12:00:00+09:00")
+        until = parse_published("2026-01-09T12:00:00+09:00")
+        self.assertEqual(self.ids(since=since, until=until), ["5", "2"])
+        self.assertEqual(self.ids(min_fee=500, max_fee=1000), ["3", "2", "4"])
+        self.assertEqual(self.ids(creator_id="alice", min_fee=1000), ["3"])
+        self.assertEqual(self.ids(title="新作"), ["3", "1"])
+        self.assertEqual(self.ids(creator_id="carol"), [])
+
+    def test_flush_writes_only_changed_posts(self) -> None:
+        self.archive.add(POSTS)
+        self.assertEqual(self.archive.flush(), 0)
+        # 同一篇投稿多次出现时只保留最后一次
+        self.archive.add([post("2", "alice", 5, 500), post("2", "alice", 5, 800, updated="2026-02-01T00:00:00+09:00")])
+        self.assertEqual(self.archive.flush(), 1)
+        self.assertEqual(self.ids(min_fee=800, max_fee=800), ["2"])
+        self.assertEqual(self.archive.count(), len(POSTS))
+
+    def test_command_line_query(self) -> None:
+        self.archive.close()
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(io.StringIO()):
+            main(["--archive-file", self.path, "--creator", "bob", "--since", "2026-01-05", "--json"])
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row["id"] for row in rows], ["5"])
+        self.assertEqual(rows[0]["feeRequired"], 300)
+
+
+if __name__ == "__main__":
+    unittest.main()
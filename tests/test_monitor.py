@@ -0,0 +1,258 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import requests
+
+from api import FanboxAPI, FanboxPost
+from config import CreatorMinFeeStore
+from monitor import FANBOX_HOME_URL, Monitor, NotificationCoalescer, SupportingPlansCache, check_supporting_posts, save_creators
+from state import SUPPORTING_FEED_CURSOR, open_state_store
+
+
+def supporting_item(post_id: str, creator_id: str, published: str) -> dict:
+    return {
+        "id": post_id,
+        "title": f"post {post_id}",
+        "publishedDatetime": published,
+        "updatedDatetime": published,
+        "creatorId": creator_id,
+        "feeRequired": 0,
+        "user": {"name": creator_id},
+    }
+
+
+class FakeSupportingAPI(FanboxAPI):
+    """
+    按顺序返回给定的 post.listSupporting 页面；页面是异常时抛出它。
+    传入 dispatcher 时记录请求每一页时已经发出了几条通知。
+    """
+
+    def __init__(self, pages: list, dispatcher: "FakeDispatcher" = None) -> None:
+        super().__init__("cookie")
+        self.pages = list(pages)
+        self.dispatcher = dispatcher
+        self.sent_before_page: list = []
+
+    def list_supporting_posts(self, limit: int = 50, max_published_datetime: str = "", max_id: str = "") -> dict:
+        if self.dispatcher is not None:
+            self.sent_before_page.append(len(self.dispatcher.sent))
+        page = self.pages.pop(0)
+        if isinstance(page, Exception):
+            raise page
+        return {"body": {"items": page}}
+
+
+class FakeDispatcher:
+    def __init__(self) -> None:
+        self.sent: list = []
+
+    def submit(self, message: dict, target: dict = None) -> None:
+        self.sent.append(message)
+
+
+class CheckSupportingPostsTest(unittest.TestCase):
+    # alice 和 bob 上次看到的都是 t1 之前的投稿，投稿流的位置是 t1
+    PAGE_1 = [
+        supporting_item("b2", "bob", "2026-01-01T00:00:05+09:00"),
+        supporting_item("a1", "alice", "2026-01-01T00:00:04+09:00"),
+        supporting_item("a0", "alice", "2026-01-01T00:00:03+09:00"),
+    ]
+    PAGE_2 = [
+        supporting_item("b1", "bob", "2026-01-01T00:00:02+09:00"),
+        supporting_item("b0", "bob", "2026-01-01T00:00:01+09:00"),
+    ]
+    CURSOR = "2026-01-01T00:00:01+09:00"
+
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.state = open_state_store(str(self.dir / "state.json"))
+        self.state.set_last_id("supporting", "alice", "a0")
+        self.state.set_last_id("supporting", "bob", "b0")
+        self.state.set_cursor(SUPPORTING_FEED_CURSOR, self.CURSOR)
+        self.state.commit()
+        self.fee_store = CreatorMinFeeStore(str(self.dir / "config.json"))
+
+    def check(self, api: FanboxAPI, dispatcher: FakeDispatcher) -> None:
+        check_supporting_posts(api, self.state, "key", "group", 3, self.fee_store, dispatcher=dispatcher)
+
+    def test_failing_second_page_keeps_state(self) -> None:
+        dispatcher = FakeDispatcher()
+        api = FakeSupportingAPI([self.PAGE_1, requests.ConnectionError("page 2 failed")])
+        with self.assertRaises(requests.ConnectionError):
+            self.check(api, dispatcher)
+
+        # alice 在第一页就比较完了，已经通知并记下最新投稿；bob 还没比较完，投稿流的位置也没有前移
+        self.assertEqual([m["url"].rsplit("/", 1)[-1] for m in dispatcher.sent], ["a1"])
+        self.assertEqual(self.state.get_last_id("supporting", "alice"), "a1")
+        self.assertEqual(self.state.get_last_id("supporting", "bob"), "b0")
+        self.assertEqual(self.state.get_cursor(SUPPORTING_FEED_CURSOR), self.CURSOR)
+
+        # 下一轮从原来的位置重新读取投稿流：bob 的两篇新投稿都没有漏掉，alice 不会再通知一次
+        dispatcher = FakeDispatcher()
+        self.check(FakeSupportingAPI([self.PAGE_1, self.PAGE_2]), dispatcher)
+        self.assertEqual([m["url"].rsplit("/", 1)[-1] for m in dispatcher.sent], ["b1", "b2"])
+        self.assertEqual(self.state.get_last_id("supporting", "alice"), "a1")
+        self.assertEqual(self.state.get_last_id("supporting", "bob"), "b2")
+        self.assertEqual(self.state.get_cursor(SUPPORTING_FEED_CURSOR), "2026-01-01T00:00:05+09:00")
+
+    def test_coalescer_without_digests_sends_before_feed_is_read(self) -> None:
+        dispatcher = FakeDispatcher()
+        coalescer = NotificationCoalescer([{"type": "bark", "key": "key"}], "group", dispatcher=dispatcher)
+        api = FakeSupportingAPI([self.PAGE_1, self.PAGE_2], dispatcher)
+        check_supporting_posts(
+            api, self.state, None, "group", 3, self.fee_store, dispatcher=dispatcher, coalescer=coalescer
+        )
+        # alice 在第一页就比较完了，请求第二页之前她的新投稿已经交给发送队列
+        self.assertEqual(api.sent_before_page, [0, 1])
+        self.assertEqual([m["url"].rsplit("/", 1)[-1] for m in dispatcher.sent], ["a1", "b1", "b2"])
+
+    def test_coalescer_with_digest_waits_for_flush(self) -> None:
+        dispatcher = FakeDispatcher()
+        coalescer = NotificationCoalescer(
+            [{"type": "bark", "key": "key"}], "group", dispatcher=dispatcher, digest_threshold=2
+        )
+        check_supporting_posts(
+            FakeSupportingAPI([self.PAGE_1, self.PAGE_2]), self.state, None, "group", 3, self.fee_store,
+            dispatcher=dispatcher, coalescer=coalescer,
+        )
+        self.assertEqual(dispatcher.sent, [])
+        coalescer.flush()
+        # bob 的两篇合并成一条摘要，alice 只有一篇，单独通知
+        self.assertEqual(len(dispatcher.sent), 2)
+        self.assertEqual(dispatcher.sent[0]["url"].rsplit("/", 1)[-1], "a1")
+        self.assertIn("b2", dispatcher.sent[1]["url"])
+
+
+class NotificationCoalescerTest(unittest.TestCase):
+    def post(self, post_id: str, creator_id: str, minute: int) -> FanboxPost:
+        published = f"2026-01-01T00:{minute:02d}:00+09:00"
+        return FanboxPost(post_id, f"post {post_id}", published, published, creator_id, creator_id.title())
+
+    def coalescer(self, dispatcher: FakeDispatcher, **kwargs) -> NotificationCoalescer:
+        return NotificationCoalescer([{"type": "bark", "key": "key"}], "group", dispatcher=dispatcher, **kwargs)
+
+    def test_digest_threshold(self) -> None:
+        dispatcher = FakeDispatcher()
+        coalescer = self.coalescer(dispatcher, digest_threshold=3)
+        for i in range(3):
+            coalescer.add(self.post(f"a{i}", "alice", i), "following")
+        for i in range(2):
+            coalescer.add(self.post(f"b{i}", "bob", i), "following")
+        coalescer.flush()
+        # alice 达到阈值，合并成一条指向最新投稿的摘要；bob 只有两篇，分别通知
+        self.assertEqual(len(dispatcher.sent), 3)
+        digest = dispatcher.sent[0]
+        self.assertEqual(digest["title"], "Alice you follow posted 3 new posts!")
+        self.assertTrue(digest["url"].endswith("/a2"))
+        self.assertEqual(digest["content"].splitlines()[0], "post a2(0日元)")
+        self.assertEqual([m["url"].rsplit("/", 1)[-1] for m in dispatcher.sent[1:]], ["b0", "b1"])
+
+    def test_digest_window_splits_bursts(self) -> None:
+        dispatcher = FakeDispatcher()
+        coalescer = self.coalescer(dispatcher, digest_threshold=2, digest_window=300)
+        # 前两篇相隔 1 分钟，第三篇在 30 分钟之后
+        for post_id, minute in (("a0", 0), ("a1", 1), ("a2", 31)):
+            coalescer.add(self.post(post_id, "alice", minute), "supporting")
+        coalescer.flush()
+        self.assertEqual(len(dispatcher.sent), 2)
+        self.assertEqual(dispatcher.sent[0]["title"], "Alice you support posted 2 new posts!")
+        self.assertTrue(dispatcher.sent[1]["url"].endswith("/a2"))
+
+    def test_max_notifications_sends_run_digest(self) -> None:
+        dispatcher = FakeDispatcher()
+        coalescer = self.coalescer(dispatcher, max_notifications=2)
+        for creator_id in ("alice", "bob", "carol"):
+            coalescer.add(self.post(f"{creator_id}0", creator_id, 0), "following")
+        coalescer.flush()
+        self.assertEqual(len(dispatcher.sent), 1)
+        self.assertEqual(dispatcher.sent[0]["title"], "3 new posts from 3 creators")
+        self.assertEqual(dispatcher.sent[0]["url"], FANBOX_HOME_URL)
+        # 发送后清空，下一轮从头计算
+        coalescer.flush()
+        self.assertEqual(len(dispatcher.sent), 1)
+
+    def test_under_limit_sends_each_post(self) -> None:
+        dispatcher = FakeDispatcher()
+        coalescer = self.coalescer(dispatcher, max_notifications=2)
+        coalescer.add(self.post("a0", "alice", 0), "following")
+        coalescer.add(self.post("b0", "bob", 0), "following")
+        self.assertEqual(dispatcher.sent, [])
+        coalescer.flush()
+        self.assertEqual([m["url"].rsplit("/", 1)[-1] for m in dispatcher.sent], ["a0", "b0"])
+
+
+class SupportingPlansCacheTest(unittest.TestCase):
+    class CountingAPI:
+        def __init__(self) -> None:
+            self.calls = 0
+
+        def list_supporting_creators(self) -> list:
+            self.calls += 1
+            return [{"creatorId": "alice", "name": "Alice", "iconUrl": None}]
+
+    def test_list_is_reused_across_runs_until_ttl(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            creators_file = str(Path(tmp) / "creators.json")
+            api = self.CountingAPI()
+            cache = SupportingPlansCache(api, creators_file, ttl=3600)
+            self.assertEqual([c["creatorId"] for c in cache.get()], ["alice"])
+            save_creators(creators_file, [], None, None, cache.creators, cache.updated_at)
+
+            # 下一次运行（新的进程）从 creators_file 读取，不再请求 plan.listSupporting
+            cache = SupportingPlansCache(api, creators_file, ttl=3600)
+            self.assertEqual([c["creatorId"] for c in cache.get()], ["alice"])
+            self.assertEqual(api.calls, 1)
+
+            cache = SupportingPlansCache(api, creators_file, ttl=0)
+            cache.get()
+            self.assertEqual(api.calls, 2)
+
+
+class MonitorReloadTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        self.config_path = "config.json"
+        self.write_config(rate_limit=0)
+
+    def write_config(self, **settings) -> None:
+        config = {
+            "accounts": [{"name": "alice", "cookie": "a"}, {"name": "bob", "cookie": "b"}],
+            "adaptive_polling": False,
+            "language": "en",
+            **settings,
+        }
+        Path(self.config_path).write_text(json.dumps(config), encoding="utf-8")
+
+    def test_reload_closes_replaced_sessions(self) -> None:
+        monitor = Monitor(self.config_path)
+        self.addCleanup(monitor.close)
+        monitor.load_config()
+        monitor._open()
+        sessions = {id(api.session): api.session for api in monitor.apis.values()}
+        # 两个账号共用一个会话
+        self.assertEqual(len(sessions), 1)
+        closed = []
+        for session in sessions.values():
+            session.close = lambda session=session: closed.append(session)
+
+        self.write_config(rate_limit=2)
+        monitor.load_config()
+        self.assertEqual(monitor.apis, {})
+        self.assertEqual(closed, list(sessions.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
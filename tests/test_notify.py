@@ -0,0 +1,138 @@
+import json
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from notifiers import Notifier
+from notify import NotificationDispatcher
+
+BARK = {"type": "bark", "key": "k1", "server": "https://bark.example.com/push"}
+WEBHOOK = {"type": "webhook", "url": "https://hooks.example.com/fanbox"}
+
+
+class RecordingNotifier(Notifier):
+    """
+    记录发出的消息；fail 为真时每次发送都抛出异常，gate 设置后等它放行才发送。
+    """
+
+    kind = "fake"
+
+    def __init__(self, backend: "FakeBackends", target: dict) -> None:
+        self.backend = backend
+        self.target = target
+
+    def send(self, message: dict) -> int:
+        gate = self.backend.gates.get(self.target["type"])
+        if gate is not None:
+            gate.wait(5)
+        if self.backend.fail:
+            raise RuntimeError("service unavailable")
+        with self.backend.lock:
+            self.backend.sent.append((self.target["type"], message["title"]))
+        return 200
+
+
+class FakeBackends:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.sent: list = []
+        self.gates: dict = {}
+        self.lock = threading.Lock()
+
+    def create(self, target: dict) -> Notifier:
+        return RecordingNotifier(self, target)
+
+
+def message(title: str, group: str = "alice") -> dict:
+    return {"title": title, "body": "", "url": "", "group": group}
+
+
+class NotificationDispatcherTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.outbox = Path(tmp.name) / "outbox.json"
+
+    def dispatcher(self, backends: FakeBackends, **kwargs) -> NotificationDispatcher:
+        patcher = mock.patch("notify.create_notifier", backends.create)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        dispatcher = NotificationDispatcher(str(self.outbox), backoff_base=0, **kwargs)
+        self.addCleanup(dispatcher.close)
+        return dispatcher
+
+    def test_failed_notifications_are_replayed_by_next_run(self) -> None:
+        dispatcher = self.dispatcher(FakeBackends(fail=True), max_retries=1)
+        dispatcher.submit(message("p1"), BARK)
+        dispatcher.submit(message("p2", "bob"), WEBHOOK)
+        dispatcher.drain()
+        saved = json.loads(self.outbox.read_text(encoding="utf-8"))
+        self.assertEqual(sorted(item["params"]["title"] for item in saved.values()), ["p1", "p2"])
+        dispatcher.close()
+
+        # 下次运行：创建时读取 outbox 并重新发送，送达后从 outbox 中删除
+        backends = FakeBackends()
+        self.dispatcher(backends).drain()
+        self.assertEqual(sorted(backends.sent), [("bark", "p1"), ("webhook", "p2")])
+        self.assertEqual(json.loads(self.outbox.read_text(encoding="utf-8")), {})
+
+    def test_outbox_survives_crash_before_drain(self) -> None:
+        # 上一次运行在 drain 保存之后、通知送达之前崩溃，留下了 outbox；其中一条已经过期
+        now = time.time()
+        self.outbox.write_text(json.dumps({
+            "a": {"target": BARK, "params": message("p1"), "created_at": now},
+            "b": {"target": BARK, "params": message("p0"), "created_at": now - 8 * 24 * 3600},
+            # 旧版本的 outbox：没有 target，Bark 的 key 放在参数里
+            "c": {"params": dict(message("p2"), key="k2"), "created_at": now},
+        }), encoding="utf-8")
+        backends = FakeBackends()
+        dispatcher = self.dispatcher(backends, bark_server="https://bark.example.com/push")
+        dispatcher.drain()
+        self.assertEqual(sorted(title for _, title in backends.sent), ["p1", "p2"])
+        self.assertEqual(json.loads(self.outbox.read_text(encoding="utf-8")), {})
+
+    def test_resend_pending_skips_queued_items(self) -> None:
+        backends = FakeBackends()
+        backends.gates["bark"] = threading.Event()
+        dispatcher = self.dispatcher(backends, workers=1)
+        dispatcher.submit(message("p1"), BARK)
+        # 还在队列里的通知不会重复排队
+        dispatcher.resend_pending()
+        backends.gates["bark"].set()
+        dispatcher.drain()
+        self.assertEqual(backends.sent, [("bark", "p1")])
+
+    def test_group_keeps_submission_order(self) -> None:
+        backends = FakeBackends()
+        dispatcher = self.dispatcher(backends, workers=4)
+        titles = [f"p{i}" for i in range(20)]
+        for title in titles:
+            dispatcher.submit(message(title), BARK)
+        dispatcher.drain()
+        self.assertEqual([title for _, title in backends.sent], titles)
+
+    def test_slow_target_does_not_block_other_lanes(self) -> None:
+        backends = FakeBackends()
+        backends.gates["bark"] = threading.Event()
+        dispatcher = self.dispatcher(backends)
+        dispatcher.submit(message("slow"), BARK)
+        dispatcher.submit(message("fast"), WEBHOOK)
+        deadline = time.monotonic() + 5
+        while not backends.sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Bark 还没有放行时 webhook 的通知已经送达
+        self.assertEqual(backends.sent, [("webhook", "fast")])
+        backends.gates["bark"].set()
+        dispatcher.drain()
+        self.assertEqual(backends.sent, [("webhook", "fast"), ("bark", "slow")])
+
+
+if __name__ == "__main__":
+    unittest.main()
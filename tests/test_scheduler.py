@@ -0,0 +1,107 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from api import FanboxPost
+from scheduler import AdaptivePollScheduler, parse_published
+
+HOUR = 3600.0
+DAY = 86400.0
+
+
+def post(published: str) -> FanboxPost:
+    return FanboxPost("1", "title", published, published, "creator", "Creator", None, 0)
+
+
+class AdaptivePollSchedulerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = str(Path(tmp.name) / "schedule.json")
+
+    def scheduler(self, **kwargs) -> AdaptivePollScheduler:
+        return AdaptivePollScheduler(self.path, **kwargs)
+
+    def test_cadence_sets_interval(self) -> None:
+        scheduler = self.scheduler(min_interval=300, max_interval=DAY)
+        published = ["2026-01-01T00:00:00+00:00", "2026-01-01T08:00:00+00:00", "2026-01-01T16:00:00+00:00"]
+        now = parse_published(published[-1])
+        scheduler.observe("alice", [post(p) for p in published], now)
+        # 每 8 小时发一篇，每个发帖间隔内轮询 4 次
+        self.assertEqual(scheduler.interval("alice", now), 2 * HOUR)
+        self.assertEqual(scheduler.due(["alice"], now + HOUR), [])
+        scheduler.begin_cycle()
+        self.assertEqual(scheduler.due(["alice"], now + 2 * HOUR), ["alice"])
+
+    def test_unknown_creator_uses_min_interval(self) -> None:
+        scheduler = self.scheduler(min_interval=300)
+        self.assertEqual(scheduler.due(["alice", "bob"], 0), ["alice", "bob"])
+        scheduler.observe("alice", [], 0)
+        scheduler.begin_cycle()
+        self.assertEqual(scheduler.due(["alice", "bob"], 299), ["bob"])
+
+    def test_budget_exhaustion_limits_requests(self) -> None:
+        scheduler = self.scheduler(min_interval=300, hourly_budget=3)
+        creators = ["a", "b", "c", "d", "e"]
+        # 初始额度是一小时的预算，用完之后这一轮不再检查
+        self.assertEqual(len(scheduler.due(creators, 0)), 3)
+        self.assertEqual(scheduler.credit, 0)
+
+    def test_allowance_is_shared_within_a_cycle(self) -> None:
+        scheduler = self.scheduler(min_interval=300, hourly_budget=3)
+        scheduler.begin_cycle()
+        # 同一轮里多个账号共用额度，已经决定过的创作者不会重复计算
+        self.assertEqual(scheduler.due(["a", "b"], 0), ["a", "b"])
+        self.assertEqual(scheduler.due(["a", "c", "d"], 0), ["a", "c"])
+        self.assertEqual(scheduler.credit, 0)
+
+    def test_credit_accrues_with_elapsed_time(self) -> None:
+        scheduler = self.scheduler(min_interval=300, hourly_budget=4)
+        creators = list("abcdefgh")
+        for creator_id in creators:
+            scheduler.observe(creator_id, [], -DAY)
+        self.assertEqual(len(scheduler.due(creators, 0)), 4)
+
+        # 7.5 分钟只累积 4 × 7.5 / 60 = 0.5 个额度，还不够一次请求
+        scheduler.begin_cycle()
+        self.assertEqual(scheduler.due(creators, 450), [])
+        self.assertEqual(scheduler.credit, 0.5)
+        # 小数部分保留下来，再过 7.5 分钟凑够一个
+        scheduler.begin_cycle()
+        self.assertEqual(len(scheduler.due(creators, 900)), 1)
+        self.assertEqual(scheduler.credit, 0)
+
+    def test_credit_is_capped_at_one_hour(self) -> None:
+        scheduler = self.scheduler(min_interval=300, hourly_budget=2)
+        scheduler.due(["a"], 0)
+        scheduler.begin_cycle()
+        scheduler.due(["b"], DAY)
+        self.assertEqual(scheduler.credit, 1)
+
+    def test_overdue_creators_go_first(self) -> None:
+        scheduler = self.scheduler(min_interval=300, hourly_budget=1)
+        scheduler.observe("a", [], 0)
+        scheduler.observe("b", [], -2 * HOUR)
+        # 预算只够每小时一次，两个创作者的间隔都放大到 2 小时；b 超期更久，先检查它
+        self.assertEqual(scheduler.due(["a", "b"], 2 * HOUR), ["b"])
+
+    def test_state_survives_restart(self) -> None:
+        scheduler = self.scheduler(min_interval=300, hourly_budget=2)
+        scheduler.due(["a", "b"], 0)
+        scheduler.observe("a", [post("2026-01-01T00:00:00+00:00")], 0)
+        scheduler.save()
+
+        scheduler = self.scheduler(min_interval=300, hourly_budget=2)
+        self.assertEqual(scheduler.last_run, 0)
+        self.assertEqual(scheduler.credit, 0)
+        self.assertEqual(scheduler.creators["a"]["last_polled"], 0)
+        # 重新启动不会让额度回到满额
+        self.assertEqual(scheduler.due(["c"], 0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from config import load_config, load_creator_min_fees
+from shard import ShardSpec, apply_shard, merge_creators, merge_min_fees, shard_of
+
+
+def creator(creator_id: str) -> dict:
+    return {"creatorId": creator_id, "name": creator_id.title(), "iconUrl": None}
+
+
+class ShardOfTest(unittest.TestCase):
+    def test_assignment_is_stable(self) -> None:
+        # crc32 的结果是固定的，不随进程（PYTHONHASHSEED）或机器变化
+        self.assertEqual(
+            [shard_of(c, 4) for c in ("alice", "bob", "carol", "dave", "3751", "12345")],
+            [3, 0, 3, 0, 2, 0],
+        )
+
+    def test_every_creator_has_exactly_one_owner(self) -> None:
+        shards = [ShardSpec(i, 3) for i in range(3)]
+        for creator_id in map(str, range(100)):
+            self.assertEqual(sum(shard.owns(creator_id) for shard in shards), 1)
+
+
+class ShardFilesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        self.config_path = "config.json"
+
+    def write_config(self, **settings) -> None:
+        config = {"cookie": "c", "language": "en", **settings}
+        Path(self.config_path).write_text(json.dumps(config), encoding="utf-8")
+
+    def write_json(self, path: str, data: dict) -> None:
+        Path(path).write_text(json.dumps(data), encoding="utf-8")
+
+    def test_apply_shard_uses_own_files(self) -> None:
+        self.write_config(
+            hourly_request_budget=10,
+            metrics_file="metrics.json",
+            metrics_port=9100,
+            event_output="events.ndjson",
+        )
+        cfg = apply_shard(load_config(self.config_path), ShardSpec(1, 4))
+        self.assertEqual(cfg.accounts[0].state_file, "fanbox_monitor_state.shard1-of-4.json")
+        self.assertEqual(cfg.accounts[0].creators_file, "fanbox_monitor_creators.shard1-of-4.json")
+        self.assertEqual(cfg.schedule_file, "fanbox_monitor_schedule.shard1-of-4.json")
+        self.assertEqual(cfg.outbox_file, "fanbox_monitor_outbox.shard1-of-4.json")
+        self.assertEqual(cfg.metrics_file, "metrics.shard1-of-4.json")
+        self.assertEqual(cfg.event_output, "events.shard1-of-4.ndjson")
+        # 预算向上取整平均分配，端口按分片编号错开
+        self.assertEqual(cfg.hourly_request_budget, 3)
+        self.assertEqual(cfg.metrics_port, 9101)
+
+    def test_apply_shard_keeps_stream_outputs(self) -> None:
+        self.write_config(event_output="unix:/tmp/events.sock")
+        cfg = apply_shard(load_config(self.config_path), ShardSpec(0, 2))
+        self.assertEqual(cfg.event_output, "unix:/tmp/events.sock")
+        self.assertEqual(cfg.hourly_request_budget, 0)
+
+    def test_merge_creators_precedence(self) -> None:
+        self.write_config()
+        cfg = load_config(self.config_path)
+        creators_file = cfg.accounts[0].creators_file
+        self.write_json(ShardSpec(0, 3).path(creators_file), {
+            "supporting": [creator("alice")],
+            "following": [creator("old")],
+            "followingUpdatedAt": "2026-01-01T00:00:00+00:00",
+            "supportingPlans": [creator("alice"), creator("bob")],
+            "supportingPlansUpdatedAt": "2026-01-03T00:00:00+00:00",
+        })
+        self.write_json(ShardSpec(1, 3).path(creators_file), {
+            "supporting": [creator("bob"), creator("alice")],
+            "following": [creator("new")],
+            "followingUpdatedAt": "2026-01-02T00:00:00+00:00",
+            "supportingPlans": [creator("alice")],
+            "supportingPlansUpdatedAt": "2026-01-01T00:00:00+00:00",
+        })
+        # 分片 2 还没有运行过，跳过
+        merge_creators(cfg, 3)
+
+        merged = json.loads(Path(creators_file).read_text(encoding="utf-8"))
+        # 赞助者取并集；两个列表各自取最近获取的分片的
+        self.assertEqual([c["creatorId"] for c in merged["supporting"]], ["alice", "bob"])
+        self.assertEqual([c["creatorId"] for c in merged["following"]], ["new"])
+        self.assertEqual(merged["followingUpdatedAt"], "2026-01-02T00:00:00+00:00")
+        self.assertEqual([c["creatorId"] for c in merged["supportingPlans"]], ["alice", "bob"])
+        self.assertEqual(merged["supportingPlansUpdatedAt"], "2026-01-03T00:00:00+00:00")
+
+    def test_merge_creators_without_shard_files_leaves_file_alone(self) -> None:
+        self.write_config()
+        cfg = load_config(self.config_path)
+        merge_creators(cfg, 2)
+        self.assertFalse(Path(cfg.accounts[0].creators_file).exists())
+
+    def test_merge_min_fees_keeps_existing_values(self) -> None:
+        self.write_config(creator_min_fees={"alice": 500})
+        self.write_json(ShardSpec(0, 2).min_fees_path(self.config_path), {"alice": 0, "bob": 0})
+        self.write_json(ShardSpec(1, 2).min_fees_path(self.config_path), {"carol": 100})
+        merge_min_fees(self.config_path, 2)
+        self.assertEqual(load_creator_min_fees(self.config_path), {"alice": 500, "bob": 0, "carol": 100})
+        # 其他配置项保留
+        self.assertEqual(json.loads(Path(self.config_path).read_text(encoding="utf-8"))["cookie"], "c")
+
+    def test_merge_min_fees_without_new_creators_does_not_write(self) -> None:
+        self.write_config(creator_min_fees={"alice": 500})
+        self.write_json(ShardSpec(0, 1).min_fees_path(self.config_path), {"alice": 0})
+        before = Path(self.config_path).read_text(encoding="utf-8")
+        os.utime(self.config_path, (0, 0))
+        merge_min_fees(self.config_path, 1)
+        self.assertEqual(os.stat(self.config_path).st_mtime, 0)
+        self.assertEqual(Path(self.config_path).read_text(encoding="utf-8"), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
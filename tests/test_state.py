@@ -0,0 +1,81 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from state import SUPPORTING_FEED_CURSOR, JsonStateStore, SqliteStateStore, open_state_store
+
+FEED_POSITION = "2026-01-01T00:00:00+09:00"
+# 旧版本的状态文件：不区分来源的 creator_id，以及当作赞助创作者保存的投稿流位置
+LEGACY_STATE = {
+    "alice": "100",
+    "following:bob": "200",
+    "supporting:@feed": FEED_POSITION,
+}
+
+
+class StateMigrationTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.json_path = self.dir / "state.json"
+        self.json_path.write_text(json.dumps(LEGACY_STATE), encoding="utf-8")
+
+    def assert_migrated(self, store) -> None:
+        self.assertEqual(store.get_last_id("supporting", "alice"), "100")
+        self.assertEqual(store.get_last_id("following", "alice"), "100")
+        self.assertEqual(store.get_last_id("following", "bob"), "200")
+        self.assertIsNone(store.get_last_id("supporting", "bob"))
+        self.assertEqual(store.get_cursor(SUPPORTING_FEED_CURSOR), FEED_POSITION)
+        self.assertIsNone(store.get_last_id("supporting", "@feed"))
+
+    def test_json_legacy_keys_are_rewritten_on_commit(self) -> None:
+        store = JsonStateStore(str(self.json_path))
+        self.assert_migrated(store)
+        store.commit()
+        self.assertEqual(
+            json.loads(self.json_path.read_text(encoding="utf-8")),
+            {
+                "supporting:alice": "100",
+                "following:alice": "100",
+                "following:bob": "200",
+                f"cursor:{SUPPORTING_FEED_CURSOR}": FEED_POSITION,
+            },
+        )
+        self.assert_migrated(JsonStateStore(str(self.json_path)))
+
+    def test_json_migration_keeps_newer_cursor(self) -> None:
+        state = dict(LEGACY_STATE, **{f"cursor:{SUPPORTING_FEED_CURSOR}": "2026-02-01T00:00:00+09:00"})
+        self.json_path.write_text(json.dumps(state), encoding="utf-8")
+        store = JsonStateStore(str(self.json_path))
+        self.assertEqual(store.get_cursor(SUPPORTING_FEED_CURSOR), "2026-02-01T00:00:00+09:00")
+
+    def test_sqlite_imports_legacy_json_state(self) -> None:
+        store = open_state_store(str(self.json_path), "sqlite")
+        self.addCleanup(store.close)
+        self.assertIsInstance(store, SqliteStateStore)
+        self.assert_migrated(store)
+
+    def test_sqlite_moves_feed_row_to_cursors(self) -> None:
+        db_path = str(self.dir / "old.db")
+        store = SqliteStateStore(db_path)
+        # 旧版本写入的 @feed 行
+        store.set_last_id("supporting", "@feed", FEED_POSITION)
+        store.set_last_id("supporting", "alice", "100")
+        store.commit()
+        store.close()
+
+        store = SqliteStateStore(db_path)
+        self.addCleanup(store.close)
+        self.assertEqual(store.get_cursor(SUPPORTING_FEED_CURSOR), FEED_POSITION)
+        self.assertIsNone(store.get_last_id("supporting", "@feed"))
+        self.assertEqual(store.get_last_id("supporting", "alice"), "100")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import re
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import requests
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+
+from transport import TunedHTTPAdapter
+
+URL = "https://api.fanbox.cc/post.listSupporting"
+
+
+def first_certificate() -> str:
+    pem = Path(DEFAULT_CA_BUNDLE_PATH).read_text(encoding="ascii")
+    return re.search(r"-----BEGIN CERTIFICATE-----.+?-----END CERTIFICATE-----", pem, re.S).group(0) + "\n"
+
+
+class TunedHTTPAdapterTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        # 只有一个证书的证书包，用来确认连接用的是这个证书包而不是系统默认的
+        self.bundle = str(Path(tmp.name) / "bundle.pem")
+        Path(self.bundle).write_text(first_certificate(), encoding="ascii")
+        self.adapter = TunedHTTPAdapter(self.bundle)
+        self.addCleanup(self.adapter.close)
+        self.request = requests.Request("GET", URL).prepare()
+
+    def connection(self, proxies: dict = None):
+        pool = self.adapter.get_connection_with_tls_context(self.request, True, proxies=proxies)
+        conn = pool._new_conn()
+        self.adapter.cert_verify(conn, URL, True, None)
+        return conn
+
+    def assert_shared_context(self, conn) -> None:
+        self.assertIs(conn.ssl_context, self.adapter.ssl_context)
+        self.assertEqual(len(conn.ssl_context.get_ca_certs()), 1)
+        self.assertIsNone(conn.ca_certs)
+        self.assertEqual(conn.cert_reqs, "CERT_REQUIRED")
+
+    def test_direct_connection_uses_shared_context(self) -> None:
+        self.assert_shared_context(self.connection())
+
+    def test_proxied_connection_uses_shared_context(self) -> None:
+        self.assert_shared_context(self.connection({"https": "http://127.0.0.1:7890"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
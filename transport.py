@@ -0,0 +1,385 @@
+"""
+FanboxAPI 的 HTTP 传输层。每个新连接在拿到第一个响应之前都要经过 DNS 解析、TCP 握手和 TLS 握手
+（使用代理时还要再加上到代理的这一段），cron 方式运行时这部分开销占了很大比例。这里减少的是：
+  - 证书加载：requests 默认为每个新连接新建一个 SSLContext 并重新加载整个 CA 证书包（几十毫秒的 CPU），
+    这里所有连接共用一个预先加载好证书的 SSLContext
+  - TLS 握手：记住每个主机最近一次的 TLS 会话，之后的新连接（并发检测时新开的连接、守护模式下空闲断开后重连）
+    用它恢复会话，省去完整握手
+  - DNS 解析：解析结果按 TTL 缓存在内存里，设置了文件时跨进程保存，下一次 cron 运行不必重新解析；
+    缓存的地址连接失败时丢弃，下次重新解析
+  - HTTP/2：http_transport 设为 httpx 时使用 httpx（需要 pip install "httpx[http2]"），
+    所有请求在一个连接上多路复用，并发检测也只需要一次握手
+
+本模块会导入 requests、urllib3 和 ssl，只在创建会话时才导入（见 FanboxAPI.__init__）。
+TunedHTTPConnection / TunedHTTPAdapter 用到了 urllib3 的内部接口（_dns_host、pool_classes_by_scheme），
+只在 urllib3 2.x 上测试过，requirements.txt 限定了这个版本范围。
+"""
+import json
+import os
+import socket
+import ssl
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError
+
+from config import atomic_write_text
+
+TRANSPORTS = ("requests", "httpx")
+
+
+class DNSCache:
+    """
+    DNS 解析结果的缓存：host -> (地址列表, 过期时间)。
+    path 不为 None 时从文件读取，save() 时写回（内容有变化时才写），多次运行之间共用。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 300,
+        resolver: Callable[..., List[Tuple]] = socket.getaddrinfo,
+    ) -> None:
+        """
+        :param path: 保存缓存的文件，None 表示只缓存在内存里
+        :param ttl: 解析结果的有效期（秒）
+        :param resolver: 实际的解析函数，签名与 socket.getaddrinfo 相同
+        """
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.resolver = resolver
+        self._entries: Dict[str, Tuple[List[str], float]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        now = time.time()
+        for host, entry in (data if isinstance(data, dict) else {}).items():
+            if isinstance(entry, dict) and entry.get("expires", 0) > now and entry.get("addresses"):
+                self._entries[host] = (list(entry["addresses"]), float(entry["expires"]))
+
+    def resolve(self, host: str, port: int) -> Optional[List[str]]:
+        """
+        返回 host 的地址列表；host 已经是 IP 地址时返回 None（直接连接即可）。解析失败时抛出 socket.gaierror。
+        """
+        if _is_ip_address(host):
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(host)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        infos = self.resolver(host, port, 0, socket.SOCK_STREAM)
+        # 保持系统返回的顺序（已按 RFC 6724 排好），去掉重复的地址
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        if not addresses:
+            raise socket.gaierror(f"no address for {host}")
+        with self._lock:
+            self._entries[host] = (addresses, now + self.ttl)
+            self._dirty = True
+        return addresses
+
+    def invalidate(self, host: str) -> None:
+        with self._lock:
+            if self._entries.pop(host, None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            data = {
+                host: {"addresses": addresses, "expires": expires}
+                for host, (addresses, expires) in self._entries.items()
+                if expires > now
+            }
+            self._dirty = False
+        atomic_write_text(str(self.path), json.dumps(data, ensure_ascii=False, indent=2))
+
+
+def _is_ip_address(host: str) -> bool:
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host.strip("[]"))
+            return True
+        except (OSError, ValueError):
+            pass
+    return False
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """
+    记住每个主机最近一次 TLS 会话的 SSLContext：之后发往同一主机的新连接在握手时带上这个会话，
+    服务器接受时只需要简化握手。TLS 会话只能在创建它的 SSLContext 上恢复，所以所有连接必须共用一个实例。
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__()
+        self.sessions: Dict[str, ssl.SSLSession] = {}
+
+    def wrap_socket(
+        self,
+        sock: socket.socket,
+        server_side: bool = False,
+        do_handshake_on_connect: bool = True,
+        suppress_ragged_eofs: bool = True,
+        server_hostname: Optional[str] = None,
+        session: Optional[ssl.SSLSession] = None,
+    ) -> ssl.SSLSocket:
+        if session is None and not server_side and server_hostname:
+            session = self.sessions.get(server_hostname)
+        return super().wrap_socket(
+            sock, server_side, do_handshake_on_connect, suppress_ragged_eofs, server_hostname, session
+        )
+
+    def remember(self, sock: Any) -> None:
+        """
+        记下连接的 TLS 会话。TLS 1.3 的会话票据在握手之后才由服务器发送，所以在收到响应之后调用。
+        """
+        if not isinstance(sock, ssl.SSLSocket) or not sock.server_hostname:
+            return
+        session = sock.session
+        if session is not None and (session.has_ticket or session.id):
+            self.sessions[sock.server_hostname] = session
+
+
+def default_ca_bundle() -> str:
+    """
+    与 requests 相同的 CA 证书包：优先使用 REQUESTS_CA_BUNDLE / CURL_CA_BUNDLE 环境变量。
+    """
+    return os.environ.get("REQUESTS_CA_BUNDLE") or os.environ.get("CURL_CA_BUNDLE") or DEFAULT_CA_BUNDLE_PATH
+
+
+def create_ssl_context(ca_bundle: Optional[str] = None) -> ResumingSSLContext:
+    """
+    与 urllib3 默认设置相同的客户端 SSLContext（TLS 1.2 起、校验证书和主机名），证书只加载一次。
+    """
+    context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.options |= ssl.OP_NO_COMPRESSION
+    context.load_verify_locations(ca_bundle or default_ca_bundle())
+    return context
+
+
+class TunedHTTPConnection(HTTPConnection):
+    """
+    通过 DNSCache 解析地址的连接（到代理服务器的连接也是这个类）。dns_cache 由 TunedHTTPAdapter 在子类上设置。
+    """
+
+    dns_cache: Optional[DNSCache] = None
+
+    def _new_conn(self) -> socket.socket:
+        cache = self.dns_cache
+        host = self._dns_host
+        try:
+            addresses = cache.resolve(host, self.port) if cache is not None else None
+        except socket.gaierror as e:
+            raise NameResolutionError(host, self, e) from e
+        if addresses is None:
+            return super()._new_conn()
+        # 依次尝试缓存的地址（与系统解析时相同）。只在建立 TCP 连接时换成地址，SNI 和证书校验仍然使用原来的主机名
+        for address in addresses[:-1]:
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except Exception:
+                pass
+            finally:
+                self._dns_host = host
+        self._dns_host = addresses[-1]
+        try:
+            return super()._new_conn()
+        except Exception:
+            # 所有地址都连不上：可能地址已经变了，丢弃缓存，下次重新解析
+            cache.invalidate(host)
+            raise
+        finally:
+            self._dns_host = host
+
+
+class TunedHTTPSConnection(TunedHTTPConnection, HTTPSConnection):
+    """
+    在 TunedHTTPConnection 的基础上，收到响应后把 TLS 会话记到共用的 ResumingSSLContext 里。
+    """
+
+    def getresponse(self, *args: Any, **kwargs: Any) -> Any:
+        response = super().getresponse(*args, **kwargs)
+        if isinstance(self.ssl_context, ResumingSSLContext):
+            self.ssl_context.remember(self.sock)
+        return response
+
+
+class TunedHTTPAdapter(HTTPAdapter):
+    """
+    使用 TunedHTTPConnection / TunedHTTPSConnection 的 HTTPAdapter：共用一个 SSLContext，并通过 dns_cache 解析地址。
+    """
+
+    def __init__(
+        self,
+        ca_bundle: Optional[str] = None,
+        dns_cache: Optional[DNSCache] = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        :param ca_bundle: CA 证书包，None 时与 requests 相同（REQUESTS_CA_BUNDLE / CURL_CA_BUNDLE 环境变量，否则 certifi）
+        :param dns_cache: 解析地址用的 DNSCache，None 表示每个新连接都由系统解析
+        """
+        self.ca_bundle = ca_bundle or default_ca_bundle()
+        self.ssl_context = create_ssl_context(self.ca_bundle)
+        http_conn = type("HTTPConnection", (TunedHTTPConnection,), {"dns_cache": dns_cache})
+        https_conn = type("HTTPSConnection", (TunedHTTPSConnection,), {"dns_cache": dns_cache})
+        self._pool_classes = {
+            "http": type("HTTPConnectionPool", (HTTPConnectionPool,), {"ConnectionCls": http_conn}),
+            "https": type("HTTPSConnectionPool", (HTTPSConnectionPool,), {"ConnectionCls": https_conn}),
+        }
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, ssl_context=self.ssl_context, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
+
+    def proxy_manager_for(self, proxy: str, **proxy_kwargs: Any) -> Any:
+        # 通过代理的 HTTPS 连接也使用共用的 SSLContext：下面的 cert_verify 不再设置 ca_certs，
+        # 没有这个 SSLContext 时 urllib3 会改用系统默认的证书，TLS 会话也无法恢复
+        proxy_kwargs.setdefault("ssl_context", self.ssl_context)
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if not proxy.lower().startswith("socks"):
+            # SOCKS 代理使用 urllib3 自己的连接类
+            manager.pool_classes_by_scheme = self._pool_classes
+        return manager
+
+    def build_connection_pool_key_attributes(self, request: Any, verify: Any, cert: Any = None) -> Tuple[Dict, Dict]:
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        if pool_kwargs.get("ca_certs") == self.ca_bundle:
+            # 同下：共用的 SSLContext 里已经有这个证书包
+            del pool_kwargs["ca_certs"]
+        # 部分 requests 版本会在这里放入自己预先加载的 SSLContext，会替换掉共用的那个
+        pool_kwargs.pop("ssl_context", None)
+        return host_params, pool_kwargs
+
+    def cert_verify(self, conn: Any, url: str, verify: Any, cert: Any) -> None:
+        # 设置了 REQUESTS_CA_BUNDLE 时 requests 传进来的 verify 是证书包的路径
+        if (verify is True or verify == self.ca_bundle) and url.lower().startswith("https") and not cert:
+            # 证书已经加载到共用的 SSLContext 里；设置 ca_certs 会让 urllib3 每个新连接都重新加载一遍
+            conn.cert_reqs = "CERT_REQUIRED"
+            return
+        super().cert_verify(conn, url, verify, cert)
+
+
+class HTTPXResponse:
+    """
+    httpx 响应中 FanboxAPI 用到的部分，属性名与 requests.Response 相同。
+    """
+
+    __slots__ = ("status_code", "content", "headers", "reason", "http_version")
+
+    def __init__(self, resp: Any) -> None:
+        self.status_code = resp.status_code
+        self.content = resp.content
+        self.headers = resp.headers
+        self.reason = resp.reason_phrase
+        self.http_version = resp.http_version
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+
+class HTTPXSession:
+    """
+    用 httpx 以 HTTP/2 发送请求，get() 的参数和返回值与 FanboxAPI 用到的 requests.Session.get 相同，
+    网络错误转换成 requests 的异常，重试逻辑不必区分两种传输方式。
+    httpx 的代理设置在客户端上，所以每个代理地址一个客户端（每个客户端一个连接池）。
+    没有安装 httpx 或 h2 时，创建时抛出 ImportError。
+    """
+
+    def __init__(self, pool_size: int = 10, ca_bundle: Optional[str] = None) -> None:
+        import httpx
+
+        self._httpx = httpx
+        self.pool_size = pool_size
+        self.ssl_context = create_ssl_context(ca_bundle)
+        self._clients: Dict[Optional[str], Any] = {}
+        self._lock = threading.Lock()
+        # 立即创建不使用代理的客户端：没有安装 h2 时 httpx 在这里抛出 ImportError
+        self._client(None)
+
+    def _client(self, proxy: Optional[str]) -> Any:
+        with self._lock:
+            client = self._clients.get(proxy)
+            if client is None:
+                httpx = self._httpx
+                client = self._clients[proxy] = httpx.Client(
+                    http2=True,
+                    verify=self.ssl_context,
+                    proxy=proxy,
+                    limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                )
+            return client
+
+    def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        proxies: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> HTTPXResponse:
+        httpx = self._httpx
+        proxy = (proxies or {}).get(url.split(":", 1)[0].lower())
+        # 与 requests 一样忽略值为 None 的参数
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        try:
+            resp = self._client(proxy).get(url, params=params, headers=headers, timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e)) from e
+        return HTTPXResponse(resp)
+
+    def close(self) -> None:
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+
+def create_session(
+    transport: str = "requests",
+    pool_size: int = 10,
+    dns_cache: Optional[DNSCache] = None,
+    ca_bundle: Optional[str] = None,
+) -> Any:
+    """
+    创建 FanboxAPI 使用的会话。transport 为 httpx 但没有安装 httpx[http2] 时打印提示并改用 requests。
+    httpx 使用自己的 DNS 解析，dns_cache 只对 requests 生效。
+    """
+    if transport == "httpx":
+        try:
+            return HTTPXSession(pool_size, ca_bundle)
+        except ImportError as e:
+            print(f"http_transport 为 httpx，但无法使用 HTTP/2（{e}），改用 requests", file=sys.stderr)
+    session = requests.Session()
+    # 连接池按主机划分，FanboxAPI 只访问 api.fanbox.cc（和代理），不需要按 pool_size 准备那么多个池
+    adapter = TunedHTTPAdapter(ca_bundle, dns_cache, pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session